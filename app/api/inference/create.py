@@ -1,12 +1,13 @@
 import logging
 import os
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from app.api.session import get_http_client
 from app.models.inference.create import CreateInferenceRequest, CreateInferenceResponse
+from app.stores.utils.metrics import INFERENCE_REQUESTS, INFERENCE_SECONDS
 
-logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 
@@ -15,17 +16,21 @@ BASE_URL = os.getenv("ML_ENDPOINT")
 SERVICE_ENDPOINT = "inference/create"
 
 
-def infer_create(input: CreateInferenceRequest) -> CreateInferenceResponse:
+async def infer_create(input: CreateInferenceRequest) -> CreateInferenceResponse:
     try:
-        response = requests.post(
-            f"{BASE_URL}/{SERVICE_ENDPOINT}", json=input.model_dump()
-        )
+        with INFERENCE_SECONDS.time(endpoint="create"):
+            response = await get_http_client().post(
+                f"{BASE_URL}/{SERVICE_ENDPOINT}", json=input.model_dump()
+            )
         response.raise_for_status()
         inference_response = CreateInferenceResponse.model_validate(response.json())
+        INFERENCE_REQUESTS.inc(endpoint="create", outcome="success")
         return inference_response
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
+        INFERENCE_REQUESTS.inc(endpoint="create", outcome="error")
         log.error(f"Failed to infer response from server: {e}")
         raise e
     except Exception as e:
+        INFERENCE_REQUESTS.inc(endpoint="create", outcome="error")
         log.error(f"Unknown error during inference occurred: {e}")
         raise e
@@ -1,12 +1,13 @@
 import logging
 import os
 
-import requests
+import httpx
 from dotenv import load_dotenv
 
+from app.api.session import get_http_client
 from app.models.inference.use import UseInferenceRequest, UseInferenceResponse
+from app.stores.utils.metrics import INFERENCE_REQUESTS, INFERENCE_SECONDS
 
-logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 
@@ -15,17 +16,21 @@ BASE_URL = os.getenv("ML_ENDPOINT")
 SERVICE_ENDPOINT = "inference/use"
 
 
-def infer_use(input: UseInferenceRequest) -> UseInferenceResponse:
+async def infer_use(input: UseInferenceRequest) -> UseInferenceResponse:
     try:
-        response = requests.post(
-            f"{BASE_URL}/{SERVICE_ENDPOINT}", json=input.model_dump()
-        )
+        with INFERENCE_SECONDS.time(endpoint="use"):
+            response = await get_http_client().post(
+                f"{BASE_URL}/{SERVICE_ENDPOINT}", json=input.model_dump()
+            )
         response.raise_for_status()
         inference_response = UseInferenceResponse.model_validate(response.json())
+        INFERENCE_REQUESTS.inc(endpoint="use", outcome="success")
         return inference_response
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
+        INFERENCE_REQUESTS.inc(endpoint="use", outcome="error")
         log.error(f"Failed to infer response from server: {e}")
         raise e
     except Exception as e:
+        INFERENCE_REQUESTS.inc(endpoint="use", outcome="error")
         log.error(f"Unknown error during inference occurred: {e}")
         raise e
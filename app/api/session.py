@@ -0,0 +1,24 @@
+import os
+from typing import Optional
+
+import httpx
+
+# The ML endpoint can take a while to plan a response, so the timeout is well above that of a typical HTTP call
+ML_TIMEOUT_SECONDS = float(os.environ.get("ML_TIMEOUT_SECONDS", "120"))
+
+# Shared so that calls to the ML endpoint reuse keep-alive connections instead of opening a new one per request. It is asynchronous, so a slow inference call does not block the other requests of the worker.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=ML_TIMEOUT_SECONDS)
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import os
+from typing import Callable, Optional
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.connectors.orm import INTERNAL_DATABASE_URL, Orm
+
+log = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = os.environ.get("INVALIDATION_CHANNEL", "application_changed")
+# How often the listening connection is checked, and how long to wait before reconnecting it
+INVALIDATION_HEALTH_CHECK_SECONDS = int(
+    os.environ.get("INVALIDATION_HEALTH_CHECK_SECONDS", "30")
+)
+INVALIDATION_RECONNECT_SECONDS = int(
+    os.environ.get("INVALIDATION_RECONNECT_SECONDS", "5")
+)
+
+# Payload of the notification that evicts every application, e.g. after missing notifications while disconnected
+ALL_APPLICATIONS = "*"
+
+
+class InvalidationBus:
+    """Tells every worker that the schema of an application changed, so that they evict what they cached of it.
+
+    Changes are published with NOTIFY on the internal database, and each worker LISTENs on one dedicated connection. Handlers are called with the name of the changed application, or None if every application must be evicted.
+    """
+
+    def __init__(self, channel: str = INVALIDATION_CHANNEL):
+        self.channel = channel
+        self._handlers: list[Callable[[Optional[str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, handler: Callable[[Optional[str]], None]) -> None:
+        self._handlers.append(handler)
+
+    async def publish(self, application_name: str) -> None:
+        """Evicts the application in this worker right away, then notifies the other workers."""
+        self._dispatch(application_name)
+        orm = Orm(is_user_facing=False)
+        await orm.notify(channel=self.channel, payload=application_name)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _listen(self) -> None:
+        # asyncpg takes the same URL as SQLAlchemy without the driver name
+        dsn: str = (
+            make_url(INTERNAL_DATABASE_URL)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+        is_reconnecting: bool = False
+        while True:
+            connection: Optional[asyncpg.Connection] = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(self.channel, self._on_notification)
+                if is_reconnecting:
+                    # Notifications sent while disconnected are lost, so anything cached may be stale
+                    self._dispatch(ALL_APPLICATIONS)
+                log.info(f"Listening for invalidations on {self.channel}")
+                while True:
+                    await asyncio.sleep(INVALIDATION_HEALTH_CHECK_SECONDS)
+                    await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Invalidation listener disconnected: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            is_reconnecting = True
+            await asyncio.sleep(INVALIDATION_RECONNECT_SECONDS)
+
+    def _on_notification(
+        self, connection: asyncpg.Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        log.info(f"Received invalidation of {payload}")
+        self._dispatch(payload)
+
+    def _dispatch(self, payload: str) -> None:
+        application_name: Optional[str] = (
+            None if payload == ALL_APPLICATIONS else payload
+        )
+        for handler in self._handlers:
+            try:
+                handler(application_name)
+            except Exception as e:
+                log.error(f"Error evicting {payload}: {e}")
+
+
+invalidation_bus = InvalidationBus()
@@ -1,37 +1,338 @@
+import asyncio
 import logging
 import os
-from typing import Any, Optional, Type
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Type
 
 from asyncpg.pgproto.pgproto import UUID as AsyncpgUUID
 from dotenv import find_dotenv, load_dotenv
 from pydantic import BaseModel
-from sqlalchemy import BinaryExpression, and_, column, delete, or_, select, true, update
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import (
+    BinaryExpression,
+    and_,
+    bindparam,
+    column,
+    delete,
+    exists,
+    func,
+    literal_column,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.orm.decl_api import DeclarativeMeta
 from sqlalchemy.sql import text
 
+from app.connectors.pool_stats import InstrumentedPool, render_pool_metrics
+from app.connectors.query_stats import instrument_engine, traced
+from app.connectors.replicas import (
+    EXTERNAL_DATABASE_REPLICA_URLS,
+    INTERNAL_DATABASE_REPLICA_URLS,
+    ReplicaSet,
+    has_written,
+    parse_urls,
+)
+from app.connectors.scheduler import FairScheduler, scheduler
+from app.connectors.shards import EXTERNAL_DATABASE_SHARDS, ShardMap, parse_shards
 from app.models.stores.base import BaseObject
+from app.models.stores.shard import ApplicationShard, ApplicationShardORM
+from app.stores.utils.metrics import READS, ROWS, registry
 
-logging.basicConfig(level=logging.DEBUG)
 log = logging.getLogger(__name__)
 
 load_dotenv(find_dotenv(filename=".env"))
 INTERNAL_DATABASE_URL = os.environ.get("INTERNAL_DATABASE_URL")
 EXTERNAL_DATABASE_URL = os.environ.get("EXTERNAL_DATABASE_URL")
+# Unfiltered COUNT(*) on tables at least this large is answered from the planner's estimate in pg_class instead of a full scan. 0 disables the estimate.
+APPROXIMATE_COUNT_MIN_ROWS = int(os.environ.get("APPROXIMATE_COUNT_MIN_ROWS", "0"))
+
+
+# Connections kept open (pool size) and opened on top of them under load (max overflow) by each engine of each worker
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", "10"))
+
+# One engine (and connection pool) per database, keyed by the name of the database in the metrics and shared by every Orm of the process
+_engines: dict[str, AsyncEngine] = {}
+_replica_sets: dict[str, ReplicaSet] = {}
+
+shard_map = ShardMap(
+    urls=parse_shards(EXTERNAL_DATABASE_SHARDS, default_url=EXTERNAL_DATABASE_URL)
+)
+_placements_lock = asyncio.Lock()
+
+
+def get_engine(is_user_facing: bool, shard: Optional[str] = None) -> AsyncEngine:
+    """Returns the engine of the given shard (by default, the first) of the external database if the Orm is user facing, or of the internal database otherwise. The engine is created on first use."""
+    if is_user_facing and shard is None:
+        shard = next(iter(shard_map.urls))
+    database: str = _database_name(is_user_facing=is_user_facing, shard=shard)
+    engine: Optional[AsyncEngine] = _engines.get(database)
+    if engine is None:
+        engine = _create_engine(
+            url=shard_map.urls[shard] if is_user_facing else INTERNAL_DATABASE_URL,
+            database=database,
+        )
+        _engines[database] = engine
+    return engine
+
+
+async def get_application_engine(application_name: str) -> AsyncEngine:
+    """Returns the engine of the shard of the external database that the tables of the application live in."""
+    if not shard_map.is_sharded:
+        return get_engine(is_user_facing=True)
+    await load_placements(application_name=application_name)
+    return get_engine(is_user_facing=True, shard=shard_map.shard_of(application_name))
+
+
+async def load_placements(application_name: Optional[str] = None) -> None:
+    """Loads the placements of the applications on the shards, unless they are loaded already, and the placement of the application again if it was invalidated since.
+
+    The placements are read from the primary, as a replica may not have the placement of an application that was just created or moved yet, and they stay cached until invalidated.
+    """
+    if shard_map.is_loaded(application_name):
+        return
+    async with _placements_lock:
+        # A load that an invalidation overtook is not kept, and is done again
+        while not shard_map.is_loaded(application_name):
+            invalidations: int = shard_map.invalidations
+            orm = Orm(is_user_facing=False)
+            if not shard_map.is_loaded():
+                placements: list[ApplicationShard] = await orm.static_get(
+                    orm_model=ApplicationShardORM,
+                    pydantic_model=ApplicationShard,
+                    filters={"boolean_clause": "AND", "conditions": []},
+                    is_primary=True,
+                )
+                shard_map.set_placements(
+                    placements={
+                        placement.application_name: placement.shard
+                        for placement in placements
+                    },
+                    invalidations=invalidations,
+                )
+                continue
+            placements = await orm.static_get(
+                orm_model=ApplicationShardORM,
+                pydantic_model=ApplicationShard,
+                filters={
+                    "boolean_clause": "AND",
+                    "conditions": [
+                        {
+                            "column": "application_name",
+                            "operator": "=",
+                            "value": application_name,
+                        }
+                    ],
+                },
+                is_primary=True,
+            )
+            shard_map.set_placement(
+                application_name=application_name,
+                shard=placements[0].shard if placements else None,
+                invalidations=invalidations,
+            )
+
+
+def get_replica_set(database: str) -> ReplicaSet:
+    """Returns the read replicas of the database, whose engines are created on first use. Only the internal database and the default shard of the external database have replicas."""
+    replica_set: Optional[ReplicaSet] = _replica_sets.get(database)
+    if replica_set is None:
+        urls: str = {
+            "internal": INTERNAL_DATABASE_REPLICA_URLS,
+            "external": EXTERNAL_DATABASE_REPLICA_URLS,
+        }.get(database, "")
+        replica_set = ReplicaSet(
+            urls=parse_urls(urls),
+            create_engine=lambda url, index: _create_engine(
+                url=url, database=f"{database}_replica_{index}"
+            ),
+        )
+        _replica_sets[database] = replica_set
+    return replica_set
+
+
+def _create_engine(url: str, database: str) -> AsyncEngine:
+    engine: AsyncEngine = create_async_engine(
+        url=url,
+        echo=False,
+        pool_size=DATABASE_POOL_SIZE,
+        max_overflow=DATABASE_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        poolclass=InstrumentedPool,
+    )
+    engine.sync_engine.pool.database = database
+    instrument_engine(engine)
+    return engine
+
+
+def _database_name(is_user_facing: bool, shard: Optional[str] = None) -> str:
+    if not is_user_facing:
+        return "internal"
+    # The first shard keeps the name of the database from before sharding
+    if shard is None or shard == next(iter(shard_map.urls)):
+        return "external"
+    return f"external_{shard}"
+
+
+def _database_of(engine: AsyncEngine) -> str:
+    return engine.sync_engine.pool.database
+
+
+registry.register_collector(
+    lambda: render_pool_metrics(
+        {
+            _database_of(engine): engine.sync_engine.pool
+            for engines in (
+                _engines.values(),
+                *(replica_set.engines for replica_set in _replica_sets.values()),
+            )
+            for engine in engines
+        }
+    )
+)
+
+
+async def warm_engine(is_user_facing: bool, connections: int) -> None:
+    """Opens the given number of connections of the engine (of every shard if user facing) at once, so that they are in its pool before the first requests need them."""
+    engines: list[AsyncEngine] = (
+        [get_engine(is_user_facing=True, shard=shard) for shard in shard_map.urls]
+        if is_user_facing
+        else [get_engine(is_user_facing=False)]
+    )
+    async with AsyncExitStack() as stack:
+        for engine in engines:
+            for _ in range(connections):
+                await stack.enter_async_context(engine.connect())
+
+
+async def dispose_engines() -> None:
+    """Closes the connections of every engine. Called when the server shuts down."""
+    for engine in _engines.values():
+        await engine.dispose()
+    _engines.clear()
+    for replica_set in _replica_sets.values():
+        await replica_set.dispose()
+    _replica_sets.clear()
 
 
 # All these functions work but are an absolute mess implementation wise. Please refactor. But lets get to it after the structure of the filter conditions and everything is firmed.
 class Orm:
     def __init__(self, is_user_facing: bool = True):
-        self.engine = create_async_engine(
-            url=EXTERNAL_DATABASE_URL if is_user_facing else INTERNAL_DATABASE_URL,
-            echo=False,
+        self.is_user_facing = is_user_facing
+        # Sessions are bound to the engine when opened, so an Orm built at import time does not create the engine
+        self.sessionmaker = sessionmaker(class_=AsyncSession, expire_on_commit=False)
+        # Only the external database is shared by the applications, so only its sessions are scheduled
+        self.scheduler: Optional[FairScheduler] = scheduler if is_user_facing else None
+        self._is_in_transaction: bool = False
+        self._transaction_session: Optional[AsyncSession] = None
+        self._transaction_stack: Optional[AsyncExitStack] = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """Returns the engine of the database of the Orm, which is created on first use by the worker that uses it."""
+        return get_engine(is_user_facing=self.is_user_facing)
+
+    @asynccontextmanager
+    async def try_advisory_lock(self, key: int) -> AsyncIterator[bool]:
+        """Holds the advisory lock of the key on the primary for the duration of the block if no other session holds it, and yields whether it was acquired. The lock is taken in a transaction, so it is released even if the connection is lost."""
+        async with self.engine.begin() as connection:
+            acquired: bool = (
+                await connection.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}
+                )
+            ).scalar_one()
+            yield acquired
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Runs the inference operations called inside the block in a single transaction, which is committed at the end of the block or rolled back if it raises.
+
+        The session of the transaction is opened by its first query, on the shard of the application of that query. Every query of the transaction must be on the same shard.
+        """
+        if self._is_in_transaction:
+            raise RuntimeError("A transaction is already in progress")
+        async with AsyncExitStack() as stack:
+            self._is_in_transaction = True
+            self._transaction_stack = stack
+            try:
+                yield
+                if self._transaction_session is not None:
+                    await self._transaction_session.commit()
+            except BaseException:
+                if self._transaction_session is not None:
+                    await self._transaction_session.rollback()
+                raise
+            finally:
+                self._is_in_transaction = False
+                self._transaction_session = None
+                self._transaction_stack = None
+
+    @asynccontextmanager
+    async def _session(
+        self, model: Type[DeclarativeMeta], is_read: bool = False
+    ) -> AsyncIterator[AsyncSession]:
+        """Yields the session of the current transaction, or a new session outside of a transaction, once the scheduler admits the application of the model. The session is bound to the shard of the application, and a new session of a read to a replica when one is available."""
+        application_name: Optional[str] = getattr(model, "__application_name__", None)
+        engine: AsyncEngine = (
+            await get_application_engine(application_name)
+            if self.is_user_facing and application_name is not None
+            else self.engine
         )
-        self.sessionmaker = sessionmaker(
-            bind=self.engine, class_=AsyncSession, expire_on_commit=False
+        if self._is_in_transaction:
+            if self._transaction_session is None:
+                # The transaction holds the slot of the application of its first query until it ends. Holding a single slot keeps transactions from deadlocking on each other's slots.
+                if self.scheduler is not None and application_name is not None:
+                    await self._transaction_stack.enter_async_context(
+                        self.scheduler.slot(application_name)
+                    )
+                self._transaction_session = (
+                    await self._transaction_stack.enter_async_context(
+                        self.sessionmaker(bind=self._write_engine(engine))
+                    )
+                )
+            elif self._transaction_session.bind is not engine:
+                raise RuntimeError(
+                    f"{model.__table__.fullname} is on another shard than the tables queried before it in the transaction"
+                )
+            yield self._transaction_session
+            return
+        async with AsyncExitStack() as slots:
+            if self.scheduler is not None and application_name is not None:
+                await slots.enter_async_context(self.scheduler.slot(application_name))
+            async with self.sessionmaker(
+                bind=(
+                    self._read_engine(engine) if is_read else self._write_engine(engine)
+                )
+            ) as session:
+                yield session
+
+    def _read_engine(self, engine: AsyncEngine) -> AsyncEngine:
+        """Returns the engine of a healthy replica of the database of the engine, or the engine itself if there is none or the current request has written to a primary."""
+        replica: Optional[AsyncEngine] = None
+        if not has_written.get():
+            replica = get_replica_set(_database_of(engine)).pick()
+        READS.inc(
+            database=_database_of(engine),
+            target="primary" if replica is None else "replica",
         )
+        return replica or engine
+
+    def _write_engine(self, engine: AsyncEngine) -> AsyncEngine:
+        has_written.set(True)
+        return engine
 
+    async def _commit(self, session: AsyncSession) -> None:
+        # Inside a transaction, the changes are committed at the end of the transaction instead
+        if session is not self._transaction_session:
+            await session.commit()
+
+    @traced
     async def post(
         self, model: Type[DeclarativeMeta], data: list[dict[str, Any]]
     ) -> tuple[list[Any], list[dict[str, Any]]]:
@@ -45,7 +346,7 @@ class Orm:
         inserted_ids: list[Any] = []
         inserted_rows: list[dict[str, Any]] = []
 
-        async with self.sessionmaker() as session:
+        async with self._session(model) as session:
             session.add_all(orm_instances)
             await session.flush()
             for instance in orm_instances:
@@ -55,17 +356,20 @@ class Orm:
                     inserted_ids.append(instance.id)
 
             # Fetch column names directly from the database
-            table_name = model.__tablename__
+            table = model.__table__
             columns_query = text(
-                f"SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"
+                f"SELECT column_name FROM information_schema.columns WHERE table_schema = :table_schema AND table_name = :table_name"
+            )
+            result = await session.execute(
+                columns_query,
+                {"table_schema": table.schema or "public", "table_name": table.name},
             )
-            result = await session.execute(columns_query, {"table_name": table_name})
             columns = [row[0] for row in result]
 
             # Construct a query to select all columns for the inserted rows
             columns_str = ", ".join(columns)
             select_query = text(
-                f"SELECT {columns_str} FROM {table_name} WHERE id = ANY(:ids)"
+                f"SELECT {columns_str} FROM {table.fullname} WHERE id = ANY(:ids)"
             )
             result = await session.execute(select_query, {"ids": inserted_ids})
 
@@ -75,87 +379,366 @@ class Orm:
                     row_dict[column] = value
                 inserted_rows.append(row_dict)
 
-            await session.commit()
-            log.info(f"Inserted {len(data)} rows into {model.__tablename__}")
+            await self._commit(session)
+            log.info(f"Inserted {len(data)} rows into {model.__table__.fullname}")
 
+        _record_rows(model=model, direction="written", count=len(inserted_rows))
         return inserted_ids, inserted_rows
-    
+
+    @traced
+    async def upsert(
+        self,
+        model: Type[DeclarativeMeta],
+        data: list[dict[str, Any]],
+        conflict_column: str,
+        update_on_conflict: bool,
+    ) -> tuple[list[dict[str, Any]], list[bool], list[dict[str, Any]]]:
+        """Inserts the rows with INSERT ... ON CONFLICT, updating or skipping the rows whose value of the unique conflict_column already exists.
+
+        Args:
+            model (Type[DeclarativeMeta]): The SQLAlchemy model to insert data into.
+            data (list[dict[str, Any]]): The rows to insert. The value of conflict_column must be unique across the rows.
+            conflict_column (str): The unique column on which rows conflict.
+            update_on_conflict (bool): Whether to update the existing rows with the provided values, or to skip them.
+
+        Returns:
+            tuple[list[dict[str, Any]], list[bool], list[dict[str, Any]]]:
+            A tuple containing:
+            1. The inserted and updated rows (skipped rows are not returned)
+            2. Whether each returned row was inserted rather than updated
+            3. The existing rows that conflicted, as they were before the statement
+        """
+        table = model.__table__
+        conflict = _get_column(model, conflict_column)
+        # Unique columns of soft delete tables are enforced by a partial index over the rows that are not deleted
+        index_where = (
+            _build_live_filter(model) if "deleted_at" in table.columns else None
+        )
+        original_select_stmt = (
+            select(*table.c)
+            .where(
+                conflict == func.any(bindparam("values", type_=ARRAY(conflict.type)))
+            )
+            .where(_build_live_filter(model))
+            .with_for_update()
+        )
+
+        # Rows with different columns cannot share a VALUES list
+        rows_by_columns: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for row in data:
+            rows_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+
+        returned_rows: list[dict[str, Any]] = []
+        is_inserted: list[bool] = []
+        async with self._session(model) as session:
+            result = await session.execute(
+                original_select_stmt,
+                {"values": [row[conflict_column] for row in data]},
+            )
+            original_rows: list[dict[str, Any]] = [
+                dict(row) for row in result.mappings()
+            ]
+
+            for rows in rows_by_columns.values():
+                insert_stmt = pg_insert(table).values(rows)
+                if update_on_conflict:
+                    insert_stmt = insert_stmt.on_conflict_do_update(
+                        index_elements=[conflict],
+                        index_where=index_where,
+                        set_={name: insert_stmt.excluded[name] for name in rows[0]},
+                    )
+                else:
+                    insert_stmt = insert_stmt.on_conflict_do_nothing(
+                        index_elements=[conflict], index_where=index_where
+                    )
+                # xmax is 0 for the rows that were inserted rather than updated
+                result = await session.execute(
+                    insert_stmt.returning(*table.c, literal_column("xmax = 0"))
+                )
+                for row in result:
+                    returned_rows.append(
+                        {column.name: value for column, value in zip(table.c, row)}
+                    )
+                    is_inserted.append(row[-1])
+
+            await self._commit(session)
+            log.info(f"Upserted {len(returned_rows)} rows into {table.fullname}")
+
+        _record_rows(model=model, direction="written", count=len(returned_rows))
+        return returned_rows, is_inserted, original_rows
+
+    @traced
     async def get_inference_result(
         self,
         model: Type[DeclarativeMeta],
         filters: dict[str, Any],
-        batch_size: int = 6500,
-    ) -> list[dict[str, Any]]:
-        results = []
-        offset = 0
-        async with self.sessionmaker() as session:
-            while True:
-                query = select(model)
-                filter_expression, params = _build_filter(model, filters)
-                query = query.filter(filter_expression)
+        selected_columns: Optional[list[str]] = None,
+        order_by: Optional[list[dict[str, str]]] = None,
+        limit: Optional[int] = None,
+        after: Optional[dict[str, Any]] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+        """Fetches a page of the rows matching the filters in a single query. Pages are keyset paginated on the sort keys followed by id.
 
-                query = query.limit(batch_size).offset(offset)
-                batch_results = await session.execute(query, params)
-                batch_results = batch_results.scalars().all()
+        Args:
+            model (Type[DeclarativeMeta]): The SQLAlchemy model to fetch data of.
+            filters (dict): The filters to apply to the query.
+            selected_columns (Optional[list[str]]): The columns to return. Defaults to every column of the table.
+            order_by (Optional[list[dict[str, str]]]): The sort keys, each with a column and an ASC/DESC direction.
+            limit (Optional[int]): The maximum number of rows to return.
+            after (Optional[dict[str, Any]]): The keyset position returned with the previous page.
 
-                if not batch_results:
-                    break
+        Returns:
+            tuple[list[dict[str, Any]], Optional[dict[str, Any]]]:
+            A tuple containing:
+            1. The matching rows keyed by column name
+            2. The keyset position (sort key values) of the last row if more rows remain after it, otherwise None
+        """
+        sort_keys: list[dict[str, str]] = list(order_by or [])
+        if not any(sort_key["column"] == "id" for sort_key in sort_keys):
+            sort_keys.append({"column": "id", "direction": "ASC"})
+        keyset_columns = [
+            _get_column(model, sort_key["column"]) for sort_key in sort_keys
+        ]
+
+        if selected_columns:
+            columns = [_get_column(model, name) for name in selected_columns]
+        else:
+            columns = list(model.__table__.columns)
+        # The sort keys are needed to compute the keyset position even if they were not requested
+        selected_names: set[str] = {column.name for column in columns}
+        extra_columns = [
+            column for column in keyset_columns if column.name not in selected_names
+        ]
+
+        filter_expression, params = _build_filter(model, filters)
+        query = (
+            select(*columns, *extra_columns)
+            .filter(filter_expression)
+            .filter(_build_live_filter(model))
+        )
+        if after is not None:
+            query = query.filter(_build_keyset_filter(model, sort_keys, after))
+        query = query.order_by(*_build_order_by(model, sort_keys))
+        if limit is not None:
+            # Fetch one extra row to know whether another page remains
+            query = query.limit(limit + 1)
+
+        async with self._session(model, is_read=True) as session:
+            result = await session.execute(query, params)
+            inference_results: list[dict[str, Any]] = [
+                dict(row) for row in result.mappings()
+            ]
+
+        next_after: Optional[dict[str, Any]] = None
+        if limit is not None and len(inference_results) > limit:
+            inference_results = inference_results[:limit]
+            last_row: dict[str, Any] = inference_results[-1]
+            next_after = {
+                column.name: last_row[column.name] for column in keyset_columns
+            }
+        for row in inference_results:
+            for column in extra_columns:
+                del row[column.name]
+
+        log.info(
+            f"Fetched {len(inference_results)} rows from {model.__table__.fullname}"
+        )
+        _record_rows(model=model, direction="read", count=len(inference_results))
+        return inference_results, next_after
 
-                results.extend(batch_results)
-                offset += batch_size
-                log.info(f"Fetching {results} from database")
+    @traced
+    async def get_joined_inference_result(
+        self,
+        model: Type[DeclarativeMeta],
+        joins: list[dict[str, Any]],
+        filters: dict[str, Any],
+        selected_columns: Optional[list[str]] = None,
+        order_by: Optional[list[dict[str, str]]] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict[str, Any]]:
+        """Fetches the rows matching the filters with their related rows in a single LEFT OUTER JOIN query.
 
-        if not results:
-            return []
+        Args:
+            model (Type[DeclarativeMeta]): The SQLAlchemy model of the table the rows are fetched from.
+            joins (list[dict[str, Any]]): The tables to join in order. Each has the name of the table, its model, and the model and column on the left of the join condition that are equal to its right column.
+            filters (dict): The filters to apply to the query. Columns of joined tables are referred to as "{name}.{column}".
+            selected_columns (Optional[list[str]]): The columns to return. Defaults to every column of every table.
+            order_by (Optional[list[dict[str, str]]]): The sort keys, each with a column and an ASC/DESC direction.
+            limit (Optional[int]): The maximum number of rows to return.
 
-        inference_results: list[dict[str, Any]] = []
+        Returns:
+            list[dict[str, Any]]: The flattened rows. Columns of joined tables are keyed as "{name}.{column}".
+        """
+        columns_by_name: dict[str, Any] = {
+            column.name: column for column in model.__table__.columns
+        }
+        for join in joins:
+            for column in join["model"].__table__.columns:
+                columns_by_name[f"{join['name']}.{column.name}"] = column
+
+        def get_column(name: str):
+            if name not in columns_by_name:
+                raise ValueError(f"Column {name} not found in the joined tables")
+            return columns_by_name[name]
+
+        names: list[str] = selected_columns or list(columns_by_name)
+        query = select(*[get_column(name).label(name) for name in names]).select_from(
+            model
+        )
+        for join in joins:
+            left_column = _get_column(join["left_model"], join["left_column"])
+            right_column = _get_column(join["model"], join["right_column"])
+            query = query.outerjoin(
+                join["model"],
+                and_(left_column == right_column, _build_live_filter(join["model"])),
+            )
 
-        # Fetch column names directly from the database
-        table_name = model.__tablename__
-        columns_query = text(
-            f"SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"
+        filter_expression, params = _build_filter(
+            model,
+            filters,
+            column_names={
+                name: f"{column.table.name}.{column.name}"
+                for name, column in columns_by_name.items()
+            },
         )
-        result = await session.execute(columns_query, {"table_name": table_name})
-        columns = [row[0] for row in result]
+        query = query.filter(filter_expression).filter(_build_live_filter(model))
+        for sort_key in order_by or []:
+            column = get_column(sort_key["column"])
+            query = query.order_by(
+                column.desc() if sort_key.get("direction") == "DESC" else column.asc()
+            )
+        if limit is not None:
+            query = query.limit(limit)
+
+        async with self._session(model, is_read=True) as session:
+            result = await session.execute(query, params)
+            rows: list[dict[str, Any]] = [dict(row) for row in result.mappings()]
+
+        log.info(f"Fetched {len(rows)} joined rows from {model.__table__.fullname}")
+        _record_rows(model=model, direction="read", count=len(rows))
+        return rows
+
+    @traced
+    async def aggregate_inference_result(
+        self,
+        model: Type[DeclarativeMeta],
+        filters: dict[str, Any],
+        aggregations: list[dict[str, Any]],
+        group_by: Optional[list[str]] = None,
+    ) -> tuple[list[dict[str, Any]], bool]:
+        """Computes COUNT/SUM/AVG/MIN/MAX over the rows matching the filters in the database.
 
-        # Construct a query to select all columns for the inserted rows
-        columns_str = ", ".join(columns)
-        select_query = text(
-            f"SELECT {columns_str} FROM {table_name} WHERE id = ANY(:ids)"
+        Args:
+            model (Type[DeclarativeMeta]): The SQLAlchemy model to aggregate data of.
+            filters (dict): The filters to apply to the query.
+            aggregations (list[dict[str, Any]]): The aggregations to compute, each with a function, an optional column and an alias.
+            group_by (Optional[list[str]]): The columns to group the aggregations by.
+
+        Returns:
+            tuple[list[dict[str, Any]], bool]:
+            A tuple containing:
+            1. One row per group, keyed by the group by columns and the aggregation aliases
+            2. Whether the result is an estimate taken from the table statistics
+        """
+        group_by = group_by or []
+        if not aggregations:
+            raise ValueError("At least one aggregation must be provided")
+
+        is_plain_count: bool = (
+            len(aggregations) == 1
+            and aggregations[0]["function"] == "COUNT"
+            and aggregations[0]["column"] is None
+            and not group_by
+            and not filters.get("conditions")
+            # The estimate would include the soft deleted rows
+            and "deleted_at" not in model.__table__.columns
         )
-        result = await session.execute(
-            select_query, {"ids": [result.id for result in results]}
+        if is_plain_count and APPROXIMATE_COUNT_MIN_ROWS > 0:
+            estimate: Optional[int] = await self.estimate_row_count(model=model)
+            if estimate is not None and estimate >= APPROXIMATE_COUNT_MIN_ROWS:
+                return [{aggregations[0]["alias"]: estimate}], True
+
+        group_by_columns = [_get_column(model, name) for name in group_by]
+        aggregate_columns = []
+        for aggregation in aggregations:
+            if aggregation["column"] is None:
+                expression = func.count()
+            else:
+                aggregate_function = getattr(func, aggregation["function"].lower())
+                expression = aggregate_function(
+                    _get_column(model, aggregation["column"])
+                )
+            aggregate_columns.append(expression.label(aggregation["alias"]))
+
+        filter_expression, params = _build_filter(model, filters)
+        query = (
+            select(*group_by_columns, *aggregate_columns)
+            .select_from(model)
+            .filter(filter_expression)
+            .filter(_build_live_filter(model))
         )
+        if group_by_columns:
+            query = query.group_by(*group_by_columns).order_by(*group_by_columns)
+
+        async with self._session(model, is_read=True) as session:
+            result = await session.execute(query, params)
+            rows: list[dict[str, Any]] = [dict(row) for row in result.mappings()]
+
+        log.info(f"Aggregated {len(rows)} group(s) from {model.__table__.fullname}")
+        return rows, False
+
+    @traced
+    async def estimate_row_count(self, model: Type[DeclarativeMeta]) -> Optional[int]:
+        """Returns the planner's row estimate of the table, or None if the table has never been analyzed."""
+        async with self._session(model, is_read=True) as session:
+            result = await session.execute(
+                text(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"
+                ),
+                {"table_name": model.__table__.fullname},
+            )
+            estimate: Optional[int] = result.scalar()
 
-        for row in result:
-            row_dict = {}
-            for column, value in zip(columns, row):
-                row_dict[column] = value
-            inference_results.append(row_dict)
+        # reltuples is -1 for tables that have not been vacuumed or analyzed yet
+        if estimate is None or estimate < 0:
+            return None
+        return estimate
 
-        return inference_results
+    @traced
+    async def warm_model(self, model: Type[DeclarativeMeta]) -> None:
+        """Runs an empty SELECT of every column of the table, so that the statement is compiled and the column types are introspected before the first request."""
+        async with self._session(model, is_read=True) as session:
+            await session.execute(select(model).limit(0))
 
+    @traced
     async def delete_inference_result(
         self,
         model: Type[DeclarativeMeta],
         filters: dict[str, Any],
+        before_commit: Optional[
+            Callable[[list[dict[str, Any]]], Awaitable[None]]
+        ] = None,
     ) -> list[dict[Any, dict]]:
+        """Deletes the rows matching the filters and returns them. before_commit is called with the rows once they are deleted but before the deletion is committed, which is rolled back if it raises."""
         deleted_rows: list[dict[str, Any]] = []
 
-        async with self.sessionmaker() as session:
+        async with self._session(model) as session:
             filter_expression, params = _build_filter(model, filters)
 
             # Fetch column names
-            table_name = model.__tablename__
+            table = model.__table__
             columns_query = text(
-                f"SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"
+                f"SELECT column_name FROM information_schema.columns WHERE table_schema = :table_schema AND table_name = :table_name"
+            )
+            result = await session.execute(
+                columns_query,
+                {"table_schema": table.schema or "public", "table_name": table.name},
             )
-            result = await session.execute(columns_query, {"table_name": table_name})
             columns = [row[0] for row in result]
 
             # Construct the SELECT query
             columns_str = ", ".join(columns)
-            select_query = f"SELECT {columns_str} FROM {table_name}"
+            select_query = f"SELECT {columns_str} FROM {table.fullname}"
 
             # Convert the SQLAlchemy filter expression to a string
             where_clause = str(filter_expression)
@@ -180,112 +763,400 @@ class Orm:
             # Perform the deletion
             delete_stmt = delete(model).where(filter_expression)
             await session.execute(delete_stmt, params)
-            await session.commit()
+            if before_commit is not None:
+                await before_commit(deleted_rows)
+            await self._commit(session)
 
+        _record_rows(model=model, direction="written", count=len(deleted_rows))
         return deleted_rows
 
+    @traced
+    async def soft_delete_inference_result(
+        self,
+        model: Type[DeclarativeMeta],
+        filters: dict[str, Any],
+        before_commit: Optional[
+            Callable[[list[dict[str, Any]]], Awaitable[None]]
+        ] = None,
+    ) -> list[dict[str, Any]]:
+        """Marks the rows matching the filters as deleted in a single statement, for tables with soft delete enabled. before_commit is called with the rows before the change is committed, which is rolled back if it raises.
+
+        Returns:
+            list[dict[str, Any]]: The soft deleted rows.
+        """
+        table = model.__table__
+        filter_expression, params = _build_filter(model, filters)
+        update_stmt = (
+            update(table)
+            .where(filter_expression)
+            .where(_build_live_filter(model))
+            .values(deleted_at=func.now())
+            .returning(*table.c)
+        )
+
+        async with self._session(model) as session:
+            result = await session.execute(update_stmt, params)
+            deleted_rows: list[dict[str, Any]] = [
+                dict(row) for row in result.mappings()
+            ]
+            if before_commit is not None:
+                await before_commit(deleted_rows)
+            await self._commit(session)
+
+        log.info(f"Soft deleted {len(deleted_rows)} rows from {table.fullname}")
+        _record_rows(model=model, direction="written", count=len(deleted_rows))
+        return deleted_rows
+
+    @traced
+    async def restore_by_id(self, model: Type[DeclarativeMeta], ids: list[Any]) -> int:
+        """Restores the soft deleted rows with the provided ids, and returns the number of rows restored. Rows that have already been purged cannot be restored."""
+        table = model.__table__
+        update_stmt = (
+            update(table)
+            .where(
+                table.c.id == func.any(bindparam("ids", type_=ARRAY(table.c.id.type)))
+            )
+            .where(table.c.deleted_at.is_not(None))
+            .values(deleted_at=None)
+        )
+
+        async with self._session(model) as session:
+            result = await session.execute(update_stmt, {"ids": ids})
+            await self._commit(session)
+
+        log.info(f"Restored {result.rowcount} of {len(ids)} rows in {table.fullname}")
+        _record_rows(model=model, direction="written", count=result.rowcount)
+        return result.rowcount
+
+    @traced
+    async def purge_soft_deleted(
+        self,
+        model: Type[DeclarativeMeta],
+        retention: timedelta,
+        batch_size: int,
+        references: Optional[list[dict[str, Any]]] = None,
+    ) -> int:
+        """Permanently deletes one batch of the rows that were soft deleted longer than the retention ago, and returns the number of rows purged.
+
+        references are the foreign keys referencing the table, each with the referencing model and column and the referenced column. Rows that are still referenced are kept until the rows referencing them are deleted.
+        """
+        table = model.__table__
+        expired_ids = select(table.c.id).where(
+            table.c.deleted_at < func.now() - retention
+        )
+        for reference in references or []:
+            # Aliased, so that a table referencing itself is not correlated with the row being purged
+            referencing = reference["model"].__table__.alias("referencing")
+            expired_ids = expired_ids.where(
+                ~exists().where(
+                    referencing.c[reference["column"]]
+                    == _get_column(model, reference["referenced_column"])
+                )
+            )
+        expired_ids = (
+            expired_ids.limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        delete_stmt = delete(table).where(table.c.id.in_(expired_ids))
+
+        async with self._session(model) as session:
+            result = await session.execute(delete_stmt)
+            await session.commit()
+
+        return result.rowcount
+
+    @traced
     async def update_inference_result(
         self,
         model: Type[DeclarativeMeta],
         filters: dict[str, Any],
         updated_data: dict[str, Any],
-    ) -> tuple[list[dict[str, Any]], dict[str, Any], dict[str, Any]]:
-        """Updates entries in the specified table based on the filters provided.
+        returned_column_names: Optional[list[str]] = None,
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Updates entries in the specified table based on the filters provided, returning the original values of each updated row from the same statement.
 
         Args:
             model (Type[DeclarativeMeta]): The SQLAlchemy model to update data of.
             filters (dict): The filters to apply to the query.
             updated_data (dict): The updates to apply to the target rows.
-            is_and (bool, optional): Whether to treat the filters as an OR/AND condition. Defaults to True.
+            returned_column_names (Optional[list[str]]): The columns of the updated rows to return, which must include id. Defaults to every column of the table.
 
         Returns:
-            tuple[list[dict[str, Any]], dict[str, Any], dict[str, Any]]:
+            tuple[list[dict[str, Any]], list[dict[str, Any]]]:
             A tuple containing:
             1. The updated rows
-            2. The data necessary to reverse the update
+            2. The id and original values of the updated columns of each updated row, which is the data necessary to reverse the update
         """
+        table = model.__table__
+        returned_columns: list[Any] = (
+            [_get_column(model, name) for name in returned_column_names]
+            if returned_column_names
+            else list(table.c)
+        )
+        filter_expression, params = _build_filter(model, filters)
+
+        # The rows to update are locked and read in a subquery of the UPDATE, which sees the rows as they were before the update
+        original = (
+            select(*table.c)
+            .where(filter_expression)
+            .where(_build_live_filter(model))
+            .with_for_update()
+            .subquery("original")
+        )
+        update_stmt = (
+            update(table)
+            .where(table.c.id == original.c.id)
+            .values(**updated_data)
+            .returning(*returned_columns, *[original.c[name] for name in updated_data])
+        )
 
-        updated_results: list[dict[str, Any]] = []
-        original_results: list[dict[str, Any]] = []
-        reverse_filters: dict[str, str] = {"boolean_clause": "OR", "conditions": []}
-
-        async with self.sessionmaker() as session:
-            filter_expression, params = _build_filter(model, filters)
-
-            # Fetch column names
-            table_name = model.__tablename__
-            columns_query = text(
-                f"SELECT column_name FROM information_schema.columns WHERE table_name = :table_name"
+        async with self._session(model) as session:
+            result = await session.execute(update_stmt, params)
+            updated_results, original_results = _split_returned_rows(
+                result=result,
+                columns=returned_columns,
+                original_column_names=list(updated_data),
             )
-            result = await session.execute(columns_query, {"table_name": table_name})
-            columns = [row[0] for row in result]
+            await self._commit(session)
+            log.info(f"Updated {len(updated_results)} rows in {table.fullname}")
 
-            # Construct the SELECT query
-            columns_str = ", ".join(columns)
-            select_query = f"SELECT {columns_str} FROM {table_name}"
+        _record_rows(model=model, direction="written", count=len(updated_results))
+        return updated_results, original_results
 
-            # Convert the SQLAlchemy filter expression to a string
-            where_clause = str(filter_expression)
-
-            # Combine SELECT query with WHERE clause
-            full_query = f"{select_query} WHERE {where_clause}"
-
-            # Create a SQLAlchemy text object
-            select_stmt = text(full_query)
+    @traced
+    async def bulk_update_by_id(
+        self,
+        model: Type[DeclarativeMeta],
+        updated_rows: list[dict[str, Any]],
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Updates each row with the values provided for its id in a single UPDATE ... FROM unnest(...) statement.
 
-            # Execute the query with params
-            result = await session.execute(select_stmt, params)
+        Args:
+            model (Type[DeclarativeMeta]): The SQLAlchemy model to update data of.
+            updated_rows (list[dict[str, Any]]): The id of each row to update and its new values. Every row must have the same columns.
 
-            for row in result:
-                row_dict = {}
-                for column, value in zip(columns, row):
-                    row_dict[column] = value
-                original_results.append(row_dict)
-                reverse_filters["conditions"].append(
-                    {"column": "id", "operator": "=", "value": row_dict["id"]}
-                )
+        Returns:
+            tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+            A tuple containing:
+            1. The updated rows
+            2. The id and original values of the updated columns of each updated row
+            Both in the order of updated_rows, without the rows that were not found.
+        """
+        table = model.__table__
+        column_names: list[str] = list(updated_rows[0].keys())
+        if "id" not in column_names:
+            raise ValueError("The id of each row to update must be provided")
+        updated_column_names: list[str] = [
+            name for name in column_names if name != "id"
+        ]
+
+        # Each column is bound as one array, so the number of parameters does not grow with the number of rows
+        value_params = {
+            name: bindparam(
+                f"updated_{name}", type_=ARRAY(_get_column(model, name).type)
+            )
+            for name in column_names
+        }
+        updated_values = (
+            func.unnest(*value_params.values())
+            .table_valued(*column_names, name="updated_values")
+            .render_derived()
+        )
+        original = (
+            select(*table.c)
+            .where(table.c.id == func.any(value_params["id"]))
+            .where(_build_live_filter(model))
+            .with_for_update()
+            .subquery("original")
+        )
+        update_stmt = (
+            update(table)
+            .where(table.c.id == updated_values.c.id)
+            .where(table.c.id == original.c.id)
+            .values({name: updated_values.c[name] for name in updated_column_names})
+            .returning(*table.c, *[original.c[name] for name in updated_column_names])
+        )
+        params: dict[str, list[Any]] = {
+            f"updated_{name}": [row[name] for row in updated_rows]
+            for name in column_names
+        }
 
-            # Perform the update
-            update_stmt = update(model).where(filter_expression).values(**updated_data)
-            await session.execute(update_stmt, params)
+        async with self._session(model) as session:
+            result = await session.execute(update_stmt, params)
+            updated_results, original_results = _split_returned_rows(
+                result=result,
+                columns=list(table.c),
+                original_column_names=updated_column_names,
+            )
+            await self._commit(session)
+            log.info(f"Updated {len(updated_results)} rows in {table.fullname}")
+
+        _record_rows(model=model, direction="written", count=len(updated_results))
+        # RETURNING does not keep the order of the unnested rows
+        returned_rows: dict[str, tuple[dict[str, Any], dict[str, Any]]] = {
+            str(updated_row["id"]): (updated_row, original_row)
+            for updated_row, original_row in zip(updated_results, original_results)
+        }
+        ordered_rows = [
+            returned_rows[str(row["id"])]
+            for row in updated_rows
+            if str(row["id"]) in returned_rows
+        ]
+        return [updated_row for updated_row, _ in ordered_rows], [
+            original_row for _, original_row in ordered_rows
+        ]
+
+    @traced
+    async def take_token(
+        self, key: str, capacity: float, refill_per_second: float
+    ) -> bool:
+        """Refills the token bucket of the key in the rate_limit table and takes a token from it in a single statement. Returns whether a token was available."""
+        async with self.sessionmaker(bind=self.engine) as session:
+            result = await session.execute(
+                text(
+                    """
+                    INSERT INTO rate_limit (key, tokens, updated_at)
+                    VALUES (:key, :capacity - 1, now())
+                    ON CONFLICT (key) DO UPDATE SET
+                        tokens = LEAST(:capacity, rate_limit.tokens + EXTRACT(EPOCH FROM now() - rate_limit.updated_at) * :refill_per_second) - 1,
+                        updated_at = now()
+                    WHERE LEAST(:capacity, rate_limit.tokens + EXTRACT(EPOCH FROM now() - rate_limit.updated_at) * :refill_per_second) >= 1
+                    RETURNING tokens
+                    """
+                ),
+                {
+                    "key": key,
+                    "capacity": capacity,
+                    "refill_per_second": refill_per_second,
+                },
+            )
+            is_taken: bool = result.first() is not None
             await session.commit()
-
-            # Fetch the updated rows
-            updated_filter_expression, updated_params = _build_filter(
-                model, reverse_filters
+        return is_taken
+
+    @traced
+    async def claim_idempotency_key(
+        self, key: str, fingerprint: str, lock_seconds: float
+    ) -> tuple[bool, Optional[tuple[str, Optional[int], Optional[bytes]]]]:
+        """Claims the key in the idempotency table for lock_seconds, unless it is held by a request that has not expired. Returns whether the key was claimed, and otherwise the fingerprint, status code and body of the request holding it (status code and body are None while it executes, and the whole is None if it was released in the meantime)."""
+        async with self.sessionmaker(bind=self.engine) as session:
+            result = await session.execute(
+                text(
+                    """
+                    INSERT INTO idempotency (key, fingerprint, expires_at)
+                    VALUES (:key, :fingerprint, now() + make_interval(secs => :lock_seconds))
+                    ON CONFLICT (key) DO UPDATE SET
+                        fingerprint = EXCLUDED.fingerprint,
+                        status_code = NULL,
+                        body = NULL,
+                        expires_at = EXCLUDED.expires_at
+                    WHERE idempotency.expires_at < now()
+                    RETURNING key
+                    """
+                ),
+                {"key": key, "fingerprint": fingerprint, "lock_seconds": lock_seconds},
             )
-            updated_where_clause = str(updated_filter_expression)
-            updated_full_query = f"{select_query} WHERE {updated_where_clause}"
-            updated_select_stmt = text(updated_full_query)
-            result = await session.execute(updated_select_stmt, updated_params)
+            is_claimed: bool = result.first() is not None
+            stored: Optional[tuple[str, Optional[int], Optional[bytes]]] = None
+            if not is_claimed:
+                row = (
+                    await session.execute(
+                        text(
+                            "SELECT fingerprint, status_code, body FROM idempotency WHERE key = :key"
+                        ),
+                        {"key": key},
+                    )
+                ).first()
+                if row is not None:
+                    stored = (row.fingerprint, row.status_code, row.body)
+            await session.commit()
+        return is_claimed, stored
 
-            # Convert the updated rows to dictionaries
-            for row in result:
-                row_dict = {}
-                for column, value in zip(columns, row):
-                    row_dict[column] = value
-                updated_results.append(row_dict)
+    @traced
+    async def complete_idempotency_key(
+        self,
+        key: str,
+        fingerprint: str,
+        status_code: int,
+        body: bytes,
+        ttl_seconds: float,
+    ) -> None:
+        """Stores the response of the request that claimed the key, to be replayed for ttl_seconds."""
+        async with self.sessionmaker(bind=self.engine) as session:
+            await session.execute(
+                text(
+                    """
+                    UPDATE idempotency SET
+                        status_code = :status_code,
+                        body = :body,
+                        expires_at = now() + make_interval(secs => :ttl_seconds)
+                    WHERE key = :key AND fingerprint = :fingerprint AND status_code IS NULL
+                    """
+                ),
+                {
+                    "key": key,
+                    "fingerprint": fingerprint,
+                    "status_code": status_code,
+                    "body": body,
+                    "ttl_seconds": ttl_seconds,
+                },
+            )
+            await session.commit()
 
-            log.info(f"Updated {len(updated_results)} rows in database")
+    @traced
+    async def release_idempotency_key(self, key: str, fingerprint: str) -> None:
+        """Releases the key claimed by a request that failed, so that the next attempt executes it again."""
+        async with self.sessionmaker(bind=self.engine) as session:
+            await session.execute(
+                text(
+                    "DELETE FROM idempotency WHERE key = :key AND fingerprint = :fingerprint AND status_code IS NULL"
+                ),
+                {"key": key, "fingerprint": fingerprint},
+            )
+            await session.commit()
 
-        # Create reverse updated_data
-        reverse_updated_data = {}
-        updated_sample = updated_results[0]
-        original_sample = original_results[0]
+    @traced
+    async def notify(self, channel: str, payload: str) -> None:
+        """Sends a notification to the sessions listening on the channel."""
+        async with self.sessionmaker(bind=self.engine) as session:
+            await session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": channel, "payload": payload},
+            )
+            await session.commit()
 
-        for key, value in updated_sample.items():
-            if key == "updated_at":
-                continue
-            if original_sample[key] != value:
-                reverse_updated_data[key] = original_sample[key]
-        return updated_results, reverse_filters, reverse_updated_data
+    @traced
+    async def static_purge_expired(
+        self, orm_model: Type[DeclarativeMeta], batch_size: int
+    ) -> int:
+        """Deletes one batch of the entries of the table whose expires_at has passed, and returns the number of entries deleted."""
+        table = orm_model.__table__
+        (primary_key,) = table.primary_key.columns
+        expired_keys = (
+            select(primary_key)
+            .where(table.c.expires_at < func.now())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.sessionmaker(bind=self._write_engine(self.engine)) as session:
+            result = await session.execute(
+                delete(table).where(primary_key.in_(expired_keys))
+            )
+            await session.commit()
+        return result.rowcount
 
+    @traced
     async def static_get(
         self,
         orm_model: Type[DeclarativeMeta],
         pydantic_model: Type[BaseModel],
         filters: dict[str, Any],
         batch_size: int = 6500,
+        order_by: Optional[list[dict[str, str]]] = None,
+        limit: Optional[int] = None,
+        is_primary: bool = False,
     ) -> list[BaseObject]:
         """Fetches entries from the specified table based on the filters provided.
 
@@ -293,36 +1164,46 @@ class Orm:
             orm_model (Type[DeclarativeMeta]): The SQLAlchemy ORM model to fetch data of.
             pydantic_model (Type[BaseModel]): The pydantic model to validate the ORM model to.
             filters (list[dict): The filters to apply to the query.
+            order_by (Optional[list[dict[str, str]]]): The sort keys, each with a column and an ASC/DESC direction.
+            limit (Optional[int]): The maximum number of entries to return.
+            is_primary (bool): Whether to read from the primary even if a replica is available, for reads that must see what other requests have just written (a replica can lag behind by REPLICA_MAX_LAG_SECONDS).
 
         Returns:
             list[BaseObject]: A list of BaseObject that match the filters.
         """
         results = []
         offset = 0
-        async with self.sessionmaker() as session:
-            while True:
+        if limit is not None:
+            batch_size = min(batch_size, limit)
+        engine: AsyncEngine = (
+            self.engine if is_primary else self._read_engine(self.engine)
+        )
+        async with self.sessionmaker(bind=engine) as session:
+            while limit is None or len(results) < limit:
                 query = select(orm_model)
                 filter_expression, params = _build_filter(orm_model, filters)
                 query = query.filter(filter_expression)
+                if order_by:
+                    query = query.order_by(*_build_order_by(orm_model, order_by))
                 query = query.limit(batch_size).offset(offset)
-                print("QUERY BUILT")
                 batch_results = await session.execute(query, params)
-                print("BATCH EXECUTED")
                 batch_results = batch_results.scalars().all()
-                print(batch_results)
                 if not batch_results:
                     break
 
                 results.extend(batch_results)
                 offset += batch_size
-                log.info(f"Fetching {results} from database")
+                log.debug(
+                    "Fetched %d rows from %s", len(results), orm_model.__tablename__
+                )
 
+        if limit is not None:
+            results = results[:limit]
         if not results:
             return []
-        print("RESULTS")
-        print(results)
         return [pydantic_model.model_validate(result.__dict__) for result in results]
 
+    @traced
     async def static_post(
         self, orm_model: Type[DeclarativeMeta], data: list[dict[str, Any]]
     ) -> list[BaseObject]:
@@ -336,12 +1217,13 @@ class Orm:
             list[BaseObject]: A list of BaseObject that were inserted.
         """
         orm_instances = [orm_model(**item) for item in data]
-        async with self.sessionmaker() as session:
+        async with self.sessionmaker(bind=self._write_engine(self.engine)) as session:
             session.add_all(orm_instances)
             await session.flush()
             await session.commit()
             log.info(f"Inserted {len(data)} rows into {orm_model.__tablename__}")
 
+    @traced
     async def static_update(
         self,
         orm_model: Type[DeclarativeMeta],
@@ -356,7 +1238,7 @@ class Orm:
             filters (dict): The filters to apply to the query.
             updated_data (dict): The updates to apply to the target rows.
         """
-        async with self.sessionmaker() as session:
+        async with self.sessionmaker(bind=self._write_engine(self.engine)) as session:
             filter_expression, params = _build_filter(orm_model, filters)
 
             if increment_field:
@@ -374,10 +1256,109 @@ class Orm:
             await session.commit()
             log.info(f"Updated rows in {orm_model.__tablename__}")
 
+
+def _record_rows(model: Type[DeclarativeMeta], direction: str, count: int) -> None:
+    application_name: Optional[str] = getattr(model, "__application_name__", None)
+    if application_name is not None:
+        ROWS.inc(count, application=application_name, direction=direction)
+
+
+def _split_returned_rows(
+    result: Any, columns: list[Any], original_column_names: list[str]
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Splits the rows returned by an UPDATE that returns the columns (id included) followed by the original values of the updated columns."""
+    updated_rows: list[dict[str, Any]] = []
+    original_rows: list[dict[str, Any]] = []
+    for row in result:
+        updated_row: dict[str, Any] = {
+            column.name: value for column, value in zip(columns, row)
+        }
+        updated_rows.append(updated_row)
+        original_rows.append(
+            {
+                "id": updated_row["id"],
+                **dict(zip(original_column_names, row[len(columns) :])),
+            }
+        )
+    return updated_rows, original_rows
+
+
+def _build_live_filter(model: Type[DeclarativeMeta]):
+    """Excludes the soft deleted rows of tables with soft delete enabled."""
+    if "deleted_at" not in model.__table__.columns:
+        return true()
+    return model.__table__.c.deleted_at.is_(None)
+
+
+def _get_column(model: Type[DeclarativeMeta], name: str):
+    """Returns the column of the model with the provided name."""
+    if name not in model.__table__.columns:
+        raise ValueError(f"Column {name} not found in table {model.__table__.fullname}")
+    return model.__table__.columns[name]
+
+
+def _build_order_by(
+    model: Type[DeclarativeMeta], order_by: Optional[list[dict[str, str]]]
+) -> list[Any]:
+    """Builds the ORDER BY clauses from the provided sort keys."""
+    clauses = []
+    for sort_key in order_by or []:
+        column = _get_column(model, sort_key["column"])
+        direction: str = sort_key.get("direction", "ASC")
+        if direction == "ASC":
+            clauses.append(column.asc())
+        elif direction == "DESC":
+            clauses.append(column.desc())
+        else:
+            raise ValueError(f"Unsupported sort direction: {direction}")
+    return clauses
+
+
+def _build_keyset_filter(
+    model: Type[DeclarativeMeta],
+    sort_keys: list[dict[str, str]],
+    after: dict[str, Any],
+):
+    """Builds the condition selecting the rows that come after the keyset position in the order of the sort keys."""
+    if any(sort_key["column"] not in after for sort_key in sort_keys):
+        raise ValueError("Keyset position does not match the sort keys")
+
+    branches = []
+    for index, sort_key in enumerate(sort_keys):
+        conditions = []
+        for previous_key in sort_keys[:index]:
+            previous_column = _get_column(model, previous_key["column"])
+            previous_value = after[previous_key["column"]]
+            conditions.append(
+                previous_column.is_(None)
+                if previous_value is None
+                else previous_column == previous_value
+            )
+
+        column = _get_column(model, sort_key["column"])
+        value = after[sort_key["column"]]
+        # Postgres sorts NULLs last in ascending order and first in descending order
+        if sort_key.get("direction", "ASC") == "ASC":
+            if value is None:
+                continue
+            conditions.append(or_(column > value, column.is_(None)))
+        else:
+            conditions.append(column.is_not(None) if value is None else column < value)
+        branches.append(and_(*conditions))
+
+    return or_(*branches)
+
+
 def _build_filter(
-    model: Type[DeclarativeMeta], filter_dict: dict[str, Any], param_prefix: str = "p"
+    model: Type[DeclarativeMeta],
+    filter_dict: dict[str, Any],
+    param_prefix: str = "p",
+    column_names: Optional[dict[str, str]] = None,
 ) -> tuple[BinaryExpression, dict]:
-    """Recursively builds a SQLAlchemy filter expression from the provided filter dictionary."""
+    """Recursively builds a SQLAlchemy filter expression from the provided filter dictionary.
+
+    column_names maps the column names of the filter dictionary to the (table qualified) names used in the query, e.g. when tables are joined.
+    """
     if not filter_dict:
         return true(), {}
 
@@ -386,7 +1367,7 @@ def _build_filter(
         params = {}
         for idx, condition in enumerate(filter_dict["conditions"]):
             sub_condition, sub_params = _build_filter(
-                model, condition, f"{param_prefix}_{idx}"
+                model, condition, f"{param_prefix}_{idx}", column_names
             )
             conditions.append(sub_condition)
             params.update(sub_params)
@@ -406,6 +1387,13 @@ def _build_filter(
         "column" in filter_dict and "operator" in filter_dict and "value" in filter_dict
     ):
         column = filter_dict["column"]
+        # The column is interpolated in the SQL, so it must be one of the query
+        if column_names is not None:
+            if column not in column_names:
+                raise ValueError(f"Unknown column in filter: {column}")
+            column = column_names[column]
+        else:
+            column = _get_column(model, column).name
         value = filter_dict["value"]
         param_name = f"{param_prefix}"
         param_dict = {param_name: value}
@@ -424,9 +1412,11 @@ def _build_filter(
 
         if filter_dict["operator"] in operators:
             if filter_dict["operator"] == "IN" and isinstance(value, (list, tuple)):
-                in_params = {f"{param_name}_{i}": v for i, v in enumerate(value)}
-                in_clause = ", ".join(f":{param_name}_{i}" for i in range(len(value)))
-                return text(f"{column} IN ({in_clause})"), in_params
+                # A single array parameter keeps large IN lists (e.g. the ids of a page token) under the bind parameter limit
+                return (
+                    text(f"{column} = ANY(:{param_name})"),
+                    {param_name: list(value)},
+                )
             else:
                 return (
                     text(operators[filter_dict["operator"]].format(column, param_name)),
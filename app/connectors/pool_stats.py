@@ -0,0 +1,153 @@
+import logging
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+from app.stores.utils.metrics import (
+    POOL_CHECKOUT_SECONDS,
+    POOL_CHECKOUT_TIMEOUTS,
+    POOL_CONNECTION_AGE_SECONDS,
+    format_sample,
+)
+
+log = logging.getLogger(__name__)
+
+# In adaptive mode, the max overflow of each engine is raised while checkouts wait on a saturated pool, and lowered while the connections above it go unused, within the limits below
+DATABASE_POOL_ADAPTIVE = (
+    os.environ.get("DATABASE_POOL_ADAPTIVE", "false").lower() == "true"
+)
+DATABASE_MIN_OVERFLOW = int(os.environ.get("DATABASE_MIN_OVERFLOW", "0"))
+# Connections of each engine of each worker (pool size plus max overflow) that adaptive mode never goes beyond. Size it so that workers * engines * this stays below max_connections of Postgres.
+DATABASE_POOL_MAX_CONNECTIONS = int(
+    os.environ.get("DATABASE_POOL_MAX_CONNECTIONS", "30")
+)
+# The pool grows when the mean checkout wait over an interval is above the target
+DATABASE_POOL_TARGET_WAIT_SECONDS = float(
+    os.environ.get("DATABASE_POOL_TARGET_WAIT_SECONDS", "0.05")
+)
+DATABASE_POOL_ADAPT_INTERVAL_SECONDS = float(
+    os.environ.get("DATABASE_POOL_ADAPT_INTERVAL_SECONDS", "30")
+)
+DATABASE_POOL_ADAPT_STEP = int(os.environ.get("DATABASE_POOL_ADAPT_STEP", "2"))
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Records how long each checkout waits for a connection (including opening a new one) and how old the connection is, and in adaptive mode resizes the max overflow at most once per interval based on the checkouts of the interval.
+
+    Only the max overflow is resized. Lowering it is safe while the connections above it are checked out, since the pool closes them when they are returned instead of keeping them.
+    """
+
+    # Label of the metrics of the pool, set once the engine is created
+    database: str = "unknown"
+    # Logs the messages of the pool under the logger of the pool it extends, which is quiet by default
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.adaptive: bool = DATABASE_POOL_ADAPTIVE
+        self.waiting: int = 0
+        self._window_started_at: float = time.monotonic()
+        self._window_checkouts: int = 0
+        self._window_wait_seconds: float = 0
+        self._window_peak_in_use: int = 0
+
+    def capacity(self) -> int:
+        return self.size() + self._max_overflow
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at: float = time.perf_counter()
+        self.waiting += 1
+        try:
+            record: ConnectionPoolEntry = super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc(database=self.database)
+            raise
+        finally:
+            self.waiting -= 1
+        wait_seconds: float = time.perf_counter() - started_at
+        POOL_CHECKOUT_SECONDS.observe(wait_seconds, database=self.database)
+        if record.starttime is not None:
+            POOL_CONNECTION_AGE_SECONDS.observe(
+                time.time() - record.starttime, database=self.database
+            )
+
+        self._window_checkouts += 1
+        self._window_wait_seconds += wait_seconds
+        self._window_peak_in_use = max(self._window_peak_in_use, self.checkedout())
+        if (
+            self.adaptive
+            and time.monotonic() - self._window_started_at
+            >= DATABASE_POOL_ADAPT_INTERVAL_SECONDS
+        ):
+            self._adapt()
+        return record
+
+    def _adapt(self) -> None:
+        mean_wait_seconds: float = self._window_wait_seconds / self._window_checkouts
+        max_overflow: int = self._max_overflow
+        if (
+            mean_wait_seconds > DATABASE_POOL_TARGET_WAIT_SECONDS
+            and self._window_peak_in_use >= self.capacity()
+        ):
+            max_overflow = min(
+                self._max_overflow + DATABASE_POOL_ADAPT_STEP,
+                DATABASE_POOL_MAX_CONNECTIONS - self.size(),
+            )
+        elif (
+            mean_wait_seconds < DATABASE_POOL_TARGET_WAIT_SECONDS / 10
+            and self._window_peak_in_use <= self.capacity() - DATABASE_POOL_ADAPT_STEP
+        ):
+            max_overflow = max(
+                self._max_overflow - DATABASE_POOL_ADAPT_STEP, DATABASE_MIN_OVERFLOW
+            )
+        if max_overflow != self._max_overflow:
+            log.info(
+                f"Resizing the max overflow of the {self.database} pool from {self._max_overflow} to {max_overflow} (mean checkout wait {mean_wait_seconds:.3f}s, peak {self._window_peak_in_use} in use)"
+            )
+            self._max_overflow = max_overflow
+
+        self._window_started_at = time.monotonic()
+        self._window_checkouts = 0
+        self._window_wait_seconds = 0
+        self._window_peak_in_use = 0
+
+    def recreate(self) -> "InstrumentedPool":
+        pool: InstrumentedPool = super().recreate()
+        pool.database = self.database
+        pool.adaptive = self.adaptive
+        return pool
+
+
+def render_pool_metrics(pools: dict[str, Optional[InstrumentedPool]]) -> list[str]:
+    lines: list[str] = []
+    for name, help, read in (
+        (
+            "whale_pool_connections_in_use",
+            "Connections checked out of the pool",
+            lambda pool: pool.checkedout(),
+        ),
+        (
+            "whale_pool_connections_idle",
+            "Open connections waiting in the pool",
+            lambda pool: pool.checkedin(),
+        ),
+        (
+            "whale_pool_capacity",
+            "Connections the pool may open (pool size plus max overflow)",
+            lambda pool: pool.capacity(),
+        ),
+        (
+            "whale_pool_waiting",
+            "Checkouts waiting for a connection",
+            lambda pool: pool.waiting,
+        ),
+    ):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        for database, pool in pools.items():
+            if isinstance(pool, InstrumentedPool):
+                lines.append(format_sample(name, {"database": database}, read(pool)))
+    return lines
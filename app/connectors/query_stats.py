@@ -0,0 +1,103 @@
+import functools
+import logging
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.stores.utils.metrics import STATEMENT_SECONDS
+
+log = logging.getLogger(__name__)
+
+# Statements slower than this are candidates for the slow query log, of which SLOW_QUERY_SAMPLE_RATE are logged
+SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_SECONDS", "0.5"))
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get("SLOW_QUERY_SAMPLE_RATE", "1"))
+
+T = TypeVar("T")
+
+
+@dataclass
+class QueryStats:
+    """The statements executed on behalf of one request."""
+
+    count: int = 0
+    total_seconds: float = 0
+    slowest_seconds: float = 0
+    slowest_statement: Optional[str] = None
+    slowest_caller: Optional[str] = None
+
+
+# Set for the duration of each request. Statements executed outside of a request are only recorded in the metrics.
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# The Orm method (or other code path) on whose behalf the statements are executed
+statement_caller: ContextVar[str] = ContextVar("statement_caller", default="unknown")
+
+
+def traced(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Attributes the statements executed by the method to its name."""
+
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        token = statement_caller.set(method.__name__)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            statement_caller.reset(token)
+
+    return wrapper
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Times every statement executed by the engine, and records it in the stats of the current request and in the metrics."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+def normalize_statement(statement: str) -> str:
+    """Returns the shape of the statement, with literals redacted and lists of bind parameters collapsed, so that statements that only differ by their values look the same."""
+    statement = re.sub(r"'(?:[^']|'')*'", "?", statement)
+    statement = re.sub(r"\$\d+|%\(\w+\)s|\b\d+(?:\.\d+)?\b", "?", statement)
+    statement = re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", statement)
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    conn.info.setdefault("statement_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    seconds: float = time.perf_counter() - conn.info["statement_started_at"].pop()
+    caller: str = statement_caller.get()
+    STATEMENT_SECONDS.observe(seconds, caller=caller)
+
+    stats: Optional[QueryStats] = query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_seconds += seconds
+        if seconds > stats.slowest_seconds:
+            stats.slowest_seconds = seconds
+            stats.slowest_statement = statement
+            stats.slowest_caller = caller
+
+    if seconds >= SLOW_QUERY_SECONDS and random.random() < SLOW_QUERY_SAMPLE_RATE:
+        log.warning(
+            f"Slow query from {caller} took {seconds:.3f}s: {normalize_statement(statement)}"
+        )
+
+
+def _handle_error(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("statement_started_at"):
+        connection.info["statement_started_at"].pop()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+log = logging.getLogger(__name__)
+
+# Comma separated URLs of the read replicas of each database. Reads go to the primary if none are set.
+EXTERNAL_DATABASE_REPLICA_URLS = os.environ.get("EXTERNAL_DATABASE_REPLICA_URLS", "")
+INTERNAL_DATABASE_REPLICA_URLS = os.environ.get("INTERNAL_DATABASE_REPLICA_URLS", "")
+# Replicas further behind the primary than this are skipped until they catch up. Reads go to the primary while every replica is behind or unreachable.
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_SECONDS = float(
+    os.environ.get("REPLICA_HEALTH_CHECK_SECONDS", "5")
+)
+
+# Set once the current request writes to a primary, so that its later reads go to the primary and see the writes
+has_written: ContextVar[bool] = ContextVar("has_written", default=False)
+
+# Seconds since the last replayed transaction, or 0 if the replica has replayed everything it received. Also 0 on a database that is not a replica.
+_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReplicaSet:
+    """Picks the read replica of a database to send a read to, round-robin over the replicas that are reachable and within max_lag_seconds of the primary.
+
+    The replicas are checked at most every health_check_seconds, in the background of the reads that find the last check too old. Until the first check completes, every replica counts as unhealthy and reads go to the primary.
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        create_engine: Callable[[str, int], AsyncEngine],
+        max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+        health_check_seconds: float = REPLICA_HEALTH_CHECK_SECONDS,
+    ):
+        self.engines: list[AsyncEngine] = [
+            create_engine(url, index) for index, url in enumerate(urls)
+        ]
+        self.max_lag_seconds = max_lag_seconds
+        self.health_check_seconds = health_check_seconds
+        self._healthy: list[AsyncEngine] = []
+        self._next: int = 0
+        self._checked_at: float = float("-inf")
+        self._check_task: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[AsyncEngine]:
+        """Returns the engine of the next healthy replica, or None if the read should go to the primary."""
+        if not self.engines:
+            return None
+        if (
+            time.monotonic() - self._checked_at >= self.health_check_seconds
+            and self._check_task is None
+        ):
+            self._check_task = asyncio.create_task(self._check())
+        if not self._healthy:
+            return None
+        self._next = (self._next + 1) % len(self._healthy)
+        return self._healthy[self._next]
+
+    async def dispose(self) -> None:
+        if self._check_task is not None:
+            self._check_task.cancel()
+            try:
+                await self._check_task
+            except asyncio.CancelledError:
+                pass
+        for engine in self.engines:
+            await engine.dispose()
+
+    async def _check(self) -> None:
+        try:
+            lags: list[Optional[float]] = await asyncio.gather(
+                *(self._lag_seconds(engine) for engine in self.engines)
+            )
+            is_first_check: bool = self._checked_at == float("-inf")
+            healthy: list[AsyncEngine] = []
+            for engine, lag in zip(self.engines, lags):
+                if lag is not None and lag <= self.max_lag_seconds:
+                    healthy.append(engine)
+                elif is_first_check or engine in self._healthy:
+                    log.warning(
+                        f"Sending reads of replica {engine.url!r} to the primary ({'unreachable' if lag is None else f'{lag:.1f}s behind'})"
+                    )
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+        finally:
+            self._check_task = None
+
+    async def _lag_seconds(self, engine: AsyncEngine) -> Optional[float]:
+        try:
+            async with engine.connect() as connection:
+                result = await asyncio.wait_for(
+                    connection.execute(_LAG_QUERY), timeout=self.health_check_seconds
+                )
+                return float(result.scalar())
+        except Exception as e:
+            log.debug(f"Error checking the lag of replica {engine.url!r}: {e}")
+            return None
+
+
+def parse_urls(urls: str) -> list[str]:
+    return [url.strip() for url in urls.split(",") if url.strip()]
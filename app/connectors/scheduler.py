@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from app.stores.utils.metrics import format_sample, registry
+
+log = logging.getLogger(__name__)
+
+# Sessions of the external database that may be open at once across every application, kept below the connection pool size so that queries wait in the scheduler instead of in the pool
+SCHEDULER_MAX_CONCURRENCY = int(os.environ.get("SCHEDULER_MAX_CONCURRENCY", "10"))
+SCHEDULER_MAX_CONCURRENCY_PER_APPLICATION = int(
+    os.environ.get("SCHEDULER_MAX_CONCURRENCY_PER_APPLICATION", "3")
+)
+# Comma separated application:weight pairs, e.g. "crm:2,todo:0.5". Applications not listed have a weight of 1.
+SCHEDULER_APPLICATION_WEIGHTS = os.environ.get("SCHEDULER_APPLICATION_WEIGHTS", "")
+# Waits longer than this are logged as a warning
+SCHEDULER_SLOW_WAIT_SECONDS = float(os.environ.get("SCHEDULER_SLOW_WAIT_SECONDS", "1"))
+
+
+@dataclass
+class _ApplicationQueue:
+    weight: float
+    waiters: deque[asyncio.Future] = field(default_factory=deque)
+    running: int = 0
+    # Grants so far divided by the weight. The application with the lowest virtual time is served next.
+    virtual_time: float = 0
+    wait_count: int = 0
+    wait_seconds_total: float = 0
+    wait_seconds_max: float = 0
+
+
+class FairScheduler:
+    """Admits sessions of the external database with a weighted fair queue across applications.
+
+    At most max_concurrency sessions are open at once, and at most max_concurrency_per_application of them for the same application. When a slot frees up, it goes to the waiting application that has been served the least relative to its weight, so a busy application cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+        max_concurrency_per_application: int = SCHEDULER_MAX_CONCURRENCY_PER_APPLICATION,
+        weights: dict[str, float] | None = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_application = max_concurrency_per_application
+        self.weights = (
+            weights
+            if weights is not None
+            else _parse_weights(SCHEDULER_APPLICATION_WEIGHTS)
+        )
+        self._running = 0
+        self._queues: dict[str, _ApplicationQueue] = {}
+
+    @asynccontextmanager
+    async def slot(self, application_name: str) -> AsyncIterator[None]:
+        """Waits for a slot of the application, and holds it until the block exits."""
+        queue: _ApplicationQueue = self._get_queue(application_name)
+        started_at: float = time.monotonic()
+        if not queue.waiters and self._can_run(queue):
+            self._grant(queue)
+        else:
+            future: asyncio.Future = asyncio.get_running_loop().create_future()
+            queue.waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # The slot was granted just as the wait was cancelled
+                    self._release(queue)
+                elif future in queue.waiters:
+                    queue.waiters.remove(future)
+                raise
+        self._record_wait(
+            application_name=application_name,
+            queue=queue,
+            wait_seconds=time.monotonic() - started_at,
+        )
+
+        try:
+            yield
+        finally:
+            self._release(queue)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Returns the queue-wait statistics and current load of each application."""
+        return {
+            application_name: {
+                "running": queue.running,
+                "waiting": len(queue.waiters),
+                "wait_count": queue.wait_count,
+                "wait_seconds_total": queue.wait_seconds_total,
+                "wait_seconds_max": queue.wait_seconds_max,
+            }
+            for application_name, queue in self._queues.items()
+        }
+
+    def _get_queue(self, application_name: str) -> _ApplicationQueue:
+        queue = self._queues.get(application_name)
+        if queue is None:
+            queue = _ApplicationQueue(weight=self.weights.get(application_name, 1))
+            self._queues[application_name] = queue
+        return queue
+
+    def _can_run(self, queue: _ApplicationQueue) -> bool:
+        return (
+            self._running < self.max_concurrency
+            and queue.running < self.max_concurrency_per_application
+        )
+
+    def _grant(self, queue: _ApplicationQueue) -> None:
+        # An application that was idle starts from the lowest virtual time of the busy applications, so that idling does not bank credit to starve the others with later
+        busy_virtual_times: list[float] = [
+            other.virtual_time
+            for other in self._queues.values()
+            if other is not queue and (other.running or other.waiters)
+        ]
+        if not queue.running and not queue.waiters and busy_virtual_times:
+            queue.virtual_time = max(queue.virtual_time, min(busy_virtual_times))
+        queue.virtual_time += 1 / queue.weight
+        queue.running += 1
+        self._running += 1
+
+    def _release(self, queue: _ApplicationQueue) -> None:
+        queue.running -= 1
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency:
+            candidates: list[_ApplicationQueue] = [
+                queue
+                for queue in self._queues.values()
+                if queue.waiters and self._can_run(queue)
+            ]
+            if not candidates:
+                return
+            queue: _ApplicationQueue = min(
+                candidates, key=lambda candidate: candidate.virtual_time
+            )
+            future: asyncio.Future = queue.waiters[0]
+            if future.done():
+                # Cancelled while waiting, it is removed from the queue when its task resumes
+                queue.waiters.popleft()
+                continue
+            self._grant(queue)
+            queue.waiters.popleft()
+            future.set_result(None)
+
+    def _record_wait(
+        self, application_name: str, queue: _ApplicationQueue, wait_seconds: float
+    ) -> None:
+        queue.wait_count += 1
+        queue.wait_seconds_total += wait_seconds
+        queue.wait_seconds_max = max(queue.wait_seconds_max, wait_seconds)
+        if wait_seconds >= SCHEDULER_SLOW_WAIT_SECONDS:
+            log.warning(
+                f"{application_name} waited {wait_seconds:.3f}s for a database slot ({queue.running} running, {len(queue.waiters)} waiting)"
+            )
+
+
+def _render_metrics(scheduler: FairScheduler) -> list[str]:
+    lines: list[str] = []
+    for name, help, metric_type, stat in (
+        (
+            "whale_scheduler_running",
+            "Sessions of the external database open per application",
+            "gauge",
+            "running",
+        ),
+        (
+            "whale_scheduler_waiting",
+            "Sessions of the external database waiting for a slot per application",
+            "gauge",
+            "waiting",
+        ),
+        (
+            "whale_scheduler_wait_seconds_total",
+            "Seconds spent waiting for a slot per application",
+            "counter",
+            "wait_seconds_total",
+        ),
+        (
+            "whale_scheduler_waits_total",
+            "Slots granted per application",
+            "counter",
+            "wait_count",
+        ),
+    ):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for application_name, stats in scheduler.stats().items():
+            lines.append(
+                format_sample(name, {"application": application_name}, stats[stat])
+            )
+    return lines
+
+
+def _parse_weights(weights: str) -> dict[str, float]:
+    parsed: dict[str, float] = {}
+    for pair in weights.split(","):
+        if not pair.strip():
+            continue
+        application_name, weight = pair.rsplit(":", 1)
+        parsed[application_name.strip()] = float(weight)
+    return parsed
+
+
+scheduler = FairScheduler()
+registry.register_collector(lambda: _render_metrics(scheduler))
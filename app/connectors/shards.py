@@ -0,0 +1,117 @@
+import hashlib
+import os
+from bisect import bisect
+from typing import Optional
+
+from app.exceptions.exception import DatabaseError
+
+# Comma separated name=url pairs of the external databases the applications are spread across, e.g. "a=postgresql+asyncpg://...,b=postgresql+asyncpg://...". Every application lives in EXTERNAL_DATABASE_URL if it is not set.
+EXTERNAL_DATABASE_SHARDS = os.environ.get("EXTERNAL_DATABASE_SHARDS", "")
+# Points of each shard on the hash ring. More points spread the applications more evenly.
+SHARD_VIRTUAL_NODES = int(os.environ.get("SHARD_VIRTUAL_NODES", "100"))
+
+# Name of the shard of EXTERNAL_DATABASE_URL when the shards are not configured
+DEFAULT_SHARD = "default"
+
+
+class HashRing:
+    """Consistent hashing of keys onto shards. Adding or removing a shard only moves the keys of the ring segments it gains or loses, about 1/N of them."""
+
+    def __init__(self, shards: list[str], virtual_nodes: int = SHARD_VIRTUAL_NODES):
+        points: list[tuple[int, str]] = sorted(
+            (_hash(f"{shard}#{index}"), shard)
+            for shard in shards
+            for index in range(virtual_nodes)
+        )
+        self._hashes: list[int] = [point for point, _ in points]
+        self._shards: list[str] = [shard for _, shard in points]
+
+    def get(self, key: str) -> str:
+        index: int = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._shards[index]
+
+
+class ShardMap:
+    """Knows the shard the tables of each application live in.
+
+    New applications are placed on their shard on the hash ring, and the placements are kept in the application_shard table of the internal database, so that adding a shard later never moves an application without copying its tables. python -m app.create_tables places the applications that predate the sharding on the default (first) shard, and an application without a placement is an error. The placements are loaded in full when first needed, and the placement of an application again after each of its invalidations.
+    """
+
+    def __init__(self, urls: dict[str, str]):
+        self.urls = urls
+        self.default_shard: str = next(iter(urls))
+        self.ring = HashRing(shards=list(urls))
+        self._placements: Optional[dict[str, str]] = None
+        # Applications whose placement was invalidated since it was loaded
+        self._stale: set[str] = set()
+        # Counts the invalidations, so that a load that an invalidation overtook is not kept
+        self.invalidations: int = 0
+
+    @property
+    def is_sharded(self) -> bool:
+        return len(self.urls) > 1
+
+    def is_loaded(self, application_name: Optional[str] = None) -> bool:
+        """Whether the placements are loaded, and the placement of the application (if any) is up to date."""
+        return self._placements is not None and application_name not in self._stale
+
+    def set_placements(self, placements: dict[str, str], invalidations: int) -> None:
+        """Sets every placement, as loaded when the invalidation count was invalidations."""
+        if invalidations != self.invalidations:
+            return
+        self._placements = {
+            application_name: shard
+            for application_name, shard in placements.items()
+            if shard in self.urls
+        }
+        self._stale.clear()
+
+    def set_placement(
+        self, application_name: str, shard: Optional[str], invalidations: int
+    ) -> None:
+        """Sets the placement of the application, as loaded when the invalidation count was invalidations."""
+        if invalidations != self.invalidations or self._placements is None:
+            return
+        if shard in self.urls:
+            self._placements[application_name] = shard
+        else:
+            self._placements.pop(application_name, None)
+        self._stale.discard(application_name)
+
+    def placement_of(self, application_name: str) -> Optional[str]:
+        return (self._placements or {}).get(application_name)
+
+    def shard_of(self, application_name: str) -> str:
+        if not self.is_sharded:
+            return self.default_shard
+        shard: Optional[str] = self.placement_of(application_name)
+        if shard is None:
+            raise DatabaseError(
+                f"Application {application_name} is not placed on any shard, run python -m app.create_tables to place the applications created before the sharding"
+            )
+        return shard
+
+    def invalidate(self, application_name: Optional[str]) -> None:
+        """Reloads the placement of the application, or every placement if application_name is None, on next use. Subscribed to the invalidation bus, so that every worker picks up a move."""
+        self.invalidations += 1
+        if application_name is None:
+            self._placements = None
+            self._stale.clear()
+            return
+        self._stale.add(application_name)
+        if self._placements is not None:
+            self._placements.pop(application_name, None)
+
+
+def parse_shards(shards: str, default_url: Optional[str]) -> dict[str, str]:
+    urls: dict[str, str] = {}
+    for pair in shards.split(","):
+        if not pair.strip():
+            continue
+        name, url = pair.split("=", 1)
+        urls[name.strip()] = url.strip()
+    return urls or {DEFAULT_SHARD: default_url}
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
@@ -0,0 +1,82 @@
+import logging
+import os
+from typing import Any, Optional
+
+from fastapi import Request
+
+from app.exceptions.exception import UsageLimitExceededError
+from app.stores.utils.rate_limit import TokenBucketStore
+
+log = logging.getLogger(__name__)
+
+RATE_LIMIT_CAPACITY = float(os.environ.get("RATE_LIMIT_CAPACITY", "120"))
+RATE_LIMIT_REFILL_PER_SECOND = float(
+    os.environ.get("RATE_LIMIT_REFILL_PER_SECOND", "2")
+)
+# Requests that run inference get their own, smaller budget on top of the general one
+INFERENCE_RATE_LIMIT_CAPACITY = float(
+    os.environ.get("INFERENCE_RATE_LIMIT_CAPACITY", "10")
+)
+INFERENCE_RATE_LIMIT_REFILL_PER_SECOND = float(
+    os.environ.get("INFERENCE_RATE_LIMIT_REFILL_PER_SECOND", "0.2")
+)
+
+token_bucket_store = TokenBucketStore()
+
+
+async def admit(request: Request) -> None:
+    """Rejects the request with a 429 before it reaches the controller if its user or IP has run out of tokens."""
+    await _take(
+        request=request,
+        prefix="",
+        capacity=RATE_LIMIT_CAPACITY,
+        refill_per_second=RATE_LIMIT_REFILL_PER_SECOND,
+    )
+
+
+async def admit_inference(request: Request) -> None:
+    """Rejects the request with a 429 before any inference is run if its user or IP has run out of inference tokens."""
+    await _take(
+        request=request,
+        prefix="inference:",
+        capacity=INFERENCE_RATE_LIMIT_CAPACITY,
+        refill_per_second=INFERENCE_RATE_LIMIT_REFILL_PER_SECOND,
+    )
+
+
+async def _take(
+    request: Request, prefix: str, capacity: float, refill_per_second: float
+) -> None:
+    keys: list[str] = []
+    user_id: Optional[str] = await _get_user_id(request)
+    if user_id:
+        keys.append(f"{prefix}user:{user_id}")
+    if request.client:
+        keys.append(f"{prefix}ip:{request.client.host}")
+
+    for key in keys:
+        retry_after: Optional[float] = await token_bucket_store.take(
+            key=key, capacity=capacity, refill_per_second=refill_per_second
+        )
+        if retry_after is not None:
+            log.info(f"Rate limit exceeded for {key}, retry after {retry_after}s")
+            raise UsageLimitExceededError(
+                message="Too many requests, please try again later",
+                retry_after=retry_after,
+            )
+
+
+async def _get_user_id(request: Request) -> Optional[str]:
+    user_id: Optional[str] = request.query_params.get("user_id")
+    if user_id:
+        return user_id
+    if request.method not in ("POST", "PUT", "PATCH"):
+        return None
+    try:
+        # The body is cached on the request, so the endpoint does not read it again
+        body: Any = await request.json()
+    except ValueError:
+        return None
+    if isinstance(body, dict) and body.get("user_id"):
+        return str(body["user_id"])
+    return None
@@ -1,12 +1,14 @@
 import logging
+from typing import Optional
 
-import requests
-from fastapi import APIRouter, HTTPException
+import httpx
+from fastapi import APIRouter, Header, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 
 from app.api.inference.create import infer_create
 from app.api.inference.use import infer_use
+from app.controllers.admission import admit_inference
 from app.models.inference.create import CreateInferenceRequest, CreateInferenceResponse
 from app.models.inference.use import (
     ApplicationContent,
@@ -14,10 +16,14 @@ from app.models.inference.use import (
     UseInferenceResponse,
 )
 from app.models.message.create import CreateMessage, CreateRequest, CreateResponse
-from app.models.message.reverse import ReverseActionWrapper
+from app.models.message.reverse import ReverseActionWrapper, ReverseBatchRequest
+from app.models.message.rows import RowsRequest, RowsResponse
 from app.models.message.shared import Role
 from app.models.message.use import UseMessage, UseRequest, UseResponse
 from app.services.message import MessageService
+from app.stores.utils.idempotency import IdempotencyStore
+from app.stores.utils.log import truncate
+from app.stores.utils.metrics import STAGE_SECONDS
 
 log = logging.getLogger(__name__)
 
@@ -29,6 +35,8 @@ class MessageController:
     def __init__(self, service: MessageService):
         self.router = APIRouter()
         self.service = service
+        # Retries of /use and /create with the same Idempotency-Key header replay the first response instead of running inference again
+        self.idempotency_store = IdempotencyStore()
         self.setup_routes()
 
     def setup_routes(self):
@@ -36,35 +44,54 @@ class MessageController:
         router = self.router
 
         @router.post("/use")
-        async def use(input: UseRequest) -> JSONResponse:
+        async def use(
+            request: Request,
+            input: UseRequest,
+            idempotency_key: Optional[str] = Header(default=None),
+        ) -> Response:
+            return await self.idempotency_store.run(
+                scope="use",
+                key=idempotency_key,
+                request=input,
+                execute=lambda: execute_use(request=request, input=input),
+            )
+
+        async def execute_use(request: Request, input: UseRequest) -> JSONResponse:
+            # Charged only when inference runs, so that replays of a stored response are free
+            await admit_inference(request)
             try:
-                application_content_lst: list[ApplicationContent] = (
-                    await self.service.get_application_content_lst(
-                        application_names=input.application_names
+                with STAGE_SECONDS.time(stage="schema"):
+                    application_content_lst: list[ApplicationContent] = (
+                        await self.service.get_application_content_lst(
+                            application_names=input.application_names
+                        )
                     )
+                log.debug(
+                    "Application content list: %s", truncate(application_content_lst)
                 )
-                log.info(f"Application content list: {application_content_lst}")
-                inference_response: UseInferenceResponse = infer_use(
+                inference_response: UseInferenceResponse = await infer_use(
                     input=UseInferenceRequest(
                         applications=application_content_lst,
                         message=input.message,
                         chat_history=input.chat_history,
                     )
                 )
-                log.info(f"Inference response: {inference_response}")
-                result: UseResponse = await self.service.execute_inference_response(
-                    user_message=UseMessage(role=Role.USER, content=input.message),
-                    chat_history=input.chat_history,
-                    reverse_stack=input.reverse_stack,
-                    inference_response=inference_response,
-                    user_id=input.user_id,
-                )
-                log.info(f"Returning result to frontend: {result.model_dump()}")
-                return JSONResponse(status_code=200, content=result.model_dump())
+                log.debug("Inference response: %s", truncate(inference_response))
+                with STAGE_SECONDS.time(stage="execute"):
+                    result: UseResponse = await self.service.execute_inference_response(
+                        user_message=UseMessage(role=Role.USER, content=input.message),
+                        chat_history=input.chat_history,
+                        reverse_stack=input.reverse_stack,
+                        inference_response=inference_response,
+                        user_id=input.user_id,
+                    )
+                log.debug("Returning result to frontend: %s", truncate(result))
+                with STAGE_SECONDS.time(stage="serialization"):
+                    return JSONResponse(status_code=200, content=result.model_dump())
             except ValidationError as e:
                 log.error("Validation error: %s", str(e))
                 raise HTTPException(status_code=422, detail="Validation error") from e
-            except requests.RequestException as e:
+            except httpx.HTTPError as e:
                 log.error(f"Failed to infer response from server: {e}")
                 raise HTTPException(
                     status_code=422, detail="Inference error occurred"
@@ -76,30 +103,51 @@ class MessageController:
                 ) from e
 
         @router.post("/create")
-        async def create(input: CreateRequest) -> JSONResponse:
+        async def create(
+            request: Request,
+            input: CreateRequest,
+            idempotency_key: Optional[str] = Header(default=None),
+        ) -> Response:
+            return await self.idempotency_store.run(
+                scope="create",
+                key=idempotency_key,
+                request=input,
+                execute=lambda: execute_create(request=request, input=input),
+            )
+
+        async def execute_create(
+            request: Request, input: CreateRequest
+        ) -> JSONResponse:
+            await admit_inference(request)
             try:
-                inference_response: CreateInferenceResponse = infer_create(
+                inference_response: CreateInferenceResponse = await infer_create(
                     input=CreateInferenceRequest(
                         message=input.message,
                         chat_history=input.chat_history,
                     )
                 )
-                result: CreateResponse = await self.service.construct_create_response(
-                    user_message=CreateMessage(role=Role.USER, content=input.message),
-                    chat_history=input.chat_history,
-                    overview=inference_response.overview,
-                    clarification=inference_response.clarification,
-                    concluding_message=inference_response.concluding_message,
-                    application_content=inference_response.application_content,
-                    user_id=input.user_id,
-                    all_application_names=input.all_application_names,
-                )
-                log.info(f"Returning result to frontend: {result.model_dump()}")
-                return JSONResponse(status_code=200, content=result.model_dump())
+                with STAGE_SECONDS.time(stage="build"):
+                    result: CreateResponse = (
+                        await self.service.construct_create_response(
+                            user_message=CreateMessage(
+                                role=Role.USER, content=input.message
+                            ),
+                            chat_history=input.chat_history,
+                            overview=inference_response.overview,
+                            clarification=inference_response.clarification,
+                            concluding_message=inference_response.concluding_message,
+                            application_content=inference_response.application_content,
+                            user_id=input.user_id,
+                            all_application_names=input.all_application_names,
+                        )
+                    )
+                log.debug("Returning result to frontend: %s", truncate(result))
+                with STAGE_SECONDS.time(stage="serialization"):
+                    return JSONResponse(status_code=200, content=result.model_dump())
             except ValidationError as e:
                 log.error("Validation error: %s", str(e))
                 raise HTTPException(status_code=422, detail="Validation error") from e
-            except requests.RequestException as e:
+            except httpx.HTTPError as e:
                 log.error(f"Failed to infer response from server: {e}")
                 raise HTTPException(
                     status_code=422, detail="Inference error occurred"
@@ -110,6 +158,22 @@ class MessageController:
                     status_code=500, detail="An unexpected error occurred"
                 ) from e
 
+        @router.post("/rows")
+        async def rows(input: RowsRequest) -> JSONResponse:
+            try:
+                result: RowsResponse = await self.service.get_rows(
+                    page_token=input.page_token
+                )
+                return JSONResponse(status_code=200, content=result.model_dump())
+            except ValueError as e:
+                log.error("Invalid page token: %s", str(e))
+                raise HTTPException(status_code=422, detail=str(e)) from e
+            except Exception as e:
+                log.error("Unexpected error in message controller.py: %s", str(e))
+                raise HTTPException(
+                    status_code=500, detail="An unexpected error occurred"
+                ) from e
+
         @router.post("/reverse")
         async def reverse(input: ReverseActionWrapper) -> JSONResponse:
             try:
@@ -117,7 +181,21 @@ class MessageController:
                 return JSONResponse(status_code=200, content={"message": "Success"})
             except ValidationError as e:
                 log.error("Validation error: %s", str(e))
-                return HTTPException(status_code=422, detail=str(e))
+                raise HTTPException(status_code=422, detail=str(e)) from e
+            except Exception as e:
+                log.error("Unexpected error in message controller.py: %s", str(e))
+                raise HTTPException(
+                    status_code=500, detail="An unexpected error occurred"
+                ) from e
+
+        @router.post("/reverse/batch")
+        async def reverse_batch(input: ReverseBatchRequest) -> JSONResponse:
+            try:
+                await self.service.reverse_inference_responses(inputs=input.actions)
+                return JSONResponse(status_code=200, content={"message": "Success"})
+            except ValueError as e:
+                log.error("Invalid reverse actions: %s", str(e))
+                raise HTTPException(status_code=422, detail=str(e)) from e
             except Exception as e:
                 log.error("Unexpected error in message controller.py: %s", str(e))
                 raise HTTPException(
@@ -0,0 +1,26 @@
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.stores.utils.worker_metrics import WorkerMetrics
+
+log = logging.getLogger(__name__)
+
+
+class MetricsController:
+
+    def __init__(self, worker_metrics: WorkerMetrics):
+        self.router = APIRouter()
+        self.worker_metrics = worker_metrics
+        self.setup_routes()
+
+    def setup_routes(self):
+        router = self.router
+
+        @router.get("")
+        async def metrics() -> PlainTextResponse:
+            return PlainTextResponse(
+                content=await self.worker_metrics.render(),
+                media_type="text/plain; version=0.0.4; charset=utf-8",
+            )
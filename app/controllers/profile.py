@@ -0,0 +1,41 @@
+import logging
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from app.exceptions.exception import UnauthorizedAccess
+from app.stores.utils.profiler import PROFILER_ADMIN_TOKEN, ProfileStore
+
+log = logging.getLogger(__name__)
+
+
+class ProfileController:
+
+    def __init__(self, store: ProfileStore):
+        self.router = APIRouter()
+        self.store = store
+        self.setup_routes()
+
+    def setup_routes(self):
+        router = self.router
+
+        @router.get("/{profile_id}")
+        async def get(
+            profile_id: str,
+            format: Literal["speedscope", "collapsed"] = "speedscope",
+            x_admin_token: Optional[str] = Header(default=None),
+        ) -> Response:
+            if not PROFILER_ADMIN_TOKEN or x_admin_token != PROFILER_ADMIN_TOKEN:
+                raise UnauthorizedAccess("Invalid admin token")
+            if format == "collapsed":
+                collapsed: Optional[str] = self.store.load_collapsed(profile_id)
+                if collapsed is None:
+                    raise HTTPException(status_code=404, detail="Profile not found")
+                return PlainTextResponse(content=collapsed)
+            speedscope: Optional[dict[str, Any]] = self.store.load_speedscope(
+                profile_id
+            )
+            if speedscope is None:
+                raise HTTPException(status_code=404, detail="Profile not found")
+            return JSONResponse(status_code=200, content=speedscope)
@@ -9,6 +9,7 @@ from app.models.application.select import SelectApplicationResponse
 from app.models.user import GetCacheResponse, UpdateCacheRequest
 from app.services.application import ApplicationService
 from app.services.user import UserService
+from app.stores.utils.log import truncate
 
 log = logging.getLogger(__name__)
 
@@ -27,7 +28,7 @@ class UserController:
 
         @router.patch("/cache/update")
         async def update_cache(input: UpdateCacheRequest) -> JSONResponse:
-            print(input)
+            log.debug("Update cache request: %s", truncate(input))
             try:
                 await self.service.update(
                     filters={
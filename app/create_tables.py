@@ -0,0 +1,35 @@
+import asyncio
+import logging
+
+from app.connectors.orm import dispose_engines, get_engine
+from app.services.schema import SchemaService
+from app.services.shard import ShardService
+from app.stores.base.main import execute_script
+from app.stores.sqls.internal import INTERNAL_TABLE_SCRIPTS
+from app.stores.utils.log import configure_logging
+
+log = logging.getLogger(__name__)
+
+
+async def create_tables() -> None:
+    """Creates the tables of the internal database that do not exist yet, in a single transaction, places the applications created before the sharding on the default shard and moves the tables of the applications created before the schemas into their schema."""
+    try:
+        async with get_engine(is_user_facing=False).begin() as connection:
+            for table_name, script in INTERNAL_TABLE_SCRIPTS.items():
+                await execute_script(connection=connection, sql_script=script)
+                log.info(f"Created table {table_name} if it did not exist")
+        await ShardService().place_existing_applications()
+        # The applications must be placed first, their tables are moved on their shard
+        await SchemaService().migrate_existing_applications()
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    """Creates the tables of the internal database that the server needs, e.g. python -m app.create_tables"""
+    configure_logging()
+    asyncio.run(create_tables())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,27 @@
+import math
+from typing import Optional
+
 from fastapi import HTTPException, status
 
 
 class UsageLimitExceededError(HTTPException):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=message,
+            headers=(
+                {"Retry-After": str(math.ceil(retry_after))}
+                if retry_after is not None
+                else None
+            ),
+        )
+
+
+class IdempotencyKeyReusedError(HTTPException):
     def __init__(self, message: str):
-        super().__init__(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=message)
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=message
+        )
 
 
 class UnauthorizedAccess(HTTPException):
@@ -1,21 +1,71 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.session import close_http_client, get_http_client
+from app.connectors.notify import invalidation_bus
+from app.connectors.orm import dispose_engines, shard_map
+from app.controllers.admission import admit
 from app.controllers.application import ApplicationController
 from app.controllers.feeedback import FeedbackController
 from app.controllers.message import MessageController
+from app.controllers.metrics import MetricsController
+from app.controllers.profile import ProfileController
 from app.controllers.user import UserController
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.profiler import ProfilerMiddleware
+from app.middlewares.query_stats import QueryStatsMiddleware
+from app.models.stores.dynamic import evict_dynamic_orms
 from app.services.application import ApplicationService
 from app.services.feedback import FeedbackService
 from app.services.message import MessageService
+from app.services.purge import PurgeService
 from app.services.user import UserService
+from app.services.warmup import WARMUP_ENABLED, WarmupService
+from app.stores.utils.application_cache import application_content_cache
+from app.stores.utils.log import configure_logging
+from app.stores.utils.loop_monitor import LOOP_MONITOR_ENABLED, loop_monitor
+from app.stores.utils.profiler import profile_store
+from app.stores.utils.worker_metrics import worker_metrics
 
+configure_logging()
 log = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # The HTTP client is shared by every request of the worker, the engines are created on first use
+    get_http_client()
+    invalidation_bus.subscribe(application_content_cache.invalidate)
+    invalidation_bus.subscribe(evict_dynamic_orms)
+    invalidation_bus.subscribe(shard_map.invalidate)
+    invalidation_bus.start()
+    if WARMUP_ENABLED:
+        try:
+            await WarmupService().warm_up()
+        except Exception as e:
+            log.error(f"Error warming up: {e}")
+    purge_task: asyncio.Task = asyncio.create_task(PurgeService().run())
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    worker_metrics.start()
+    yield
+    # The server has stopped accepting requests and drained the in-flight ones by now
+    purge_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await purge_task
+    await invalidation_bus.stop()
+    await loop_monitor.stop()
+    await worker_metrics.stop()
+    await close_http_client()
+    await dispose_engines()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Set up CORS middleware
 app.add_middleware(
@@ -25,6 +75,17 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
 )
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+def get_metrics_controller_router():
+    return MetricsController(worker_metrics=worker_metrics).router
+
+
+def get_profile_controller_router():
+    return ProfileController(store=profile_store).router
 
 
 def get_application_controller_router():
@@ -47,11 +108,34 @@ def get_feedback_controller_router():
     return FeedbackController(service=service).router
 
 
+# Every request is admitted against the token buckets of its user and IP before any database or ML work is done
+app.include_router(
+    get_application_controller_router(),
+    tags=["application"],
+    prefix="/application",
+    dependencies=[Depends(admit)],
+)
+app.include_router(
+    get_message_controller_router(),
+    tags=["message"],
+    prefix="/message",
+    dependencies=[Depends(admit)],
+)
+app.include_router(
+    get_user_controller_router(),
+    tags=["user"],
+    prefix="/user",
+    dependencies=[Depends(admit)],
+)
 app.include_router(
-    get_application_controller_router(), tags=["application"], prefix="/application"
+    get_feedback_controller_router(),
+    tags=["feedback"],
+    prefix="/feedback",
+    dependencies=[Depends(admit)],
 )
-app.include_router(get_message_controller_router(), tags=["message"], prefix="/message")
-app.include_router(get_user_controller_router(), tags=["user"], prefix="/user")
+# Scraped by Prometheus, so it is not admitted against the rate limits. Any worker serves the metrics of every worker.
+app.include_router(get_metrics_controller_router(), tags=["metrics"], prefix="/metrics")
+# Only served to the admin token, so it is not admitted against the rate limits
 app.include_router(
-    get_feedback_controller_router(), tags=["feedback"], prefix="/feedback"
+    get_profile_controller_router(), tags=["profile"], prefix="/profiles"
 )
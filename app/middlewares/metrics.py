@@ -0,0 +1,45 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.stores.utils.metrics import REQUEST_SECONDS, RESPONSE_BYTES
+
+
+class MetricsMiddleware:
+    """Records the latency and response size of each HTTP request by route. Written as a plain ASGI middleware so that responses are not buffered."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at: float = time.perf_counter()
+        status: int = 500
+        response_bytes: int = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router sets the matched route on the scope. Unmatched paths share one label so that they cannot grow the number of series.
+            route = scope.get("route")
+            route_path: str = getattr(route, "path", "unmatched")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started_at,
+                method=scope["method"],
+                route=route_path,
+                status=str(status),
+            )
+            RESPONSE_BYTES.observe(
+                response_bytes, method=scope["method"], route=route_path
+            )
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import uuid
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.stores.utils.profiler import (
+    PROFILER_ADMIN_TOKEN,
+    ProfileStore,
+    StackSampler,
+    profile_store,
+)
+
+log = logging.getLogger(__name__)
+
+# Fraction of the requests profiled without the header
+PROFILER_SAMPLE_RATE = float(os.environ.get("PROFILER_SAMPLE_RATE", "0"))
+# Requests beyond this many profiled at once are not profiled, to bound the overhead
+PROFILER_MAX_CONCURRENT = int(os.environ.get("PROFILER_MAX_CONCURRENT", "2"))
+
+
+class ProfilerMiddleware:
+    """Profiles the CPU time of requests asked for by an admin or picked at the sample rate, covering request validation, the endpoint and response serialization. The id of the profile is returned in the X-Profile-Id header."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore = profile_store,
+        admin_token: Optional[str] = PROFILER_ADMIN_TOKEN,
+        sample_rate: float = PROFILER_SAMPLE_RATE,
+        max_concurrent: int = PROFILER_MAX_CONCURRENT,
+    ):
+        self.app = app
+        self.store = store
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.max_concurrent = max_concurrent
+        self._running = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id: str = uuid.uuid4().hex
+        sampler = StackSampler(marker=sys._getframe(), thread_id=threading.get_ident())
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", profile_id.encode()),
+                ]
+            await send(message)
+
+        self._running += 1
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._running -= 1
+            sampler.stop()
+            try:
+                await asyncio.to_thread(self._save, profile_id, sampler)
+                log.info(f"Saved profile {profile_id} of {scope['path']}")
+            except OSError as e:
+                log.error(f"Error saving profile {profile_id}: {e}")
+
+    def _save(self, profile_id: str, sampler: StackSampler) -> None:
+        sampler.join()
+        self.store.save(profile_id=profile_id, stacks=sampler.stacks)
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if self._running >= self.max_concurrent:
+            return False
+        if (
+            self.admin_token
+            and Headers(scope=scope).get("x-profile") == self.admin_token
+        ):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
@@ -0,0 +1,46 @@
+import os
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.connectors.query_stats import QueryStats, query_stats
+from app.stores.utils.metrics import REQUEST_DB_SECONDS, REQUEST_STATEMENTS
+
+# Adds the statement count and database time of each request to its response headers
+DEBUG_QUERY_STATS = os.environ.get("DEBUG_QUERY_STATS", "false").lower() == "true"
+
+
+class QueryStatsMiddleware:
+    """Counts the SQL statements executed for each HTTP request and the time spent on them."""
+
+    def __init__(self, app: ASGIApp, debug: bool = DEBUG_QUERY_STATS):
+        self.app = app
+        self.debug = debug
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if self.debug and message["type"] == "http.response.start":
+                # The endpoint has returned by the time the response starts, so every statement is counted
+                header: str = (
+                    f"count={stats.count}; total_ms={stats.total_seconds * 1000:.1f}; "
+                    f"slowest_ms={stats.slowest_seconds * 1000:.1f}; slowest_caller={stats.slowest_caller}"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-query-stats", header.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.reset(token)
+            route_path: str = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_STATEMENTS.observe(stats.count, route=route_path)
+            REQUEST_DB_SECONDS.observe(stats.total_seconds, route=route_path)
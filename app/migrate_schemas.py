@@ -0,0 +1,22 @@
+import asyncio
+
+from app.connectors.orm import dispose_engines
+from app.services.schema import SchemaService
+from app.stores.utils.log import configure_logging
+
+
+async def migrate() -> None:
+    try:
+        await SchemaService().migrate_existing_applications()
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    """Moves the tables of every application from the public schema to the schema of the application, e.g. python -m app.migrate_schemas. python -m app.create_tables does it too."""
+    configure_logging()
+    asyncio.run(migrate())
+
+
+if __name__ == "__main__":
+    main()
@@ -114,6 +114,8 @@ class Table(BaseModel):
     primary_key: PrimaryKey
     enable_created_at_timestamp: Optional[bool] = False
     enable_updated_at_timestamp: Optional[bool] = False
+    # Deleted rows are kept with a deleted_at timestamp until they are purged, so that a DELETE can be undone without re-inserting the rows
+    enable_soft_delete: Optional[bool] = False
 
     def __init__(self, **data):
         super().__init__(**data)
@@ -133,6 +135,15 @@ class Table(BaseModel):
 class ApplicationContent(BaseModel):
     name: str
     tables: list[Table]
+    enable_soft_delete: Optional[bool] = False
 
     class Config:
         extra = "forbid"
+
+    @model_validator(mode="after")
+    def set_soft_delete_of_tables(self) -> "ApplicationContent":
+        # Soft delete is chosen per application but stored on each table, which is what the tables are generated from
+        if self.enable_soft_delete:
+            for table in self.tables:
+                table.enable_soft_delete = True
+        return self
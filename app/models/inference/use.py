@@ -1,9 +1,9 @@
 from enum import StrEnum
 from typing import Any, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
-from app.models.application.base import ApplicationContent
+from app.models.application.base import ApplicationContent, DataType, PrimaryKey, Table
 from app.models.message.use import UseMessage
 
 
@@ -12,6 +12,65 @@ class HttpMethod(StrEnum):
     POST = "POST"
     PUT = "PUT"
     DELETE = "DELETE"
+    AGGREGATE = "AGGREGATE"
+
+
+class AggregateFunction(StrEnum):
+    COUNT = "COUNT"
+    SUM = "SUM"
+    AVG = "AVG"
+    MIN = "MIN"
+    MAX = "MAX"
+
+
+_NUMERIC_DATA_TYPES: frozenset[DataType] = frozenset({DataType.INTEGER, DataType.FLOAT})
+# PostgreSQL has no MIN/MAX over booleans or UUIDs
+_ORDERED_DATA_TYPES: frozenset[DataType] = _NUMERIC_DATA_TYPES | {
+    DataType.STRING,
+    DataType.DATE,
+    DataType.DATETIME,
+    DataType.ENUM,
+}
+AGGREGATE_DATA_TYPES: dict[AggregateFunction, frozenset[DataType]] = {
+    AggregateFunction.COUNT: frozenset(DataType),
+    AggregateFunction.SUM: _NUMERIC_DATA_TYPES,
+    AggregateFunction.AVG: _NUMERIC_DATA_TYPES,
+    AggregateFunction.MIN: _ORDERED_DATA_TYPES,
+    AggregateFunction.MAX: _ORDERED_DATA_TYPES,
+}
+
+
+class Aggregation(BaseModel):
+    function: AggregateFunction
+    # Only COUNT may omit the column, in which case it counts rows (COUNT(*))
+    column: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_column(self) -> "Aggregation":
+        if self.column is None and self.function != AggregateFunction.COUNT:
+            raise ValueError(f"A column must be provided for {self.function}.")
+        return self
+
+    @property
+    def alias(self) -> str:
+        if self.column is None:
+            return self.function.lower()
+        return f"{self.function.lower()}_{self.column}"
+
+
+class ConflictAction(StrEnum):
+    UPDATE = "UPDATE"
+    NOTHING = "NOTHING"
+
+
+class SortDirection(StrEnum):
+    ASC = "ASC"
+    DESC = "DESC"
+
+
+class OrderBy(BaseModel):
+    column: str
+    direction: SortDirection = SortDirection.ASC
 
 
 class UseInferenceRequest(BaseModel):
@@ -25,10 +84,76 @@ class HttpMethodResponse(BaseModel):
     application: ApplicationContent
     table_name: str
     inserted_rows: Optional[list[dict[str, Any]]] = None
+    # Upserts the inserted rows on a unique column of the table instead of failing when a row with the same value already exists
+    on_conflict: Optional[ConflictAction] = None
     filter_conditions: Optional[dict[str, Any]] = None
     updated_data: Optional[dict[str, Any]] = None
+    aggregations: Optional[list[Aggregation]] = None
+    group_by: Optional[list[str]] = None
+    selected_columns: Optional[list[str]] = None
+    order_by: Optional[list[OrderBy]] = None
+    limit: Optional[int] = Field(default=None, gt=0)
+    # Tables of the same application joined to the GET through their foreign keys
+    join_tables: Optional[list[str]] = None
+
+    @model_validator(mode="after")
+    def validate_aggregations(self) -> "HttpMethodResponse":
+        """Rejects aggregations that the database would fail on, such as a SUM over a text column, or that would overwrite each other in the result rows."""
+        if not self.aggregations:
+            return self
+        aliases: list[str] = [aggregation.alias for aggregation in self.aggregations]
+        duplicated_aliases: list[str] = sorted(
+            {alias for alias in aliases if aliases.count(alias) > 1}
+        )
+        if duplicated_aliases:
+            raise ValueError(
+                f"Aggregations must be unique. Duplicated aggregations: {duplicated_aliases}"
+            )
+
+        table: Optional[Table] = next(
+            (
+                table
+                for table in self.application.tables
+                if table.name == self.table_name
+            ),
+            None,
+        )
+        if table is None:
+            return self
+        data_types: dict[str, DataType] = _get_column_data_types(table=table)
+        for aggregation in self.aggregations:
+            if aggregation.column is None:
+                continue
+            data_type: Optional[DataType] = data_types.get(aggregation.column)
+            if data_type is None:
+                raise ValueError(
+                    f"Column {aggregation.column} not found in table {table.name}"
+                )
+            if data_type not in AGGREGATE_DATA_TYPES[aggregation.function]:
+                raise ValueError(
+                    f"{aggregation.function} cannot be computed over column {aggregation.column} of type {data_type}"
+                )
+        return self
 
 
 class UseInferenceResponse(BaseModel):
     response: list[HttpMethodResponse]
     clarification: Optional[str] = None
+
+
+def _get_column_data_types(table: Table) -> dict[str, DataType]:
+    """Returns the data type of every column of the table, including the columns the table is created with."""
+    data_types: dict[str, DataType] = {
+        "id": (
+            DataType.INTEGER
+            if table.primary_key == PrimaryKey.AUTO_INCREMENT
+            else DataType.UUID
+        )
+    }
+    for column in table.columns:
+        data_types[column.name] = column.data_type
+    if table.enable_created_at_timestamp:
+        data_types["created_at"] = DataType.DATETIME
+    if table.enable_updated_at_timestamp:
+        data_types["updated_at"] = DataType.DATETIME
+    return data_types
@@ -1,4 +1,4 @@
-from typing import Any, Literal
+from typing import Any, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -21,8 +21,12 @@ class ReverseActionDelete(ReverseAction):
 
 class ReverseActionUpdate(ReverseAction):
     action_type: Literal["update"] = "update"
-    reverse_filter_conditions: dict[str, Any]
-    reverse_updated_data: dict[str, Any]
+    # The id and original values of the updated columns of each row. Empty when the rows are too large to be returned and are kept in a snapshot instead
+    reverse_rows: list[dict[str, Any]] = []
+    snapshot_id: Optional[str] = None
+    # Only set by reverse actions created before the original values of each row were kept
+    reverse_filter_conditions: Optional[dict[str, Any]] = None
+    reverse_updated_data: Optional[dict[str, Any]] = None
     target_table: Table
     application_name: str
 
@@ -32,7 +36,34 @@ class ReverseActionUpdate(ReverseAction):
 
 class ReverseActionPost(ReverseAction):
     action_type: Literal["post"] = "post"
-    deleted_data: list[dict[str, Any]]
+    # Empty when the deleted rows are too large to be returned and are kept in a snapshot instead
+    deleted_data: list[dict[str, Any]] = []
+    snapshot_id: Optional[str] = None
+    target_table: Table
+    application_name: str
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class ReverseActionRestore(ReverseAction):
+    action_type: Literal["restore"] = "restore"
+    # Empty when the ids are too large to be returned and are kept in a snapshot instead
+    ids: list[Any] = []
+    snapshot_id: Optional[str] = None
+    target_table: Table
+    application_name: str
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class ReverseActionUpsert(ReverseAction):
+    action_type: Literal["upsert"] = "upsert"
+    # The ids of the inserted rows
+    ids: list[Any] = []
+    # The id and original values of the updated columns of each row that was updated instead of inserted
+    reverse_rows: list[dict[str, Any]] = []
     target_table: Table
     application_name: str
 
@@ -52,6 +83,8 @@ ReverseActionUnion = (
     ReverseActionDelete
     | ReverseActionUpdate
     | ReverseActionPost
+    | ReverseActionRestore
+    | ReverseActionUpsert
     | ReverseActionGet
     | ReverseActionClarification
 )
@@ -59,3 +92,8 @@ ReverseActionUnion = (
 
 class ReverseActionWrapper(BaseModel):
     action: ReverseActionUnion = Field(..., discriminator="action_type")
+
+
+class ReverseBatchRequest(BaseModel):
+    # Ordered from the most recent action, i.e. the top of the reverse stack
+    actions: list[ReverseActionWrapper]
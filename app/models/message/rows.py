@@ -0,0 +1,28 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from app.models.inference.use import OrderBy
+
+
+class PageToken(BaseModel):
+    application_name: str
+    table_name: str
+    filter_conditions: dict[str, Any]
+    selected_columns: Optional[list[str]] = None
+    order_by: Optional[list[OrderBy]] = None
+    # Values of the sort keys (followed by id) of the last row that was returned
+    after: Optional[dict[str, Any]] = None
+    # Rows left before the limit of the original request is reached
+    remaining: Optional[int] = None
+    # Snapshot of the ids of the rows of the page (and of the snapshot of the next page), for pages of rows that no filter can find again, e.g. the rows updated by a PUT
+    snapshot_id: Optional[str] = None
+
+
+class RowsRequest(BaseModel):
+    page_token: str
+
+
+class RowsResponse(BaseModel):
+    rows: list[dict[str, Any]]
+    next_page_token: Optional[str] = None
@@ -8,6 +8,9 @@ from app.models.message.shared import Message
 
 class UseMessage(Message):
     rows: Optional[list[dict[str, Any]]] = None
+    # Set when the rows are only the first page of the result
+    next_page_token: Optional[str] = None
+    total_rows: Optional[int] = None
 
 
 class UseRequest(BaseModel):
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy import TIMESTAMP, UUID, Boolean
 from sqlalchemy import Column as SQLAlchemyColumn
 from sqlalchemy import Date, Enum, Float, Integer, String
@@ -5,6 +7,7 @@ from sqlalchemy import Table as SQLAlchemyTable
 from sqlalchemy.dialects.postgresql import ENUM as PostgreSQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import registry
+from sqlalchemy.sql import func
 
 from app.models.application.base import DataType, PrimaryKey, Table
 
@@ -16,13 +19,18 @@ Base = declarative_base()
 orm_class_cache = {}
 
 
+def get_schema_name(application_name: str) -> str:
+    """Returns the schema holding the tables, enum types and trigger function of the application. The prefix keeps applications from taking the name of a schema of PostgreSQL, such as public."""
+    return f"app_{application_name}"
+
+
 def create_dynamic_orm(table: Table, application_name: str):
-    table_name = f"{application_name}_{table.name}"
-    class_name = f"{table_name}_class"
+    schema_name = get_schema_name(application_name)
+    cache_key = f"{schema_name}.{table.name}"
 
     # Check if the class already exists in the cache
-    if class_name in orm_class_cache:
-        return orm_class_cache[class_name]
+    if cache_key in orm_class_cache:
+        return orm_class_cache[cache_key]
 
     # Create the SQLAlchemy Table object
     columns: SQLAlchemyColumn = []
@@ -51,10 +59,10 @@ def create_dynamic_orm(table: Table, application_name: str):
     for col in table.columns:
         sql_alchemy_type = _get_sqlalchemy_type(data_type=col.data_type)
         if sql_alchemy_type == Enum:
-            enum_name = f"{table_name}_{col.name}_enum"
+            enum_name = f"{table.name}_{col.name}_enum"
             enum_values = tuple(col.enum_values)
             sql_alchemy_type = PostgreSQLEnum(
-                *enum_values, name=enum_name, create_type=False
+                *enum_values, name=enum_name, schema=schema_name, create_type=False
             )
         columns.append(
             SQLAlchemyColumn(
@@ -63,20 +71,52 @@ def create_dynamic_orm(table: Table, application_name: str):
             )
         )
 
+    # The timestamps are filled in by the database, but they are declared so that selecting the model returns every column of the table
+    if table.enable_created_at_timestamp:
+        columns.append(
+            SQLAlchemyColumn(
+                "created_at",
+                TIMESTAMP(timezone=True),
+                nullable=False,
+                server_default=func.now(),
+            )
+        )
+    if table.enable_updated_at_timestamp:
+        columns.append(
+            SQLAlchemyColumn(
+                "updated_at",
+                TIMESTAMP(timezone=True),
+                nullable=False,
+                server_default=func.now(),
+            )
+        )
+
+    if table.enable_soft_delete:
+        columns.append(
+            SQLAlchemyColumn(
+                "deleted_at",
+                TIMESTAMP(timezone=True),
+                nullable=True,
+            )
+        )
+
     sqlalchemy_table = SQLAlchemyTable(
-        table_name,
+        table.name,
         mapper_registry.metadata,
         *columns,
+        schema=schema_name,
         extend_existing=True,  # This allows redefining tables if they already exist in the metadata
     )
 
     # Create the ORM class
     orm_class = type(
-        class_name,
+        f"{application_name}_{table.name}_class",
         (Base,),
         {
             "__table__": sqlalchemy_table,
-            "__tablename__": table_name,
+            "__tablename__": table.name,
+            # Used to schedule the queries of the application fairly against the others
+            "__application_name__": application_name,
         },
     )
 
@@ -85,11 +125,24 @@ def create_dynamic_orm(table: Table, application_name: str):
         mapper_registry.map_imperatively(orm_class, sqlalchemy_table)
 
     # Cache the created class
-    orm_class_cache[class_name] = orm_class
+    orm_class_cache[cache_key] = orm_class
 
     return orm_class
 
 
+def evict_dynamic_orms(application_name: Optional[str]) -> None:
+    """Evicts the ORM classes of the application, or of every application if the name is None, so that they are rebuilt from its current tables on next use."""
+    for class_name, orm_class in list(orm_class_cache.items()):
+        if (
+            application_name is not None
+            and orm_class.__application_name__ != application_name
+        ):
+            continue
+        del orm_class_cache[class_name]
+        # Otherwise the rebuilt table would keep the columns that were removed
+        mapper_registry.metadata.remove(orm_class.__table__)
+
+
 def _get_sqlalchemy_type(data_type: DataType):
     return {
         DataType.STRING: String,
@@ -11,7 +11,6 @@ from app.models.stores.base import BaseObject
 from app.models.utils import sql_value_to_typed_value
 
 log = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 Base = declarative_base()
 
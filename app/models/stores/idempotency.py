@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, Text
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+
+class IdempotencyORM(Base):
+    """Responses replayed for retries with the same Idempotency-Key by every worker when IDEMPOTENCY_BACKEND is postgres."""
+
+    __tablename__ = "idempotency"
+
+    key = Column(Text, primary_key=True)
+    fingerprint = Column(Text, nullable=False)
+    # Null while the request that claimed the key executes
+    status_code = Column(Integer, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    # The end of the claim while the request executes, and then of the replays
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, DateTime, Float, Text
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql import func
+
+Base = declarative_base()
+
+
+class RateLimitORM(Base):
+    """Token buckets shared by every worker when RATE_LIMIT_BACKEND is postgres."""
+
+    __tablename__ = "rate_limit"
+
+    key = Column(Text, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
@@ -0,0 +1,48 @@
+from sqlalchemy import UUID, Column, DateTime, String
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql import func
+
+from app.models.stores.base import BaseObject
+from app.models.utils import sql_value_to_typed_value
+
+Base = declarative_base()
+
+
+class ApplicationShardORM(Base):
+    """Applications placed on a shard explicitly, overriding the hash ring. The other applications are not listed."""
+
+    __tablename__ = "application_shard"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    application_name = Column(String, nullable=False, unique=True)
+    shard = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now()
+    )
+
+
+class ApplicationShard(BaseObject):
+    application_name: str
+    shard: str
+
+    @classmethod
+    def local(cls, application_name: str, shard: str):
+        return ApplicationShard(
+            id=ApplicationShard.generate_id(),
+            application_name=application_name,
+            shard=shard,
+        )
+
+    @classmethod
+    def remote(
+        cls,
+        **kwargs,
+    ):
+        return cls(
+            id=sql_value_to_typed_value(dict=kwargs, key="id", type=str),
+            application_name=sql_value_to_typed_value(
+                dict=kwargs, key="application_name", type=str
+            ),
+            shard=sql_value_to_typed_value(dict=kwargs, key="shard", type=str),
+        )
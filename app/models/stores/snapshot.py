@@ -0,0 +1,64 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import JSON, UUID, Column, DateTime, Integer
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql import func
+
+from app.models.stores.base import BaseObject
+from app.models.utils import sql_value_to_typed_value
+
+log = logging.getLogger(__name__)
+
+ENTRY_VERSION: int = 1
+
+Base = declarative_base()
+
+
+class SnapshotORM(Base):
+    __tablename__ = "snapshot"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    version = Column(Integer, nullable=False)
+    content = Column(JSON, nullable=False)
+    # Expired snapshots are deleted by the purge task, after which the actions referring to them can no longer be reversed
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now()
+    )
+
+
+class Snapshot(BaseObject):
+    """Data that is too large to be sent back and forth with the client (e.g. the rows needed to reverse a bulk DELETE)."""
+
+    version: int
+    content: str
+    expires_at: datetime
+
+    @classmethod
+    def local(
+        cls,
+        content: Any,
+        retention: timedelta,
+    ):
+        return Snapshot(
+            id=Snapshot.generate_id(),
+            version=ENTRY_VERSION,
+            content=json.dumps(content),
+            expires_at=datetime.now(timezone.utc) + retention,
+        )
+
+    @classmethod
+    def remote(
+        cls,
+        **kwargs,
+    ):
+        return cls(
+            id=sql_value_to_typed_value(dict=kwargs, key="id", type=str),
+            version=sql_value_to_typed_value(dict=kwargs, key="version", type=int),
+            content=sql_value_to_typed_value(dict=kwargs, key="content", type=str),
+            expires_at=kwargs.get("expires_at"),
+        )
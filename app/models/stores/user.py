@@ -9,7 +9,6 @@ from sqlalchemy.sql import func
 from app.models.utils import sql_value_to_typed_value
 
 log = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 Base = declarative_base()
 
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import logging
+
+from app.connectors.orm import dispose_engines
+from app.models.application.base import ApplicationContent
+from app.services.message import MessageService
+from app.services.shard import ShardService
+from app.stores.utils.log import configure_logging
+
+log = logging.getLogger(__name__)
+
+
+async def move(application_name: str, shard: str, is_source_dropped: bool) -> None:
+    try:
+        application_content_lst: list[
+            ApplicationContent
+        ] = await MessageService().get_application_content_lst(
+            application_names=[application_name]
+        )
+        if not application_content_lst:
+            raise ValueError(f"Application {application_name} not found")
+        await ShardService().move(
+            application_content=application_content_lst[0],
+            shard=shard,
+            is_source_dropped=is_source_dropped,
+        )
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    """Moves the tables of an application to another shard of the external database, e.g. python -m app.move_application todo b"""
+    parser = argparse.ArgumentParser(
+        description="Moves the tables of an application to another shard of the external database."
+    )
+    parser.add_argument("application_name")
+    parser.add_argument("shard", help="Name of the shard in EXTERNAL_DATABASE_SHARDS")
+    parser.add_argument(
+        "--keep-source",
+        action="store_true",
+        help="Keep the tables on the source shard instead of dropping them",
+    )
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(
+        move(
+            application_name=args.application_name,
+            shard=args.shard,
+            is_source_dropped=not args.keep_source,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
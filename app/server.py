@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import os
+import secrets
+import tempfile
+from typing import Optional
+
+import uvicorn
+from dotenv import find_dotenv, load_dotenv
+
+from app.create_tables import create_tables
+
+log = logging.getLogger(__name__)
+
+load_dotenv(find_dotenv(filename=".env"))
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "8080"))
+# Each worker is a process with its own event loop, engines and in-memory stores. The requests mostly wait on the databases and the ML endpoint, so one worker per CPU keeps every CPU busy.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# In-flight requests get this long to complete on shutdown before their connections are closed
+GRACEFUL_SHUTDOWN_SECONDS = int(os.environ.get("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+SSL_KEYFILE = os.environ.get("SSL_KEYFILE")
+SSL_CERTFILE = os.environ.get("SSL_CERTFILE")
+# The tables of the internal database are created once by the launcher before the workers start, instead of by each worker at once
+CREATE_TABLES_ON_START = (
+    os.environ.get("CREATE_TABLES_ON_START", "true").lower() == "true"
+)
+
+
+def main() -> None:
+    """Runs the production server: WEB_CONCURRENCY worker processes on uvloop and httptools, without reload."""
+    if CREATE_TABLES_ON_START:
+        try:
+            asyncio.run(create_tables())
+        except Exception as e:
+            # The tables may exist already, created by a user without the privileges of the server
+            log.error(f"Error creating the tables of the internal database: {e}")
+    log.info(f"Starting {WEB_CONCURRENCY} worker(s) on {HOST}:{PORT}")
+    metrics_directory: Optional[tempfile.TemporaryDirectory] = None
+    if WEB_CONCURRENCY > 1 and not os.environ.get("METRICS_DIRECTORY"):
+        # A scrape reaches a single worker, which serves the metrics of the others from the files they write to this directory. The workers inherit the environment.
+        metrics_directory = tempfile.TemporaryDirectory(prefix="whale-metrics-")
+        os.environ["METRICS_DIRECTORY"] = metrics_directory.name
+    if not os.environ.get("PAGE_TOKEN_SECRET"):
+        # A page token issued by one worker is fetched from whichever worker the next request reaches
+        os.environ["PAGE_TOKEN_SECRET"] = secrets.token_urlsafe(32)
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=HOST,
+            port=PORT,
+            workers=WEB_CONCURRENCY,
+            loop="uvloop",
+            http="httptools",
+            lifespan="on",
+            reload=False,
+            timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+            ssl_keyfile=SSL_KEYFILE,
+            ssl_certfile=SSL_CERTFILE,
+            proxy_headers=True,
+        )
+    finally:
+        if metrics_directory is not None:
+            metrics_directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
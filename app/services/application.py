@@ -2,16 +2,20 @@ import json
 import logging
 from typing import Optional
 
+from app.connectors.notify import invalidation_bus
 from app.connectors.orm import Orm
 from app.models.application.base import ApplicationContent, Table
 from app.models.application.build import PostApplicationResponse
 from app.models.application.select import SelectApplicationResponse
 from app.models.stores.application import Application, ApplicationORM
+from app.models.stores.dynamic import get_schema_name
 from app.models.stores.user import UserORM
+from app.services.shard import ShardService
 from app.stores.base.main import execute_client_script
 from app.stores.sqls.template import (
-    generate_foreign_key_script,
-    generate_table_creation_script,
+    generate_foreign_key_scripts,
+    generate_schema_script,
+    generate_table_scripts,
 )
 
 log = logging.getLogger(__name__)
@@ -31,47 +35,47 @@ class ApplicationService:
         )
         orm = Orm(is_user_facing=False)
         await orm.post(model=ApplicationORM, data=[application.model_dump()])
+        await invalidation_bus.publish(application.name)
         return PostApplicationResponse(name=application.name)
 
     async def generate_client_application(
         self, application_content: ApplicationContent
     ) -> PostApplicationResponse:
-        """Generates the client application."""
-        # Step 1: Create tables
-        for table in application_content.tables:
-            # Prefix application name so that the table name remains unique amidst other client applications. Client application name is enforced to be unique
-            application_name: str = application_content.name
-            table_name = f"{application_name}_{table.name}"
+        """Generates the client application in its own schema on the shard it is assigned to."""
+        # Step 0: Assign the application to a shard, unless it already has one
+        await ShardService().assign(application_name=application_content.name)
 
-            # For input of inference, we will GET table description from the internal database, and the table name and columns from the client database
-            # For output of inference, we will simply modify the entries in the client database associated with the user's API key
-            table_script: str = generate_table_creation_script(
-                table_name=table_name,
-                columns=table.columns,
-                primary_key=table.primary_key,
-                enable_created_at_timestamp=table.enable_created_at_timestamp,
-                enable_updated_at_timestamp=table.enable_updated_at_timestamp,
-            )
+        # Step 1: Create the schema of the application
+        schema_name: str = get_schema_name(application_content.name)
+        await execute_client_script(
+            application_name=application_content.name,
+            table_name=schema_name,
+            sql_script=generate_schema_script(schema_name=schema_name),
+        )
+
+        # Step 2: Create tables
+        for table_name, table_script in generate_table_scripts(
+            application_content=application_content
+        ).items():
             await execute_client_script(
+                application_name=application_content.name,
                 table_name=table_name,
                 sql_script=table_script,
             )
 
-        # Step 2: Add foreign key constraints
-        for table in application_content.tables:
-            table_name = f"{application_content.name}_{table.name}"
-            foreign_key_script = generate_foreign_key_script(
-                input_name=application_content.name,
-                table_name=table_name,
-                columns=table.columns,
-            )
-            if not foreign_key_script:
-                continue
+        # Step 3: Add foreign key constraints
+        for table_name, foreign_key_script in generate_foreign_key_scripts(
+            application_content=application_content
+        ).items():
             await execute_client_script(
+                application_name=application_content.name,
                 table_name=table_name,
                 sql_script=foreign_key_script,
             )
 
+        # Step 4: Evict whatever the workers cached of the previous tables of the application
+        await invalidation_bus.publish(application_content.name)
+
     async def select(self, name: str) -> Optional[SelectApplicationResponse]:
         """Selects the entry from the application table."""
         orm = Orm(is_user_facing=False)
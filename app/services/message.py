@@ -1,6 +1,7 @@
 import copy
 import json
 import logging
+import time
 import uuid
 from typing import Any, Optional, Type
 
@@ -9,9 +10,12 @@ from sqlalchemy.orm.decl_api import DeclarativeMeta
 from app.connectors.orm import Orm
 from app.models.application.base import Table
 from app.models.inference.use import (
+    Aggregation,
     ApplicationContent,
+    ConflictAction,
     HttpMethod,
     HttpMethodResponse,
+    OrderBy,
     UseInferenceResponse,
 )
 from app.models.message.create import CreateMessage, CreateResponse
@@ -20,21 +24,32 @@ from app.models.message.reverse import (
     ReverseActionDelete,
     ReverseActionGet,
     ReverseActionPost,
+    ReverseActionRestore,
+    ReverseActionUnion,
     ReverseActionUpdate,
+    ReverseActionUpsert,
     ReverseActionWrapper,
 )
+from app.models.message.rows import PageToken, RowsResponse
 from app.models.message.shared import Role
 from app.models.message.use import UseMessage, UseResponse
 from app.models.stores.application import Application, ApplicationORM
 from app.models.stores.dynamic import create_dynamic_orm
 from app.services.application import ApplicationService
+from app.services.snapshot import SnapshotService
 from app.services.user import UserService
+from app.stores.utils.application_cache import application_content_cache
 from app.stores.utils.frontend_message import translate_filter_dict
+from app.stores.utils.limit import cap_rows, exceeds_response_limits
+from app.stores.utils.log import truncate
+from app.stores.utils.metrics import OPERATION_SECONDS
+from app.stores.utils.pagination import PAGE_SIZE, decode_page_token, encode_page_token
+from app.stores.utils.plan import get_row_id, plan_operations
 from app.stores.utils.process import (
     identify_columns_to_process,
+    process_client_facing_aggregate_rows,
     process_client_facing_filter_dict,
     process_client_facing_rows,
-    process_client_facing_update_dict,
     process_datetime_or_date_values_of_filter_dict,
     process_datetime_or_date_values_of_update_dict,
     process_values_of_row,
@@ -48,11 +63,26 @@ class MessageService:
     def __init__(self):
         self.user_service = UserService()
         self.application_service = ApplicationService()
+        self.snapshot_service = SnapshotService()
 
     async def get_application_content_lst(
         self, application_names: list[str]
     ) -> list[ApplicationContent]:
+        application_content_lst: list[ApplicationContent] = []
+        missing_names: list[str] = []
+        for name in application_names:
+            application_content: Optional[ApplicationContent] = (
+                application_content_cache.get(name)
+            )
+            if application_content is None:
+                missing_names.append(name)
+            else:
+                application_content_lst.append(application_content)
+        if not missing_names:
+            return application_content_lst
+
         orm = Orm(is_user_facing=False)
+        # Read from the primary, as a replica can still have the tables from before an invalidation, which would then stay cached
         applications: list[Application] = await orm.static_get(
             orm_model=ApplicationORM,
             pydantic_model=Application,
@@ -60,11 +90,11 @@ class MessageService:
                 "boolean_clause": "OR",
                 "conditions": [
                     {"column": "name", "operator": "=", "value": name}
-                    for name in application_names
+                    for name in missing_names
                 ],
             },
+            is_primary=True,
         )
-        application_content_lst: list[ApplicationContent] = []
         for application in applications:
             tables: list[Table] = [
                 Table.model_validate(table) for table in json.loads(application.tables)
@@ -72,6 +102,7 @@ class MessageService:
             application_content = ApplicationContent(
                 name=application.name, tables=tables
             )
+            application_content_cache.put(application_content)
             application_content_lst.append(application_content)
         return application_content_lst
 
@@ -123,40 +154,115 @@ class MessageService:
             reverse_stack=reverse_stack,
         )
 
+    async def get_rows(self, page_token: str) -> RowsResponse:
+        """Fetches the next page of rows of a previous GET or PUT request without running inference again."""
+        decoded_page_token: PageToken = decode_page_token(value=page_token)
+        application_content_lst: list[ApplicationContent] = (
+            await self.get_application_content_lst(
+                application_names=[decoded_page_token.application_name]
+            )
+        )
+        if not application_content_lst:
+            raise ValueError(
+                f"Application {decoded_page_token.application_name} not found"
+            )
+        target_table: Optional[Table] = None
+        for table in application_content_lst[0].tables:
+            if table.name == decoded_page_token.table_name:
+                target_table = table
+        if not target_table:
+            raise ValueError(
+                f"Table {decoded_page_token.table_name} not found in application {decoded_page_token.application_name}"
+            )
+        table_orm_model: Type[DeclarativeMeta] = create_dynamic_orm(
+            table=target_table, application_name=decoded_page_token.application_name
+        )
+        rows, next_page_token = await _get_page(
+            orm=Orm(is_user_facing=True),
+            table_orm_model=table_orm_model,
+            application_name=decoded_page_token.application_name,
+            target_table=target_table,
+            page_token=decoded_page_token,
+        )
+        return RowsResponse(rows=rows, next_page_token=next_page_token)
+
     async def reverse_inference_response(self, input: ReverseActionWrapper):
-        if (
-            input.action.action_type == "get"
-            or input.action.action_type == "clarification"
-        ):
-            return
+        await self.reverse_inference_responses(inputs=[input])
+
+    async def reverse_inference_responses(self, inputs: list[ReverseActionWrapper]):
+        """Reverses the actions in the order provided (i.e. the top of the reverse stack first) in a single transaction, so that either all or none of them are reversed. Consecutive actions of the same type on the same table are merged into one statement."""
+        actions: list[ReverseActionUnion] = []
+        for input in inputs:
+            if (
+                input.action.action_type == "get"
+                or input.action.action_type == "clarification"
+            ):
+                continue
+            actions.append(await self._load_snapshot(action=input.action))
 
         orm = Orm(is_user_facing=True)
-        table_orm_model: Type[DeclarativeMeta] = create_dynamic_orm(
-            table=input.action.target_table,
-            application_name=input.action.application_name,
-        )
-        match input.action.action_type:
-            case "delete":
-                await _reverse_with_delete(
-                    orm=orm, table_orm_model=table_orm_model, ids=input.action.ids
+        async with orm.transaction():
+            for action in _merge_reverse_actions(actions=actions):
+                table_orm_model: Type[DeclarativeMeta] = create_dynamic_orm(
+                    table=action.target_table,
+                    application_name=action.application_name,
                 )
+                match action.action_type:
+                    case "delete":
+                        await _reverse_with_delete(
+                            orm=orm, table_orm_model=table_orm_model, ids=action.ids
+                        )
+                    case "post":
+                        await _reverse_with_post(
+                            orm=orm,
+                            table_orm_model=table_orm_model,
+                            target_table=action.target_table,
+                            deleted_data=action.deleted_data,
+                        )
+                    case "restore":
+                        await orm.restore_by_id(model=table_orm_model, ids=action.ids)
+                    case "upsert":
+                        await _reverse_with_delete(
+                            orm=orm, table_orm_model=table_orm_model, ids=action.ids
+                        )
+                        await _reverse_with_put(
+                            orm=orm,
+                            table_orm_model=table_orm_model,
+                            target_table=action.target_table,
+                            reverse_rows=action.reverse_rows,
+                        )
+                    case "update":
+                        await _reverse_with_put(
+                            orm=orm,
+                            table_orm_model=table_orm_model,
+                            target_table=action.target_table,
+                            reverse_rows=action.reverse_rows,
+                            reverse_filter_conditions=action.reverse_filter_conditions,
+                            reverse_updated_data=action.reverse_updated_data,
+                        )
+                    case _:
+                        raise TypeError(
+                            "Invalid action type when trying to reverse inferenec response"
+                        )
+
+    async def _load_snapshot(self, action: ReverseActionUnion) -> ReverseActionUnion:
+        """Returns the action with the data kept in its snapshot, if any, inlined."""
+        if not getattr(action, "snapshot_id", None):
+            return action
+        content: Any = await self.snapshot_service.get(id=action.snapshot_id)
+        match action.action_type:
             case "post":
-                await _reverse_with_post(
-                    orm=orm,
-                    table_orm_model=table_orm_model,
-                    deleted_data=input.action.deleted_data,
+                return action.model_copy(
+                    update={"deleted_data": content, "snapshot_id": None}
                 )
+            case "restore":
+                return action.model_copy(update={"ids": content, "snapshot_id": None})
             case "update":
-                await _reverse_with_put(
-                    orm=orm,
-                    table_orm_model=table_orm_model,
-                    reverse_filter_conditions=input.action.reverse_filter_conditions,
-                    reverse_updated_data=input.action.reverse_updated_data,
+                return action.model_copy(
+                    update={"reverse_rows": content, "snapshot_id": None}
                 )
             case _:
-                raise TypeError(
-                    "Invalid action type when trying to reverse inferenec response"
-                )
+                raise TypeError(f"Unexpected snapshot for {action.action_type} action")
 
     async def construct_create_response(
         self,
@@ -180,7 +286,7 @@ class MessageService:
                 application_content=application_content
             )
             all_application_names.append(application_content.name)
-            
+
             # only update cache if user is signed in
             if user_id:
                 await self.user_service.update(
@@ -193,7 +299,7 @@ class MessageService:
                     updated_data={"applications": all_application_names},
                     increment_field=None,
                 )
-                
+
             is_finished = True
         elif overview:
             message_content = (
@@ -224,6 +330,9 @@ async def _reverse_with_delete(
     table_orm_model: Type[DeclarativeMeta],
     ids: list[Any],
 ):
+    # An empty filter would match every row of the table
+    if not ids:
+        return
     ids_lst: list[Any] = []
     for id in ids:
         # Convert the string uuid back to UUID object (It had to be a string because UUID is not JSON serialisable as an API request object)
@@ -243,26 +352,122 @@ async def _reverse_with_delete(
 
 
 async def _reverse_with_post(
-    orm: Orm, table_orm_model: Type[DeclarativeMeta], deleted_data: list[dict[str, Any]]
+    orm: Orm,
+    table_orm_model: Type[DeclarativeMeta],
+    target_table: Table,
+    deleted_data: list[dict[str, Any]],
 ):
-    for row in deleted_data:
-        del [row["created_at"]]
-        del [row["updated_at"]]
+    # The deleted rows are client facing, so their values are converted back before they are re-inserted with their original timestamps
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
+    rows_to_insert: list[dict[str, Any]] = process_values_of_row(
+        rows=copy.deepcopy(deleted_data),
+        datetime_column_names_to_process=datetime_column_names_to_process,
+        date_column_names_to_process=date_column_names_to_process,
+        uuid_column_names_to_process=uuid_column_names_to_process,
+    )
 
-    await orm.post(model=table_orm_model, data=deleted_data)
+    await orm.post(model=table_orm_model, data=rows_to_insert)
 
 
 async def _reverse_with_put(
     orm: Orm,
     table_orm_model: Type[DeclarativeMeta],
-    reverse_filter_conditions: dict[str, Any],
-    reverse_updated_data: dict[str, Any],
+    target_table: Table,
+    reverse_rows: list[dict[str, Any]],
+    reverse_filter_conditions: Optional[dict[str, Any]] = None,
+    reverse_updated_data: Optional[dict[str, Any]] = None,
 ):
-    await orm.update_inference_result(
-        model=table_orm_model,
-        filters=reverse_filter_conditions,
-        updated_data=reverse_updated_data,
-    )
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
+
+    # Reverse actions created before the original values of each row were kept apply the same values to every row
+    if reverse_filter_conditions is not None:
+        await orm.update_inference_result(
+            model=table_orm_model,
+            filters=process_datetime_or_date_values_of_filter_dict(
+                dict_to_process=reverse_filter_conditions,
+                datetime_column_names_to_process=datetime_column_names_to_process,
+                date_column_names_to_process=date_column_names_to_process,
+                uuid_column_names_to_process=uuid_column_names_to_process,
+            ),
+            updated_data=process_datetime_or_date_values_of_update_dict(
+                dict_to_process=reverse_updated_data,
+                datetime_column_names_to_process=datetime_column_names_to_process,
+                date_column_names_to_process=date_column_names_to_process,
+                uuid_column_names_to_process=uuid_column_names_to_process,
+            ),
+        )
+        return
+
+    # Each row is restored to its own original values in a single statement. Rows of merged updates may have different columns, and rows with the same columns are restored together.
+    rows_by_columns: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for row in reverse_rows:
+        rows_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+    for rows in rows_by_columns.values():
+        await orm.bulk_update_by_id(
+            model=table_orm_model,
+            updated_rows=process_values_of_row(
+                rows=copy.deepcopy(rows),
+                datetime_column_names_to_process=datetime_column_names_to_process,
+                date_column_names_to_process=date_column_names_to_process,
+                uuid_column_names_to_process=uuid_column_names_to_process,
+            ),
+        )
+
+
+def _merge_reverse_actions(
+    actions: list[ReverseActionUnion],
+) -> list[ReverseActionUnion]:
+    """Merges consecutive actions of the same type on the same table, keeping the order in which the actions are reversed."""
+    merged_actions: list[ReverseActionUnion] = []
+    for action in actions:
+        previous: Optional[ReverseActionUnion] = (
+            merged_actions[-1] if merged_actions else None
+        )
+        if (
+            previous is None
+            or previous.action_type != action.action_type
+            or previous.application_name != action.application_name
+            or previous.target_table.name != action.target_table.name
+        ):
+            merged_actions.append(action)
+            continue
+
+        match action.action_type:
+            case "delete" | "restore":
+                merged_actions[-1] = previous.model_copy(
+                    update={"ids": previous.ids + action.ids}
+                )
+            case "post":
+                merged_actions[-1] = previous.model_copy(
+                    update={"deleted_data": previous.deleted_data + action.deleted_data}
+                )
+            case "update" if (
+                previous.reverse_filter_conditions is None
+                and action.reverse_filter_conditions is None
+            ):
+                # A row updated by both actions ends up with the values from before the earlier update, which is reversed last
+                reverse_rows_by_id: dict[str, dict[str, Any]] = {
+                    str(row["id"]): row for row in previous.reverse_rows
+                }
+                for row in action.reverse_rows:
+                    reverse_rows_by_id[str(row["id"])] = {
+                        **reverse_rows_by_id.get(str(row["id"]), {}),
+                        **row,
+                    }
+                merged_actions[-1] = previous.model_copy(
+                    update={"reverse_rows": list(reverse_rows_by_id.values())}
+                )
+            case _:
+                merged_actions.append(action)
+    return merged_actions
 
 
 ###
@@ -274,7 +479,11 @@ async def _execute(
     orm = Orm(is_user_facing=True)
     response_message_content_lst: list[UseMessage] = []
     response_reverse_action_lst: list[ReverseActionWrapper] = []
-    for http_method_response in inference_response.response:
+    # Adjacent operations that can run as one statement are executed together, and their results are split back per operation
+    for http_method_responses in plan_operations(
+        http_method_responses=inference_response.response
+    ):
+        http_method_response: HttpMethodResponse = http_method_responses[0]
         target_table: Optional[Table] = None
         for table in http_method_response.application.tables:
             if table.name == http_method_response.table_name:
@@ -287,19 +496,39 @@ async def _execute(
             table=target_table, application_name=http_method_response.application.name
         )
 
+        started_at: float = time.perf_counter()
         match http_method_response.http_method:
-            case HttpMethod.POST:
-                log.info("Executing POST request")
-                content, rows, reverse_action = await _execute_post_method(
+            case HttpMethod.POST if http_method_response.on_conflict:
+                log.info("Executing POST request with upsert")
+                message, reverse_action = await _execute_upsert_method(
                     orm=orm,
                     table_orm_model=table_orm_model,
                     http_method_response=http_method_response,
                     target_table=target_table,
                     application_name=http_method_response.application.name,
                 )
+                messages, reverse_actions = [message], [reverse_action]
+            case HttpMethod.POST:
+                log.info(f"Executing {len(http_method_responses)} POST request(s)")
+                messages, reverse_actions = await _execute_post_method(
+                    orm=orm,
+                    table_orm_model=table_orm_model,
+                    http_method_responses=http_method_responses,
+                    target_table=target_table,
+                    application_name=http_method_response.application.name,
+                )
+            case HttpMethod.PUT if len(http_method_responses) > 1:
+                log.info(f"Executing {len(http_method_responses)} PUT requests by id")
+                messages, reverse_actions = await _execute_put_by_id_method(
+                    orm=orm,
+                    table_orm_model=table_orm_model,
+                    http_method_responses=http_method_responses,
+                    target_table=target_table,
+                    application_name=http_method_response.application.name,
+                )
             case HttpMethod.PUT:
                 log.info("Executing PUT request")
-                content, rows, reverse_action = await _execute_put_method(
+                message, reverse_action = await _execute_put_method(
                     orm=orm,
                     table_orm_model=table_orm_model,
                     target_table=target_table,
@@ -307,9 +536,10 @@ async def _execute(
                     update_dict=http_method_response.updated_data,
                     application_name=http_method_response.application.name,
                 )
+                messages, reverse_actions = [message], [reverse_action]
             case HttpMethod.DELETE:
                 log.info("Executing DELETE request")
-                content, rows, reverse_action = await _execute_delete_method(
+                message, reverse_action = await _execute_delete_method(
                     orm=orm,
                     table_orm_model=table_orm_model,
                     http_method_response=http_method_response,
@@ -317,43 +547,85 @@ async def _execute(
                     filter_dict=http_method_response.filter_conditions,
                     application_name=http_method_response.application.name,
                 )
+                messages, reverse_actions = [message], [reverse_action]
+            case HttpMethod.GET if http_method_response.join_tables:
+                log.info("Executing GET request with joins")
+                message, reverse_action = await _execute_join_method(
+                    orm=orm,
+                    table_orm_model=table_orm_model,
+                    application=http_method_response.application,
+                    target_table=target_table,
+                    filter_dict=http_method_response.filter_conditions,
+                    join_tables=http_method_response.join_tables,
+                    selected_columns=http_method_response.selected_columns,
+                    order_by=http_method_response.order_by,
+                    limit=http_method_response.limit,
+                )
+                messages, reverse_actions = [message], [reverse_action]
             case HttpMethod.GET:
                 log.info("Executing GET request")
-                content, rows, reverse_action = await _execute_get_method(
+                message, reverse_action = await _execute_get_method(
                     orm=orm,
                     table_orm_model=table_orm_model,
                     application_name=http_method_response.application.name,
                     target_table=target_table,
                     filter_dict=http_method_response.filter_conditions,
+                    selected_columns=http_method_response.selected_columns,
+                    order_by=http_method_response.order_by,
+                    limit=http_method_response.limit,
                 )
+                messages, reverse_actions = [message], [reverse_action]
+            case HttpMethod.AGGREGATE:
+                log.info("Executing AGGREGATE request")
+                message, reverse_action = await _execute_aggregate_method(
+                    orm=orm,
+                    table_orm_model=table_orm_model,
+                    application_name=http_method_response.application.name,
+                    target_table=target_table,
+                    filter_dict=http_method_response.filter_conditions,
+                    aggregations=http_method_response.aggregations,
+                    group_by=http_method_response.group_by,
+                )
+                messages, reverse_actions = [message], [reverse_action]
             case _:
                 raise ValueError(
                     f"Unsupported HTTP method: {http_method_response.http_method}"
                 )
-        message = UseMessage(role=Role.ASSISTANT, content=content, rows=rows)
-        response_message_content_lst.append(message)
-        response_reverse_action_lst.append(ReverseActionWrapper(action=reverse_action))
-    log.info(response_message_content_lst)
-    log.info(response_reverse_action_lst)
+        OPERATION_SECONDS.observe(
+            time.perf_counter() - started_at,
+            http_method=http_method_response.http_method.value,
+        )
+        response_message_content_lst.extend(messages)
+        response_reverse_action_lst.extend(
+            ReverseActionWrapper(action=reverse_action)
+            for reverse_action in reverse_actions
+        )
+    log.debug("Response messages: %s", truncate(response_message_content_lst))
+    log.debug("Reverse actions: %s", truncate(response_reverse_action_lst))
     return response_message_content_lst, response_reverse_action_lst
 
 
 async def _execute_post_method(
     orm: Orm,
     table_orm_model: Type[DeclarativeMeta],
-    http_method_response: HttpMethodResponse,
+    http_method_responses: list[HttpMethodResponse],
     target_table: Table,
     application_name: str,
-) -> tuple[str, list[dict[str, Any]], ReverseActionDelete]:
+) -> tuple[list[UseMessage], list[ReverseActionDelete]]:
+    """Inserts the rows of one or more POST requests into the same table with a single INSERT, and returns the message and reverse action of each request."""
 
-    copied_rows: list[dict[str, Any]] = copy.deepcopy(
-        http_method_response.inserted_rows
-    )
+    copied_rows: list[dict[str, Any]] = [
+        row
+        for http_method_response in http_method_responses
+        for row in copy.deepcopy(http_method_response.inserted_rows)
+    ]
 
     log.info("Processing data for POST request")
-    datetime_column_names_to_process, date_column_names_to_process, uuid_column_names_to_process = (
-        identify_columns_to_process(table=target_table)
-    )
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
     rows_to_insert: list[dict[str, Any]] = process_values_of_row(
         rows=copied_rows,
         datetime_column_names_to_process=datetime_column_names_to_process,
@@ -363,7 +635,7 @@ async def _execute_post_method(
 
     log.info("Initiating POST request")
     ids, rows = await orm.post(model=table_orm_model, data=rows_to_insert)
-    log.info(f"Rows from POST request: {rows}")
+    log.debug("Rows from POST request: %s", truncate(rows))
 
     rows = process_client_facing_rows(
         db_rows=rows,
@@ -371,20 +643,140 @@ async def _execute_post_method(
         date_column_names_to_process=date_column_names_to_process,
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
+    rows_by_id: dict[str, dict[str, Any]] = {str(row["id"]): row for row in rows}
 
     message_content: str = (
-        f"The following row(s) has been inserted into the {target_table.name} table of {http_method_response.application.name}:"
+        f"The following row(s) has been inserted into the {target_table.name} table of {application_name}:"
+    )
+
+    # The ids are returned in insertion order, so each request gets back the ids of its own rows
+    messages: list[UseMessage] = []
+    reverse_actions: list[ReverseActionDelete] = []
+    offset: int = 0
+    for http_method_response in http_method_responses:
+        request_ids: list[Any] = ids[
+            offset : offset + len(http_method_response.inserted_rows)
+        ]
+        offset += len(http_method_response.inserted_rows)
+        messages.append(
+            UseMessage(
+                role=Role.ASSISTANT,
+                content=message_content,
+                rows=[rows_by_id[str(id)] for id in request_ids],
+            )
+        )
+        reverse_actions.append(
+            ReverseActionDelete(
+                ids=request_ids,
+                target_table=target_table,
+                application_name=application_name,
+            )
+        )
+    return messages, reverse_actions
+
+
+async def _execute_upsert_method(
+    orm: Orm,
+    table_orm_model: Type[DeclarativeMeta],
+    http_method_response: HttpMethodResponse,
+    target_table: Table,
+    application_name: str,
+) -> tuple[UseMessage, ReverseActionUpsert]:
+
+    copied_rows: list[dict[str, Any]] = copy.deepcopy(
+        http_method_response.inserted_rows
     )
+    conflict_column: str = _get_conflict_column(
+        target_table=target_table, rows=copied_rows
+    )
+
+    log.info("Processing data for POST request with upsert")
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
+    rows_to_insert: list[dict[str, Any]] = process_values_of_row(
+        rows=copied_rows,
+        datetime_column_names_to_process=datetime_column_names_to_process,
+        date_column_names_to_process=date_column_names_to_process,
+        uuid_column_names_to_process=uuid_column_names_to_process,
+    )
+    # A row repeated in the request would conflict with itself, so only its last occurrence is kept
+    rows_to_insert = list(
+        {row[conflict_column]: row for row in rows_to_insert}.values()
+    )
+
+    log.info("Initiating POST request with upsert")
+    rows, is_inserted, original_rows = await orm.upsert(
+        model=table_orm_model,
+        data=rows_to_insert,
+        conflict_column=conflict_column,
+        update_on_conflict=http_method_response.on_conflict == ConflictAction.UPDATE,
+    )
+    log.debug("Rows from POST request with upsert: %s", truncate(rows))
+
+    rows = process_client_facing_rows(
+        db_rows=rows,
+        datetime_column_names_to_process=datetime_column_names_to_process,
+        date_column_names_to_process=date_column_names_to_process,
+        uuid_column_names_to_process=uuid_column_names_to_process,
+    )
+    original_rows = process_client_facing_rows(
+        db_rows=original_rows,
+        datetime_column_names_to_process=datetime_column_names_to_process,
+        date_column_names_to_process=date_column_names_to_process,
+        uuid_column_names_to_process=uuid_column_names_to_process,
+    )
+    original_rows_by_id: dict[str, dict[str, Any]] = {
+        str(row["id"]): row for row in original_rows
+    }
+
+    # Inserted rows are reversed by deleting them, and updated rows by restoring the original values of the updated columns
+    updated_column_names: set[str] = {
+        name for row in rows_to_insert for name in row if name != "id"
+    }
+    inserted_ids: list[Any] = []
+    reverse_rows: list[dict[str, Any]] = []
+    for row, inserted in zip(rows, is_inserted):
+        if inserted:
+            inserted_ids.append(row["id"])
+        elif str(row["id"]) in original_rows_by_id:
+            original_row: dict[str, Any] = original_rows_by_id[str(row["id"])]
+            reverse_rows.append(
+                {
+                    "id": row["id"],
+                    **{name: original_row[name] for name in updated_column_names},
+                }
+            )
+
+    message_content: str = ""
+    if http_method_response.on_conflict == ConflictAction.UPDATE:
+        message_content = f"{len(inserted_ids)} row(s) have been inserted into and {len(rows) - len(inserted_ids)} row(s) with an existing {conflict_column} have been updated in the {target_table.name} table of {application_name}:"
+    else:
+        message_content = f"{len(inserted_ids)} row(s) have been inserted into the {target_table.name} table of {application_name}, and {len(rows_to_insert) - len(inserted_ids)} row(s) with an existing {conflict_column} have been skipped:"
 
     return (
-        message_content,
-        rows,
-        ReverseActionDelete(
-            ids=ids, target_table=target_table, application_name=application_name
+        UseMessage(role=Role.ASSISTANT, content=message_content, rows=rows),
+        ReverseActionUpsert(
+            ids=inserted_ids,
+            reverse_rows=reverse_rows,
+            target_table=target_table,
+            application_name=application_name,
         ),
     )
 
 
+def _get_conflict_column(target_table: Table, rows: list[dict[str, Any]]) -> str:
+    """Returns the first unique column of the table that is provided in every row."""
+    for column in target_table.columns:
+        if column.unique and all(column.name in row for row in rows):
+            return column.name
+    raise ValueError(
+        f"An upsert into the {target_table.name} table requires a value for one of its unique columns in every row"
+    )
+
+
 async def _execute_put_method(
     orm: Orm,
     table_orm_model: Type[DeclarativeMeta],
@@ -392,14 +784,16 @@ async def _execute_put_method(
     filter_dict: dict,
     update_dict: dict,
     application_name: str,
-) -> tuple[str, list[dict[str, Any]], ReverseActionUpdate]:
+) -> tuple[UseMessage, ReverseActionUpdate]:
     copied_filter_dict: list[dict[str, Any]] = copy.deepcopy(filter_dict)
     copied_update_dict: list[dict[str, Any]] = copy.deepcopy(update_dict)
 
     log.info("Processing data for PUT request")
-    datetime_column_names_to_process, date_column_names_to_process, uuid_column_names_to_process = (
-        identify_columns_to_process(table=target_table)
-    )
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
     copied_filter_dict = process_datetime_or_date_values_of_filter_dict(
         dict_to_process=copied_filter_dict,
         datetime_column_names_to_process=datetime_column_names_to_process,
@@ -415,12 +809,135 @@ async def _execute_put_method(
     )
 
     log.info("Initiating PUT request")
-    rows, reverse_filters, reverse_updated_data = await orm.update_inference_result(
+    # Only the ids and the original values of the updated columns are returned by the update, and the updated rows are fetched a page at a time, so that a large update is never held in memory in full
+    _, reverse_rows = await orm.update_inference_result(
         model=table_orm_model,
         filters=copied_filter_dict,
         updated_data=copied_update_dict,
+        returned_column_names=["id"],
+    )
+
+    reverse_rows = process_client_facing_rows(
+        db_rows=reverse_rows,
+        datetime_column_names_to_process=datetime_column_names_to_process,
+        date_column_names_to_process=date_column_names_to_process,
+        uuid_column_names_to_process=uuid_column_names_to_process,
     )
-    log.info(f"Rows from PUT request: {rows}")
+    reverse_rows.sort(key=lambda row: row["id"])
+    ids: list[Any] = [row["id"] for row in reverse_rows]
+
+    # The updated rows are returned one page at a time in the order of their id. The ids of the remaining pages are kept in snapshots, since a filter could no longer tell the updated rows apart once they are written to again.
+    page_ids: list[Any] = ids[:PAGE_SIZE]
+    rows: list[dict[str, Any]] = []
+    if page_ids:
+        rows, _ = await _get_page(
+            orm=orm,
+            table_orm_model=table_orm_model,
+            application_name=application_name,
+            target_table=target_table,
+            page_token=PageToken(
+                application_name=application_name,
+                table_name=target_table.name,
+                filter_conditions=_ids_to_filter_dict(ids=page_ids),
+            ),
+        )
+    log.debug("Rows from PUT request: %s", truncate(rows))
+    sample_rows, is_truncated = cap_rows(rows=rows, max_rows=PAGE_SIZE)
+    returned_ids: int = (
+        page_ids.index(rows[len(sample_rows)]["id"]) if is_truncated else len(page_ids)
+    )
+    next_page_token: Optional[str] = None
+    if returned_ids < len(ids):
+        remaining_ids: list[Any] = ids[returned_ids:]
+        next_page_token = encode_page_token(
+            PageToken(
+                application_name=application_name,
+                table_name=target_table.name,
+                filter_conditions={"boolean_clause": "AND", "conditions": []},
+                snapshot_id=await SnapshotService().post_pages(
+                    pages=[
+                        remaining_ids[index : index + PAGE_SIZE]
+                        for index in range(0, len(remaining_ids), PAGE_SIZE)
+                    ]
+                ),
+            )
+        )
+
+    message_content: str = ""
+    if not filter_dict["conditions"]:
+        message_content = f"All the {len(ids)} row(s) have been updated in the {target_table.name} table of {application_name}:"
+    else:
+        message_content = f"The following {len(ids)} row(s) have been updated in the {target_table.name} table of {application_name} by filtering {translate_filter_dict(filter_dict)}:"
+    if next_page_token:
+        message_content = (
+            f"{message_content[:-1]}. Here are the first {len(sample_rows)} row(s):"
+        )
+
+    # Above the response limits, the data to reverse the update is kept server side
+    snapshot_id: Optional[str] = None
+    if exceeds_response_limits(rows=reverse_rows):
+        snapshot_id = await SnapshotService().post(content=reverse_rows)
+        reverse_rows = []
+
+    return (
+        UseMessage(
+            role=Role.ASSISTANT,
+            content=message_content,
+            rows=sample_rows,
+            next_page_token=next_page_token,
+            total_rows=len(ids),
+        ),
+        ReverseActionUpdate(
+            reverse_rows=reverse_rows,
+            snapshot_id=snapshot_id,
+            target_table=target_table,
+            application_name=application_name,
+        ),
+    )
+
+
+async def _execute_put_by_id_method(
+    orm: Orm,
+    table_orm_model: Type[DeclarativeMeta],
+    http_method_responses: list[HttpMethodResponse],
+    target_table: Table,
+    application_name: str,
+) -> tuple[list[UseMessage], list[ReverseActionUpdate | ReverseActionGet]]:
+    """Applies PUT requests that each update one row by id with a single UPDATE, and returns the message and reverse action of each request."""
+
+    log.info("Processing data for PUT requests by id")
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
+    updated_rows: list[dict[str, Any]] = []
+    for http_method_response in http_method_responses:
+        copied_update_dict: dict[str, Any] = (
+            process_datetime_or_date_values_of_update_dict(
+                dict_to_process=copy.deepcopy(http_method_response.updated_data),
+                datetime_column_names_to_process=datetime_column_names_to_process,
+                date_column_names_to_process=date_column_names_to_process,
+                uuid_column_names_to_process=uuid_column_names_to_process,
+            )
+        )
+        copied_filter_dict: dict[str, Any] = (
+            process_datetime_or_date_values_of_filter_dict(
+                dict_to_process=copy.deepcopy(http_method_response.filter_conditions),
+                datetime_column_names_to_process=datetime_column_names_to_process,
+                date_column_names_to_process=date_column_names_to_process,
+                uuid_column_names_to_process=uuid_column_names_to_process,
+            )
+        )
+        updated_rows.append(
+            {"id": copied_filter_dict["conditions"][0]["value"], **copied_update_dict}
+        )
+
+    log.info("Initiating PUT requests by id")
+    rows, original_rows = await orm.bulk_update_by_id(
+        model=table_orm_model, updated_rows=updated_rows
+    )
+    log.debug("Rows from PUT requests by id: %s", truncate(rows))
 
     rows = process_client_facing_rows(
         db_rows=rows,
@@ -428,53 +945,242 @@ async def _execute_put_method(
         date_column_names_to_process=date_column_names_to_process,
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
-
-    reverse_filters = process_client_facing_filter_dict(
-        db_dict=reverse_filters,
+    original_rows = process_client_facing_rows(
+        db_rows=original_rows,
         datetime_column_names_to_process=datetime_column_names_to_process,
         date_column_names_to_process=date_column_names_to_process,
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
+    rows_by_id: dict[str, dict[str, Any]] = {str(row["id"]): row for row in rows}
+    original_rows_by_id: dict[str, dict[str, Any]] = {
+        str(row["id"]): row for row in original_rows
+    }
+
+    messages: list[UseMessage] = []
+    reverse_actions: list[ReverseActionUpdate | ReverseActionGet] = []
+    for http_method_response in http_method_responses:
+        id: str = str(get_row_id(http_method_response=http_method_response))
+        source: str = (
+            f"the {target_table.name} table of {application_name} by filtering {translate_filter_dict(http_method_response.filter_conditions)}"
+        )
+        # Nothing needs to be reversed if the row was not found
+        if id not in rows_by_id:
+            messages.append(
+                UseMessage(
+                    role=Role.ASSISTANT,
+                    content=f"The following 0 row(s) have been updated in {source}:",
+                    rows=[],
+                    total_rows=0,
+                )
+            )
+            reverse_actions.append(ReverseActionGet())
+            continue
 
-    reverse_updated_data = process_client_facing_update_dict(
-        db_dict=reverse_updated_data,
+        row: dict[str, Any] = rows_by_id[id]
+        messages.append(
+            UseMessage(
+                role=Role.ASSISTANT,
+                content=f"The following 1 row(s) have been updated in {source}:",
+                rows=[row],
+                total_rows=1,
+            )
+        )
+        reverse_actions.append(
+            ReverseActionUpdate(
+                reverse_rows=[original_rows_by_id[id]],
+                target_table=target_table,
+                application_name=application_name,
+            )
+        )
+    return messages, reverse_actions
+
+
+async def _execute_delete_method(
+    orm: Orm,
+    table_orm_model: Type[DeclarativeMeta],
+    http_method_response: HttpMethodResponse,
+    target_table: Table,
+    filter_dict: dict[str, Any],
+    application_name: str,
+) -> tuple[UseMessage, ReverseActionPost | ReverseActionRestore]:
+
+    copied_filter_dict: list[dict[str, Any]] = copy.deepcopy(filter_dict)
+
+    log.info("Processing data for DELETE request")
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
+    copied_filter_dict = process_datetime_or_date_values_of_filter_dict(
+        dict_to_process=copied_filter_dict,
         datetime_column_names_to_process=datetime_column_names_to_process,
         date_column_names_to_process=date_column_names_to_process,
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
 
+    log.info("Initiating DELETE request")
+    rows: list[dict[str, Any]] = []
+    snapshot_id: Optional[str] = None
+
+    async def keep_snapshot(db_rows: list[dict[str, Any]]) -> None:
+        # Called before the DELETE is committed, so that the rows are never deleted without the data needed to reverse the DELETE
+        nonlocal rows, snapshot_id
+        log.debug("Rows from DELETE request: %s", truncate(db_rows))
+        rows = process_client_facing_rows(
+            db_rows=db_rows,
+            datetime_column_names_to_process=datetime_column_names_to_process,
+            date_column_names_to_process=date_column_names_to_process,
+            uuid_column_names_to_process=uuid_column_names_to_process,
+        )
+        rows.sort(key=lambda row: row["id"])
+        if exceeds_response_limits(rows=rows):
+            # Soft deleted rows are still in the table, so only their ids are needed to restore them
+            snapshot_id = await SnapshotService().post(
+                content=(
+                    [row["id"] for row in rows]
+                    if target_table.enable_soft_delete
+                    else rows
+                )
+            )
+
+    if target_table.enable_soft_delete:
+        await orm.soft_delete_inference_result(
+            model=table_orm_model,
+            filters=copied_filter_dict,
+            before_commit=keep_snapshot,
+        )
+    else:
+        await orm.delete_inference_result(
+            model=table_orm_model,
+            filters=copied_filter_dict,
+            before_commit=keep_snapshot,
+        )
+
     message_content: str = ""
     if not filter_dict["conditions"]:
-        message_content = f"All the {len(rows)} row(s) have been updated in the {target_table.name} table of {application_name}:"
+        message_content = f"All the {len(rows)} row(s) have been deleted from the {target_table.name} table of {http_method_response.application.name}:"
     else:
-        message_content = f"The following {len(rows)} row(s) have been updated in the {target_table.name} table of {application_name} by filtering {translate_filter_dict(filter_dict)}:"
+        message_content: str = (
+            f"The following {len(rows)} row(s) have been deleted from the {target_table.name} table of {http_method_response.application.name} by filtering {translate_filter_dict(filter_dict)}:"
+        )
 
-    return (
-        message_content,
-        rows,
-        ReverseActionUpdate(
-            reverse_filter_conditions=reverse_filters,
-            reverse_updated_data=reverse_updated_data,
+    # The deleted rows no longer exist in the table so only the first page is returned. The full rows are needed to reverse the DELETE, and are kept in the snapshot when they are too large to be returned.
+    sample_rows, is_truncated = cap_rows(rows=rows, max_rows=PAGE_SIZE)
+    if is_truncated:
+        message_content = (
+            f"{message_content[:-1]}. Here are the first {len(sample_rows)} row(s):"
+        )
+
+    message: UseMessage = UseMessage(
+        role=Role.ASSISTANT,
+        content=message_content,
+        rows=sample_rows,
+        total_rows=len(rows),
+    )
+
+    if target_table.enable_soft_delete:
+        return message, ReverseActionRestore(
+            ids=[] if snapshot_id else [row["id"] for row in rows],
+            snapshot_id=snapshot_id,
             target_table=target_table,
             application_name=application_name,
+        )
+
+    deleted_data: list[dict[str, Any]] = [] if snapshot_id else rows
+
+    return message, ReverseActionPost(
+        deleted_data=deleted_data,
+        snapshot_id=snapshot_id,
+        target_table=target_table,
+        application_name=application_name,
+    )
+
+
+async def _execute_get_method(
+    orm: Orm,
+    table_orm_model: Type[DeclarativeMeta],
+    application_name: str,
+    target_table: Table,
+    filter_dict: dict[str, Any],
+    selected_columns: Optional[list[str]] = None,
+    order_by: Optional[list[OrderBy]] = None,
+    limit: Optional[int] = None,
+) -> tuple[UseMessage, ReverseActionGet]:
+
+    log.info("Initiating GET request")
+    rows, next_page_token = await _get_page(
+        orm=orm,
+        table_orm_model=table_orm_model,
+        application_name=application_name,
+        target_table=target_table,
+        page_token=PageToken(
+            application_name=application_name,
+            table_name=target_table.name,
+            filter_conditions=filter_dict,
+            selected_columns=selected_columns,
+            order_by=order_by,
+            remaining=limit,
         ),
     )
 
+    source: str = f"the {target_table.name} table of {application_name}"
+    if filter_dict["conditions"]:
+        source += f" by filtering {translate_filter_dict(filter_dict)}"
+    if order_by:
+        sort_keys: str = ", ".join(
+            f"{sort_key.column} {sort_key.direction}" for sort_key in order_by
+        )
+        source += f" sorted by {sort_keys}"
 
-async def _execute_delete_method(
+    message_content: str = ""
+    if next_page_token:
+        message_content = (
+            f"The first {len(rows)} row(s) have been retrieved from {source}:"
+        )
+    elif not filter_dict["conditions"] and limit is None:
+        message_content = (
+            f"All the {len(rows)} row(s) have been retrieved from {source}:"
+        )
+    else:
+        message_content = (
+            f"The following {len(rows)} row(s) have been retrieved from {source}:"
+        )
+
+    return (
+        UseMessage(
+            role=Role.ASSISTANT,
+            content=message_content,
+            rows=rows,
+            next_page_token=next_page_token,
+            total_rows=None if next_page_token else len(rows),
+        ),
+        ReverseActionGet(),
+    )
+
+
+async def _execute_join_method(
     orm: Orm,
     table_orm_model: Type[DeclarativeMeta],
-    http_method_response: HttpMethodResponse,
+    application: ApplicationContent,
     target_table: Table,
     filter_dict: dict[str, Any],
-    application_name: str,
-) -> tuple[str, list[dict[str, Any]], ReverseActionPost]:
+    join_tables: list[str],
+    selected_columns: Optional[list[str]] = None,
+    order_by: Optional[list[OrderBy]] = None,
+    limit: Optional[int] = None,
+) -> tuple[UseMessage, ReverseActionGet]:
 
-    copied_filter_dict: list[dict[str, Any]] = copy.deepcopy(filter_dict)
+    copied_filter_dict: dict[str, Any] = copy.deepcopy(filter_dict)
 
-    log.info("Processing data for DELETE request")
-    datetime_column_names_to_process, date_column_names_to_process, uuid_column_names_to_process = (
-        identify_columns_to_process(table=target_table)
+    log.info("Processing data for GET request with joins")
+    (
+        joins,
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = _resolve_joins(
+        application=application, target_table=target_table, join_tables=join_tables
     )
     copied_filter_dict = process_datetime_or_date_values_of_filter_dict(
         dict_to_process=copied_filter_dict,
@@ -483,12 +1189,21 @@ async def _execute_delete_method(
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
 
-    log.info("Initiating DELETE request")
-    rows: list[dict[str, Any]] = await orm.delete_inference_result(
+    # Joined rows are not paginated, so at most one page of rows is returned
+    page_size: int = PAGE_SIZE if limit is None else min(limit, PAGE_SIZE)
+
+    log.info("Initiating GET request with joins")
+    rows: list[dict[str, Any]] = await orm.get_joined_inference_result(
         model=table_orm_model,
+        joins=joins,
         filters=copied_filter_dict,
+        selected_columns=selected_columns,
+        order_by=[sort_key.model_dump() for sort_key in order_by or []],
+        limit=page_size + 1,
     )
-    log.info(f"Rows from DELETE request: {rows}")
+    log.debug("Rows from GET request with joins: %s", truncate(rows))
+    is_truncated: bool = len(rows) > page_size
+    rows = rows[:page_size]
 
     rows = process_client_facing_rows(
         db_rows=rows,
@@ -497,52 +1212,177 @@ async def _execute_delete_method(
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
 
+    source: str = (
+        f"the {target_table.name} table of {application.name} joined with the {', '.join(join_tables)} table(s)"
+    )
+    if filter_dict["conditions"]:
+        source += f" by filtering {translate_filter_dict(filter_dict)}"
+    if order_by:
+        sort_keys: str = ", ".join(
+            f"{sort_key.column} {sort_key.direction}" for sort_key in order_by
+        )
+        source += f" sorted by {sort_keys}"
+
     message_content: str = ""
-    if not filter_dict["conditions"]:
-        message_content = f"All the {len(rows)} row(s) have been deleted from the {target_table.name} table of {http_method_response.application.name}:"
+    if is_truncated:
+        message_content = (
+            f"The first {len(rows)} row(s) have been retrieved from {source}:"
+        )
     else:
-        message_content: str = (
-            f"The following {len(rows)} row(s) have been deleted from the {target_table.name} table of {http_method_response.application.name} by filtering {translate_filter_dict(filter_dict)}:"
+        message_content = (
+            f"The following {len(rows)} row(s) have been retrieved from {source}:"
         )
 
     return (
-        message_content,
-        rows,
-        ReverseActionPost(
-            deleted_data=rows,
-            target_table=target_table,
-            application_name=application_name,
+        UseMessage(
+            role=Role.ASSISTANT,
+            content=message_content,
+            rows=rows,
+            total_rows=None if is_truncated else len(rows),
         ),
+        ReverseActionGet(),
     )
 
 
-async def _execute_get_method(
+def _resolve_joins(
+    application: ApplicationContent, target_table: Table, join_tables: list[str]
+) -> tuple[list[dict[str, Any]], list[str], list[str], list[str]]:
+    """Resolves the join condition of each table from the foreign keys declared between it and the target table or a table joined before it.
+
+    Returns the joins, followed by the datetime, date and uuid column names to process, where the columns of joined tables are named "{table}.{column}".
+    """
+    tables_by_name: dict[str, Table] = {
+        table.name: table for table in application.tables
+    }
+    joined_tables: list[Table] = [target_table]
+    joins: list[dict[str, Any]] = []
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
+
+    for name in join_tables:
+        if name not in tables_by_name:
+            raise ValueError(
+                f"Table {name} not found in application {application.name}"
+            )
+        if any(table.name == name for table in joined_tables):
+            raise ValueError(f"Table {name} cannot be joined more than once")
+        table: Table = tables_by_name[name]
+
+        join: Optional[dict[str, Any]] = None
+        for left_table in joined_tables:
+            join_columns: Optional[tuple[str, str]] = _find_join_columns(
+                left_table=left_table, right_table=table
+            )
+            if join_columns:
+                join = {
+                    "name": name,
+                    "model": create_dynamic_orm(
+                        table=table, application_name=application.name
+                    ),
+                    "left_model": create_dynamic_orm(
+                        table=left_table, application_name=application.name
+                    ),
+                    "left_column": join_columns[0],
+                    "right_column": join_columns[1],
+                }
+                break
+        if not join:
+            raise ValueError(
+                f"Table {name} has no foreign key relationship with {', '.join(table.name for table in joined_tables)}"
+            )
+        joins.append(join)
+        joined_tables.append(table)
+
+        datetime_column_names, date_column_names, uuid_column_names = (
+            identify_columns_to_process(table=table)
+        )
+        datetime_column_names_to_process.extend(
+            f"{name}.{column_name}" for column_name in datetime_column_names
+        )
+        date_column_names_to_process.extend(
+            f"{name}.{column_name}" for column_name in date_column_names
+        )
+        uuid_column_names_to_process.extend(
+            f"{name}.{column_name}" for column_name in uuid_column_names
+        )
+
+    return (
+        joins,
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    )
+
+
+def _find_join_columns(
+    left_table: Table, right_table: Table
+) -> Optional[tuple[str, str]]:
+    """Returns the left and right columns of the foreign key between the two tables, in either direction."""
+    for column in left_table.columns:
+        if column.foreign_key and column.foreign_key.table == right_table.name:
+            return column.name, column.foreign_key.column
+    for column in right_table.columns:
+        if column.foreign_key and column.foreign_key.table == left_table.name:
+            return column.foreign_key.column, column.name
+    return None
+
+
+async def _get_page(
     orm: Orm,
     table_orm_model: Type[DeclarativeMeta],
     application_name: str,
     target_table: Table,
-    filter_dict: dict[str, Any],
-) -> tuple[str, list[dict[str, Any]], ReverseActionGet]:
-
-    copied_filter_dict: list[dict[str, Any]] = copy.deepcopy(filter_dict)
+    page_token: PageToken,
+) -> tuple[list[dict[str, Any]], Optional[str]]:
+    """Fetches the page of rows described by the page token and returns it with the token of the next page, if any."""
+    filter_conditions: dict[str, Any] = page_token.filter_conditions
+    next_snapshot_id: Optional[str] = None
+    if page_token.snapshot_id is not None:
+        content: dict[str, Any] = await SnapshotService().get(id=page_token.snapshot_id)
+        filter_conditions = _ids_to_filter_dict(ids=content["page"])
+        next_snapshot_id = content["next_snapshot_id"]
+    copied_filter_dict: dict[str, Any] = copy.deepcopy(filter_conditions)
 
-    log.info("Processing data for GET request")
-    datetime_column_names_to_process, date_column_names_to_process, uuid_column_names_to_process = (
-        identify_columns_to_process(table=target_table)
-    )
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
     copied_filter_dict = process_datetime_or_date_values_of_filter_dict(
         dict_to_process=copied_filter_dict,
         datetime_column_names_to_process=datetime_column_names_to_process,
         date_column_names_to_process=date_column_names_to_process,
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
+    # The keyset position is stored in its client facing form, so it is processed the same way as the filter values
+    after: Optional[dict[str, Any]] = None
+    if page_token.after is not None:
+        after_filter_dict: dict[str, Any] = (
+            process_datetime_or_date_values_of_filter_dict(
+                dict_to_process=_keyset_to_filter_dict(after=page_token.after),
+                datetime_column_names_to_process=datetime_column_names_to_process,
+                date_column_names_to_process=date_column_names_to_process,
+                uuid_column_names_to_process=uuid_column_names_to_process,
+            )
+        )
+        after = _filter_dict_to_keyset(filter_dict=after_filter_dict)
 
-    log.info("Initiating GET request")
-    rows: list[dict[str, Any]] = await orm.get_inference_result(
+    page_size: int = PAGE_SIZE
+    if page_token.remaining is not None:
+        page_size = min(PAGE_SIZE, page_token.remaining)
+
+    rows, next_after = await orm.get_inference_result(
         model=table_orm_model,
         filters=copied_filter_dict,
+        selected_columns=page_token.selected_columns,
+        order_by=[sort_key.model_dump() for sort_key in page_token.order_by or []],
+        limit=page_size,
+        after=after,
     )
-    log.info(f"Rows from GET request: {rows}")
+    log.debug("Rows from page of %s: %s", target_table.name, truncate(rows))
 
     rows = process_client_facing_rows(
         db_rows=rows,
@@ -551,10 +1391,131 @@ async def _execute_get_method(
         uuid_column_names_to_process=uuid_column_names_to_process,
     )
 
+    if page_token.snapshot_id is not None:
+        if next_snapshot_id is None:
+            return rows, None
+        return rows, encode_page_token(
+            page_token.model_copy(update={"snapshot_id": next_snapshot_id})
+        )
+
+    remaining: Optional[int] = None
+    if page_token.remaining is not None:
+        remaining = page_token.remaining - len(rows)
+    if next_after is None or remaining == 0:
+        return rows, None
+
+    next_after_filter_dict: dict[str, Any] = process_client_facing_filter_dict(
+        db_dict=_keyset_to_filter_dict(after=next_after),
+        datetime_column_names_to_process=datetime_column_names_to_process,
+        date_column_names_to_process=date_column_names_to_process,
+        uuid_column_names_to_process=uuid_column_names_to_process,
+    )
+    next_page_token: str = encode_page_token(
+        page_token.model_copy(
+            update={
+                "after": _filter_dict_to_keyset(filter_dict=next_after_filter_dict),
+                "remaining": remaining,
+            }
+        )
+    )
+    return rows, next_page_token
+
+
+def _ids_to_filter_dict(ids: list[Any]) -> dict[str, Any]:
+    return {
+        "boolean_clause": "AND",
+        "conditions": [{"column": "id", "operator": "IN", "value": ids}],
+    }
+
+
+def _keyset_to_filter_dict(after: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "boolean_clause": "AND",
+        "conditions": [
+            {"column": column, "operator": "=", "value": value}
+            for column, value in after.items()
+        ],
+    }
+
+
+def _filter_dict_to_keyset(filter_dict: dict[str, Any]) -> dict[str, Any]:
+    return {
+        condition["column"]: condition["value"]
+        for condition in filter_dict["conditions"]
+    }
+
+
+async def _execute_aggregate_method(
+    orm: Orm,
+    table_orm_model: Type[DeclarativeMeta],
+    application_name: str,
+    target_table: Table,
+    filter_dict: Optional[dict[str, Any]],
+    aggregations: Optional[list[Aggregation]],
+    group_by: Optional[list[str]],
+) -> tuple[UseMessage, ReverseActionGet]:
+    if not aggregations:
+        raise ValueError("AGGREGATE request must contain at least one aggregation")
+    filter_dict = filter_dict or {"boolean_clause": "AND", "conditions": []}
+    copied_filter_dict: dict[str, Any] = copy.deepcopy(filter_dict)
+
+    log.info("Processing data for AGGREGATE request")
+    (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    ) = identify_columns_to_process(table=target_table)
+    copied_filter_dict = process_datetime_or_date_values_of_filter_dict(
+        dict_to_process=copied_filter_dict,
+        datetime_column_names_to_process=datetime_column_names_to_process,
+        date_column_names_to_process=date_column_names_to_process,
+        uuid_column_names_to_process=uuid_column_names_to_process,
+    )
+
+    log.info("Initiating AGGREGATE request")
+    rows, is_approximate = await orm.aggregate_inference_result(
+        model=table_orm_model,
+        filters=copied_filter_dict,
+        aggregations=[
+            {
+                "function": aggregation.function,
+                "column": aggregation.column,
+                "alias": aggregation.alias,
+            }
+            for aggregation in aggregations
+        ],
+        group_by=group_by,
+    )
+    log.debug("Rows from AGGREGATE request: %s", truncate(rows))
+
+    rows = process_client_facing_aggregate_rows(db_rows=rows)
+    sample_rows, is_truncated = cap_rows(rows=rows)
+
+    aggregation_names: str = ", ".join(
+        aggregation.alias for aggregation in aggregations
+    )
     message_content: str = ""
-    if not filter_dict["conditions"]:
-        message_content = f"All the {len(rows)} row(s) have been retrieved from the {target_table.name} table of {application_name}:"
+    if is_approximate:
+        message_content = f"The {target_table.name} table of {application_name} contains approximately the following number of row(s):"
+    elif not filter_dict["conditions"]:
+        message_content = f"The {aggregation_names} of the {target_table.name} table of {application_name} have been computed"
     else:
-        message_content = f"The following row(s) have been retrieved from the {target_table.name} table of {application_name} by filtering {translate_filter_dict(filter_dict)}:"
+        message_content = f"The {aggregation_names} of the {target_table.name} table of {application_name} have been computed by filtering {translate_filter_dict(filter_dict)}"
+    if group_by:
+        message_content += f" grouped by {', '.join(group_by)}"
+    if is_truncated:
+        message_content += (
+            f". Here are the first {len(sample_rows)} of {len(rows)} group(s)"
+        )
+    if not is_approximate:
+        message_content += ":"
 
-    return message_content, rows, ReverseActionGet()
+    return (
+        UseMessage(
+            role=Role.ASSISTANT,
+            content=message_content,
+            rows=sample_rows,
+            total_rows=len(rows),
+        ),
+        ReverseActionGet(),
+    )
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import timedelta
+from typing import Any, Awaitable, Callable
+
+from app.connectors.orm import Orm
+from app.models.application.base import Table
+from app.models.stores.application import Application, ApplicationORM
+from app.models.stores.dynamic import create_dynamic_orm
+from app.models.stores.idempotency import IdempotencyORM
+from app.services.snapshot import SnapshotService
+from app.stores.utils.idempotency import IDEMPOTENCY_BACKEND
+
+log = logging.getLogger(__name__)
+
+# Soft deleted rows can be restored (i.e. their DELETE undone) until they are older than the retention
+SOFT_DELETE_RETENTION_SECONDS = int(
+    os.environ.get("SOFT_DELETE_RETENTION_SECONDS", "604800")
+)
+PURGE_INTERVAL_SECONDS = int(os.environ.get("PURGE_INTERVAL_SECONDS", "3600"))
+PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", "1000"))
+# Key of the advisory lock held on the internal database by the worker purging, so the other workers skip their turn
+PURGE_LOCK_KEY = 7461830277
+
+
+class PurgeService:
+    async def purge(self) -> int:
+        """Permanently deletes the expired soft deleted rows of every application with soft delete enabled, the expired snapshots and the expired idempotency keys, one batch per transaction, and returns the number of entries purged."""
+        internal_orm = Orm(is_user_facing=False)
+        applications: list[Application] = await internal_orm.static_get(
+            orm_model=ApplicationORM,
+            pydantic_model=Application,
+            filters={"boolean_clause": "AND", "conditions": []},
+        )
+
+        orm = Orm(is_user_facing=True)
+        total_purged: int = 0
+        for application in applications:
+            tables: list[Table] = [
+                Table.model_validate(table) for table in json.loads(application.tables)
+            ]
+            for table in tables:
+                if not table.enable_soft_delete:
+                    continue
+                table_orm_model = create_dynamic_orm(
+                    table=table, application_name=application.name
+                )
+                references: list[dict[str, Any]] = [
+                    {
+                        "model": create_dynamic_orm(
+                            table=referencing_table,
+                            application_name=application.name,
+                        ),
+                        "column": column.name,
+                        "referenced_column": column.foreign_key.column,
+                    }
+                    for referencing_table in tables
+                    for column in referencing_table.columns
+                    if column.foreign_key and column.foreign_key.table == table.name
+                ]
+                while True:
+                    purged: int = await orm.purge_soft_deleted(
+                        model=table_orm_model,
+                        retention=timedelta(seconds=SOFT_DELETE_RETENTION_SECONDS),
+                        batch_size=PURGE_BATCH_SIZE,
+                        references=references,
+                    )
+                    total_purged += purged
+                    if purged < PURGE_BATCH_SIZE:
+                        break
+
+        purged_snapshots: int = await _purge_in_batches(
+            lambda: SnapshotService().purge_expired(batch_size=PURGE_BATCH_SIZE)
+        )
+        purged_idempotency_keys: int = 0
+        if IDEMPOTENCY_BACKEND == "postgres":
+            purged_idempotency_keys = await _purge_in_batches(
+                lambda: internal_orm.static_purge_expired(
+                    orm_model=IdempotencyORM, batch_size=PURGE_BATCH_SIZE
+                )
+            )
+        log.info(
+            f"Purged {total_purged} soft deleted rows, {purged_snapshots} expired snapshots and {purged_idempotency_keys} expired idempotency keys"
+        )
+        return total_purged + purged_snapshots + purged_idempotency_keys
+
+    async def run(self) -> None:
+        """Purges the expired soft deleted rows, snapshots and idempotency keys every PURGE_INTERVAL_SECONDS until cancelled, unless another worker holds the purge lock."""
+        while True:
+            try:
+                async with Orm(is_user_facing=False).try_advisory_lock(
+                    PURGE_LOCK_KEY
+                ) as acquired:
+                    if acquired:
+                        await self.purge()
+                    else:
+                        log.info("Skipping the purge, another worker is purging")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A cancellation while connecting can surface as a SQLAlchemy error instead
+                if asyncio.current_task().cancelling():
+                    raise asyncio.CancelledError from e
+                log.error(f"Error purging expired entries: {e}")
+            await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+
+
+async def _purge_in_batches(purge_batch: Callable[[], Awaitable[int]]) -> int:
+    total_purged: int = 0
+    while True:
+        purged: int = await purge_batch()
+        total_purged += purged
+        if purged < PURGE_BATCH_SIZE:
+            return total_purged
@@ -0,0 +1,97 @@
+import json
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.connectors.notify import invalidation_bus
+from app.connectors.orm import Orm, get_application_engine
+from app.models.application.base import ApplicationContent, DataType, Table
+from app.models.stores.application import Application, ApplicationORM
+from app.models.stores.dynamic import get_schema_name
+from app.stores.base.main import execute_script
+from app.stores.sqls.template import generate_schema_script
+
+log = logging.getLogger(__name__)
+
+
+class SchemaService:
+    async def migrate(self, application_content: ApplicationContent) -> int:
+        """Moves the tables of an application generated before applications had their own schema, named "{application}_{table}" in the public schema, into the schema of the application, and returns the number of tables moved.
+
+        The tables keep their rows, indexes and constraints. Their enum types are moved along with them, and their updated_at triggers are recreated on the trigger function of the schema. Tables that were moved already are skipped, so the migration can be run again after a failure.
+        """
+        application_name: str = application_content.name
+        schema_name: str = get_schema_name(application_name)
+        engine: AsyncEngine = await get_application_engine(application_name)
+        moved_tables: int = 0
+        async with engine.begin() as connection:
+            await execute_script(
+                connection=connection,
+                sql_script=generate_schema_script(schema_name=schema_name),
+            )
+            for table in application_content.tables:
+                legacy_name: str = f"{application_name}_{table.name}"
+                is_legacy: bool = (
+                    await connection.execute(
+                        text("SELECT to_regclass(:table_name) IS NOT NULL"),
+                        {"table_name": f"public.{legacy_name}"},
+                    )
+                ).scalar()
+                if not is_legacy:
+                    continue
+
+                statements: list[str] = [
+                    f"ALTER TABLE public.{legacy_name} SET SCHEMA {schema_name}",
+                    f"ALTER TABLE {schema_name}.{legacy_name} RENAME TO {table.name}",
+                ]
+                for column in table.columns:
+                    if column.data_type == DataType.ENUM:
+                        statements.append(
+                            f"ALTER TYPE public.{legacy_name}_{column.name}_enum SET SCHEMA {schema_name}"
+                        )
+                        statements.append(
+                            f"ALTER TYPE {schema_name}.{legacy_name}_{column.name}_enum RENAME TO {table.name}_{column.name}_enum"
+                        )
+                if table.enable_updated_at_timestamp:
+                    statements.append(
+                        f"DROP TRIGGER IF EXISTS update_{legacy_name}_updated_at ON {schema_name}.{table.name}"
+                    )
+                    statements.append(
+                        f"CREATE TRIGGER update_{table.name}_updated_at BEFORE UPDATE ON {schema_name}.{table.name} FOR EACH ROW EXECUTE FUNCTION {schema_name}.update_updated_at_column()"
+                    )
+                await execute_script(
+                    connection=connection, sql_script="##".join(statements)
+                )
+                moved_tables += 1
+
+        if moved_tables:
+            await invalidation_bus.publish(application_name)
+            log.info(
+                f"Moved {moved_tables} table(s) of {application_name} to {schema_name}"
+            )
+        return moved_tables
+
+    async def migrate_existing_applications(self) -> int:
+        """Moves the tables of every application left in the public schema into the schema of the application, and returns the number of tables moved. Applications migrated already are skipped, so it is run on every start."""
+        applications: list[Application] = await Orm(is_user_facing=False).static_get(
+            orm_model=ApplicationORM,
+            pydantic_model=Application,
+            filters={"boolean_clause": "AND", "conditions": []},
+            is_primary=True,
+        )
+        moved_tables: int = 0
+        for application in applications:
+            moved_tables += await self.migrate(
+                application_content=ApplicationContent(
+                    name=application.name,
+                    tables=[
+                        Table.model_validate(table)
+                        for table in json.loads(application.tables)
+                    ],
+                )
+            )
+        log.info(
+            f"Moved {moved_tables} table(s) of {len(applications)} application(s) to their schemas"
+        )
+        return moved_tables
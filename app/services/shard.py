@@ -0,0 +1,216 @@
+import logging
+from typing import Any, Optional, Type
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.orm.decl_api import DeclarativeMeta
+
+from app.connectors.notify import invalidation_bus
+from app.connectors.orm import (
+    Orm,
+    get_application_engine,
+    get_engine,
+    load_placements,
+    shard_map,
+)
+from app.models.application.base import ApplicationContent, PrimaryKey
+from app.models.stores.application import Application, ApplicationORM
+from app.models.stores.dynamic import create_dynamic_orm, get_schema_name
+from app.models.stores.shard import ApplicationShard, ApplicationShardORM
+from app.stores.base.main import execute_script
+from app.stores.sqls.template import (
+    generate_foreign_key_scripts,
+    generate_schema_script,
+    generate_table_scripts,
+)
+
+log = logging.getLogger(__name__)
+
+COPY_BATCH_SIZE = 1000
+
+
+class ShardService:
+    async def assign(self, application_name: str) -> str:
+        """Places a new application on its shard on the hash ring, and returns the shard the application is placed on."""
+        if not shard_map.is_sharded:
+            return shard_map.default_shard
+        await load_placements(application_name=application_name)
+        shard: Optional[str] = shard_map.placement_of(application_name)
+        if shard is None:
+            shard = shard_map.ring.get(application_name)
+            await self.place(application_name=application_name, shard=shard)
+        return shard
+
+    async def place(self, application_name: str, shard: str) -> None:
+        """Records the shard of the application. The other workers pick it up once the change of the application is published."""
+        orm = Orm(is_user_facing=False)
+        filters: dict = {
+            "boolean_clause": "AND",
+            "conditions": [
+                {
+                    "column": "application_name",
+                    "operator": "=",
+                    "value": application_name,
+                }
+            ],
+        }
+        placements: list[ApplicationShard] = await orm.static_get(
+            orm_model=ApplicationShardORM,
+            pydantic_model=ApplicationShard,
+            filters=filters,
+            is_primary=True,
+        )
+        if placements:
+            await orm.static_update(
+                orm_model=ApplicationShardORM,
+                filters=filters,
+                updated_data={"shard": shard},
+                increment_field=None,
+            )
+        else:
+            placement = ApplicationShard.local(
+                application_name=application_name, shard=shard
+            )
+            await orm.static_post(
+                orm_model=ApplicationShardORM, data=[placement.model_dump()]
+            )
+        shard_map.invalidate(application_name)
+
+    async def place_existing_applications(self) -> int:
+        """Places the applications without a placement on the default shard, where the applications created before the sharding live, and returns the number of applications placed."""
+        if not shard_map.is_sharded:
+            return 0
+        orm = Orm(is_user_facing=False)
+        applications: list[Application] = await orm.static_get(
+            orm_model=ApplicationORM,
+            pydantic_model=Application,
+            filters={"boolean_clause": "AND", "conditions": []},
+            is_primary=True,
+        )
+        placements: list[ApplicationShard] = await orm.static_get(
+            orm_model=ApplicationShardORM,
+            pydantic_model=ApplicationShard,
+            filters={"boolean_clause": "AND", "conditions": []},
+            is_primary=True,
+        )
+        placed_names: set[str] = {
+            placement.application_name for placement in placements
+        }
+        placed_applications: int = 0
+        for application_name in sorted(
+            {application.name for application in applications} - placed_names
+        ):
+            await self.place(
+                application_name=application_name, shard=shard_map.default_shard
+            )
+            await invalidation_bus.publish(application_name)
+            placed_applications += 1
+        log.info(
+            f"Placed {placed_applications} application(s) on shard {shard_map.default_shard}"
+        )
+        return placed_applications
+
+    async def move(
+        self,
+        application_content: ApplicationContent,
+        shard: str,
+        is_source_dropped: bool = True,
+    ) -> int:
+        """Moves the tables of the application to the shard and returns the number of rows copied.
+
+        The tables stay readable during the move, but writes to them wait until it is done. They are locked on the source shard, created and filled on the target shard in a single transaction, and then the application is placed on the target shard and every worker is told to pick up the placement. The source tables are dropped last, so the writes that waited fail instead of going to tables that are no longer used.
+        """
+        if shard not in shard_map.urls:
+            raise ValueError(f"Shard {shard} is not configured")
+        application_name: str = application_content.name
+        source: AsyncEngine = await get_application_engine(application_name)
+        target: AsyncEngine = get_engine(is_user_facing=True, shard=shard)
+        if source is target:
+            log.info(f"{application_name} is already on shard {shard}")
+            return 0
+
+        models: list[Type[DeclarativeMeta]] = [
+            create_dynamic_orm(table=table, application_name=application_name)
+            for table in application_content.tables
+        ]
+        schema_name: str = get_schema_name(application_name)
+        table_names: str = ", ".join(model.__table__.fullname for model in models)
+        copied_rows: int = 0
+        async with source.connect() as source_connection:
+            await source_connection.execute(
+                text(f"LOCK TABLE {table_names} IN SHARE MODE")
+            )
+            async with target.begin() as target_connection:
+                await execute_script(
+                    connection=target_connection,
+                    sql_script=generate_schema_script(schema_name=schema_name),
+                )
+                for table_script in generate_table_scripts(
+                    application_content=application_content
+                ).values():
+                    await execute_script(
+                        connection=target_connection, sql_script=table_script
+                    )
+                for model in models:
+                    copied_rows += await _copy_rows(
+                        model=model,
+                        source_connection=source_connection,
+                        target_connection=target_connection,
+                    )
+                # The constraints are added once every table is filled, so that the tables can be copied in any order
+                for foreign_key_script in generate_foreign_key_scripts(
+                    application_content=application_content
+                ).values():
+                    await execute_script(
+                        connection=target_connection, sql_script=foreign_key_script
+                    )
+                for table, model in zip(application_content.tables, models):
+                    if table.primary_key == PrimaryKey.AUTO_INCREMENT:
+                        await _reset_identity(
+                            connection=target_connection,
+                            table_name=model.__table__.fullname,
+                        )
+
+            await self.place(application_name=application_name, shard=shard)
+            await invalidation_bus.publish(application_name)
+            log.info(f"Moved {copied_rows} rows of {application_name} to shard {shard}")
+
+            if is_source_dropped:
+                # Along with the enum types and the trigger function of the application
+                await source_connection.execute(
+                    text(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE")
+                )
+            await source_connection.commit()
+        return copied_rows
+
+
+async def _copy_rows(
+    model: Type[DeclarativeMeta],
+    source_connection: AsyncConnection,
+    target_connection: AsyncConnection,
+) -> int:
+    # Batches are keyset paginated on the id instead of streamed, since the cursor of a stream would keep the table in use until the end of the transaction, and the table could not be dropped
+    table = model.__table__
+    copied_rows: int = 0
+    last_id: Optional[Any] = None
+    while True:
+        query = select(table).order_by(table.c.id).limit(COPY_BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(table.c.id > last_id)
+        rows: list[dict[str, Any]] = [
+            dict(row) for row in (await source_connection.execute(query)).mappings()
+        ]
+        if not rows:
+            return copied_rows
+        await target_connection.execute(insert(table), rows)
+        copied_rows += len(rows)
+        last_id = rows[-1]["id"]
+
+
+async def _reset_identity(connection: AsyncConnection, table_name: str) -> None:
+    # The copied ids were inserted explicitly, so the identity would otherwise hand out ids that are taken
+    await connection.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table_name}"
+        )
+    )
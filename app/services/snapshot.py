@@ -0,0 +1,63 @@
+import json
+import os
+from datetime import timedelta
+from typing import Any, Optional
+
+from app.connectors.orm import Orm
+from app.models.stores.snapshot import Snapshot, SnapshotORM
+
+# Actions whose data is kept in a snapshot can be reversed until the snapshot is older than the retention
+SNAPSHOT_RETENTION_SECONDS = int(os.environ.get("SNAPSHOT_RETENTION_SECONDS", "604800"))
+
+
+class SnapshotService:
+    async def post(self, content: Any) -> str:
+        """Stores the JSON serialisable content in the internal database and returns its id."""
+        snapshot = Snapshot.local(
+            content=content, retention=timedelta(seconds=SNAPSHOT_RETENTION_SECONDS)
+        )
+        orm = Orm(is_user_facing=False)
+        await orm.static_post(orm_model=SnapshotORM, data=[snapshot.model_dump()])
+        return str(snapshot.id)
+
+    async def post_pages(self, pages: list[Any]) -> str:
+        """Stores each page in a snapshot whose content is {"page": <page>, "next_snapshot_id": <id of the snapshot of the next page, or None>}, in a single statement, and returns the id of the snapshot of the first page."""
+        retention = timedelta(seconds=SNAPSHOT_RETENTION_SECONDS)
+        snapshots: list[Snapshot] = []
+        next_snapshot_id: Optional[str] = None
+        for page in reversed(pages):
+            snapshot = Snapshot.local(
+                content={"page": page, "next_snapshot_id": next_snapshot_id},
+                retention=retention,
+            )
+            snapshots.append(snapshot)
+            next_snapshot_id = str(snapshot.id)
+        orm = Orm(is_user_facing=False)
+        await orm.static_post(
+            orm_model=SnapshotORM,
+            data=[snapshot.model_dump() for snapshot in snapshots],
+        )
+        return next_snapshot_id
+
+    async def get(self, id: str) -> Any:
+        orm = Orm(is_user_facing=False)
+        result: list[Snapshot] = await orm.static_get(
+            orm_model=SnapshotORM,
+            pydantic_model=Snapshot,
+            filters={
+                "boolean_clause": "AND",
+                "conditions": [{"column": "id", "operator": "=", "value": id}],
+            },
+            # The snapshot is usually written by the request just before, which a replica may not have yet
+            is_primary=True,
+        )
+        if len(result) != 1:
+            raise ValueError(f"Snapshot of id {id} not found.")
+        return json.loads(result[0].content)
+
+    async def purge_expired(self, batch_size: int) -> int:
+        """Deletes one batch of the expired snapshots, and returns the number of snapshots deleted."""
+        orm = Orm(is_user_facing=False)
+        return await orm.static_purge_expired(
+            orm_model=SnapshotORM, batch_size=batch_size
+        )
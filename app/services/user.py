@@ -3,17 +3,18 @@ from typing import Any, Optional
 from app.connectors.orm import Orm
 from app.models.stores.user import User, UserORM
 
-orm = Orm(is_user_facing=False)
-
 
 class UserService:
+    def __init__(self):
+        self.orm = Orm(is_user_facing=False)
+
     async def get(
         self,
         user_id: str,
         user_email: Optional[str] = None,
         fields: Optional[set[str]] = None,
     ) -> Any:
-        result: list[User] = await orm.static_get(
+        result: list[User] = await self.orm.static_get(
             orm_model=UserORM,
             pydantic_model=User,
             filters={
@@ -26,7 +27,15 @@ class UserService:
                 raise ValueError(f"User of id {user_id} not found.")
             # User email is only sent during initial fetch at login
             result = await self.post(
-                users=[User.local(id=user_id, email=user_email, applications=[], visits=0, total_calls=0)]
+                users=[
+                    User.local(
+                        id=user_id,
+                        email=user_email,
+                        applications=[],
+                        visits=0,
+                        total_calls=0,
+                    )
+                ]
             )
         elif len(result) > 1:
             raise ValueError(f"Multiple users found for id {user_id}")
@@ -46,7 +55,7 @@ class UserService:
         updated_data: Optional[dict[str, Any]],
         increment_field: Optional[str],
     ) -> None:
-        await orm.static_update(
+        await self.orm.static_update(
             orm_model=UserORM,
             filters=filters,
             updated_data=updated_data,
@@ -54,7 +63,7 @@ class UserService:
         )
 
     async def post(self, users: list[User]) -> list[User]:
-        await orm.static_post(
+        await self.orm.static_post(
             orm_model=UserORM, data=[user.model_dump() for user in users]
         )
         return users
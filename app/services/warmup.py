@@ -0,0 +1,94 @@
+import logging
+import os
+import time
+
+from app.connectors.orm import DATABASE_POOL_SIZE, Orm, warm_engine
+from app.models.application.base import ApplicationContent
+from app.models.stores.application import Application, ApplicationORM
+from app.models.stores.dynamic import create_dynamic_orm
+from app.models.stores.user import User, UserORM
+from app.services.message import MessageService
+from app.stores.utils.process import identify_columns_to_process
+
+log = logging.getLogger(__name__)
+
+# Warming up delays the startup of each worker until it is done, so it is opt in
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "false").lower() == "true"
+WARMUP_APPLICATIONS = int(os.environ.get("WARMUP_APPLICATIONS", "20"))
+
+
+class WarmupService:
+    async def warm_up(self) -> dict[str, float]:
+        """Pays the cold costs of the most recently used applications before the first request does, and returns the seconds spent in each phase.
+
+        The applications are the ones cached by the most recently active users, topped up with the most recently updated applications. Their contents are loaded into the application cache, their dynamic ORMs are built, and a query on each of their tables is compiled and prepared. The engines open their pool size of connections first.
+        """
+        timings: dict[str, float] = {}
+        started_at: float = time.monotonic()
+
+        await warm_engine(is_user_facing=True, connections=DATABASE_POOL_SIZE)
+        await warm_engine(is_user_facing=False, connections=DATABASE_POOL_SIZE)
+        timings["connections"] = time.monotonic() - started_at
+
+        phase_started_at: float = time.monotonic()
+        application_names: list[str] = await self._get_recent_application_names()
+        application_content_lst: list[
+            ApplicationContent
+        ] = await MessageService().get_application_content_lst(
+            application_names=application_names
+        )
+        timings["applications"] = time.monotonic() - phase_started_at
+
+        phase_started_at = time.monotonic()
+        orm = Orm(is_user_facing=True)
+        for application_content in application_content_lst:
+            for table in application_content.tables:
+                table_orm_model = create_dynamic_orm(
+                    table=table, application_name=application_content.name
+                )
+                identify_columns_to_process(table=table)
+                try:
+                    await orm.warm_model(model=table_orm_model)
+                except Exception as e:
+                    # A table that cannot be queried fails its requests later, but must not fail the startup
+                    log.warning(
+                        f"Error warming up {table_orm_model.__tablename__}: {e}"
+                    )
+        timings["models"] = time.monotonic() - phase_started_at
+
+        timings["total"] = time.monotonic() - started_at
+        log.info(
+            f"Warmed up {len(application_content_lst)} application(s) in {timings['total']:.3f}s "
+            + ", ".join(
+                f"{phase}={seconds:.3f}s"
+                for phase, seconds in timings.items()
+                if phase != "total"
+            )
+        )
+        return timings
+
+    async def _get_recent_application_names(self) -> list[str]:
+        orm = Orm(is_user_facing=False)
+        users: list[User] = await orm.static_get(
+            orm_model=UserORM,
+            pydantic_model=User,
+            filters={"boolean_clause": "AND", "conditions": []},
+            order_by=[{"column": "updated_at", "direction": "DESC"}],
+            limit=WARMUP_APPLICATIONS,
+        )
+        # dict keeps the order of the most recently active users first
+        names: dict[str, None] = {}
+        for user in users:
+            for name in user.applications:
+                names[name] = None
+        if len(names) < WARMUP_APPLICATIONS:
+            applications: list[Application] = await orm.static_get(
+                orm_model=ApplicationORM,
+                pydantic_model=Application,
+                filters={"boolean_clause": "AND", "conditions": []},
+                order_by=[{"column": "updated_at", "direction": "DESC"}],
+                limit=WARMUP_APPLICATIONS,
+            )
+            for application in applications:
+                names[application.name] = None
+        return list(names)[:WARMUP_APPLICATIONS]
@@ -1,28 +1,36 @@
 import logging
-import os
 
 import sqlalchemy
-from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.asyncio import AsyncConnection
 
-log = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
-
-EXTERNAL_DATABASE_URL = os.environ.get("EXTERNAL_DATABASE_URL")
+from app.connectors.orm import get_application_engine
+from app.connectors.query_stats import traced
+from app.stores.utils.log import truncate
 
+log = logging.getLogger(__name__)
 
-async def execute_client_script(table_name: str, sql_script: str):
-    sql_statements = sql_script.split("##")
 
-    engine = create_async_engine(EXTERNAL_DATABASE_URL)
+@traced
+async def execute_client_script(
+    application_name: str, table_name: str, sql_script: str
+):
+    """Executes the script in a transaction on the shard of the application."""
+    engine = await get_application_engine(application_name)
     async with engine.begin() as connection:
-        for statement in sql_statements:
-            statement = statement.strip()
-            if statement:
-                try:
-                    await connection.execute(sqlalchemy.text(statement))
-                    log.info(f"Executed SQL statement: {statement}")
-                except Exception as e:
-                    log.error(f"Error executing SQL statement: {e}")
-                    raise
+        await execute_script(connection=connection, sql_script=sql_script)
 
     log.info(f"Operations for table '{table_name}' completed successfully")
+
+
+async def execute_script(connection: AsyncConnection, sql_script: str):
+    """Executes the ## separated statements of the script on the connection."""
+    sql_statements = sql_script.split("##")
+    for statement in sql_statements:
+        statement = statement.strip()
+        if statement:
+            try:
+                await connection.execute(sqlalchemy.text(statement))
+                log.debug("Executed SQL statement: %s", truncate(statement))
+            except Exception as e:
+                log.error(f"Error executing SQL statement: {e}")
+                raise
@@ -0,0 +1,41 @@
+# Tables of the internal database that are created by python -m app.create_tables (which the production server runs on start), keyed by table name. Each script can be run again without effect.
+INTERNAL_TABLE_SCRIPTS: dict[str, str] = {
+    "snapshot": """
+CREATE TABLE IF NOT EXISTS snapshot (
+    id UUID PRIMARY KEY,
+    version INTEGER NOT NULL,
+    content JSON NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+); ##
+ALTER TABLE snapshot ADD COLUMN IF NOT EXISTS expires_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP + INTERVAL '7 days'; ##
+CREATE INDEX IF NOT EXISTS snapshot_expires_at_idx ON snapshot (expires_at); ##
+""",
+    "rate_limit": """
+CREATE TABLE IF NOT EXISTS rate_limit (
+    key TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+); ##
+""",
+    "idempotency": """
+CREATE TABLE IF NOT EXISTS idempotency (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status_code INTEGER,
+    body BYTEA,
+    expires_at TIMESTAMPTZ NOT NULL
+); ##
+CREATE INDEX IF NOT EXISTS idempotency_expires_at_idx ON idempotency (expires_at); ##
+""",
+    "application_shard": """
+CREATE TABLE IF NOT EXISTS application_shard (
+    id UUID PRIMARY KEY,
+    application_name VARCHAR NOT NULL UNIQUE,
+    shard VARCHAR NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+); ##
+""",
+}
@@ -1,9 +1,9 @@
 import logging
 
-from app.models.application.base import Column, DataType, PrimaryKey
+from app.models.application.base import ApplicationContent, Column, DataType, PrimaryKey
+from app.models.stores.dynamic import get_schema_name
 
 log = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 
 def get_sql_type(data_type: DataType) -> str:
@@ -20,16 +20,34 @@ def get_sql_type(data_type: DataType) -> str:
     return sql_type_map[data_type]
 
 
+def generate_schema_script(schema_name: str):
+    """Generates SQL script for creating the schema of an application and the trigger function its tables use to set their updated_at column."""
+    return f"""
+CREATE SCHEMA IF NOT EXISTS {schema_name}; ##
+CREATE OR REPLACE FUNCTION {schema_name}.update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql; ##
+"""
+
+
 def generate_table_creation_script(
+    schema_name: str,
     table_name: str,
     columns: list[Column],
     primary_key: PrimaryKey,
     enable_created_at_timestamp: bool,
     enable_updated_at_timestamp: bool,
+    enable_soft_delete: bool = False,
 ):
-    """Generates SQL script for creating a table."""
+    """Generates SQL script for creating a table in the schema of its application, which must exist."""
+    qualified_table_name = f"{schema_name}.{table_name}"
     column_defs = []
     enum_types = []
+    indexes = []
 
     match primary_key:
         case PrimaryKey.AUTO_INCREMENT:
@@ -45,6 +63,12 @@ def generate_table_creation_script(
         sql_type = get_sql_type(col.data_type)
         nullable = "" if col.nullable else " NOT NULL"
         unique = " UNIQUE" if col.unique else ""
+        if col.unique and enable_soft_delete:
+            # Soft deleted rows must not block the insertion of a row with the same value
+            unique = ""
+            indexes.append(
+                f"CREATE UNIQUE INDEX {table_name}_{col.name}_key ON {qualified_table_name} ({col.name}) WHERE deleted_at IS NULL;"
+            )
 
         if col.default_value is not None:
             if isinstance(col.default_value, str):
@@ -57,11 +81,9 @@ def generate_table_creation_script(
             default = ""
 
         if sql_type.upper() == "ENUM":
-            enum_name = f"{table_name}_{col.name}_enum"
+            enum_name = f"{schema_name}.{table_name}_{col.name}_enum"
             enum_values = ", ".join(f"'{v}'" for v in col.enum_values)
-            enum_types.append(
-                f"DROP TYPE IF EXISTS {enum_name};"
-            )  ## TODO: This will be problematic as different applications might drop each other's enum. We need to associate the application id to this
+            enum_types.append(f"DROP TYPE IF EXISTS {enum_name};")
             enum_types.append(f"CREATE TYPE {enum_name} AS ENUM ({enum_values});")
             sql_type = enum_name
 
@@ -77,36 +99,35 @@ def generate_table_creation_script(
             "    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP"
         )
 
+    if enable_soft_delete:
+        column_defs.append("    deleted_at TIMESTAMPTZ")
+        # Only the soft deleted rows are indexed, for the purge of expired rows
+        indexes.append(
+            f"CREATE INDEX {table_name}_deleted_at_idx ON {qualified_table_name} (deleted_at) WHERE deleted_at IS NOT NULL;"
+        )
+
     column_defs_str = ",\n".join(column_defs)
 
-    script = f"DROP TABLE IF EXISTS {table_name} CASCADE; ##\n"
+    script = f"DROP TABLE IF EXISTS {qualified_table_name} CASCADE; ##\n"
 
     for enum_type in enum_types:
         script += f"{enum_type}\n##"
 
-    if enable_updated_at_timestamp:
-        script += """
-CREATE OR REPLACE FUNCTION update_updated_at_column()
-RETURNS TRIGGER AS $$
-BEGIN
-    NEW.updated_at = CURRENT_TIMESTAMP;
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql; ##
-"""
-
     script += f"""
-CREATE TABLE {table_name} (
+CREATE TABLE {qualified_table_name} (
 {column_defs_str}
 ); ##
 """
 
+    for index in indexes:
+        script += f"{index} ##\n"
+
     if enable_updated_at_timestamp:
         script += f"""
 CREATE TRIGGER update_{table_name}_updated_at
-BEFORE UPDATE ON {table_name}
+BEFORE UPDATE ON {qualified_table_name}
 FOR EACH ROW
-EXECUTE FUNCTION update_updated_at_column();
+EXECUTE FUNCTION {schema_name}.update_updated_at_column();
 ##
 """
 
@@ -114,17 +135,54 @@ EXECUTE FUNCTION update_updated_at_column();
 
 
 def generate_foreign_key_script(
-    table_name: str, columns: list[Column], input_name: str
+    schema_name: str, table_name: str, columns: list[Column]
 ):
-    """Generates SQL script for adding foreign key constraints to a table."""
+    """Generates SQL script for adding foreign key constraints to a table, referencing the tables in the same schema."""
     foreign_key_statements = []
     for col in columns:
         if col.foreign_key:
             fk_script = f"""
-ALTER TABLE {table_name}
+ALTER TABLE {schema_name}.{table_name}
 ADD CONSTRAINT fk_{table_name}_{col.name}
-FOREIGN KEY ({col.name}) REFERENCES {input_name}_{col.foreign_key.table}({col.foreign_key.column});
+FOREIGN KEY ({col.name}) REFERENCES {schema_name}.{col.foreign_key.table}({col.foreign_key.column});
 ##"""
             foreign_key_statements.append(fk_script)
 
     return "".join(foreign_key_statements)
+
+
+def generate_table_scripts(application_content: ApplicationContent) -> dict[str, str]:
+    """Returns the script creating each table of the application, keyed by table name."""
+    # Each application has its own schema, so that its table and type names never collide with those of other client applications. Client application name is enforced to be unique
+    schema_name = get_schema_name(application_content.name)
+    scripts: dict[str, str] = {}
+    for table in application_content.tables:
+        # For input of inference, we will GET table description from the internal database, and the table name and columns from the client database
+        # For output of inference, we will simply modify the entries in the client database associated with the user's API key
+        scripts[table.name] = generate_table_creation_script(
+            schema_name=schema_name,
+            table_name=table.name,
+            columns=table.columns,
+            primary_key=table.primary_key,
+            enable_created_at_timestamp=table.enable_created_at_timestamp,
+            enable_updated_at_timestamp=table.enable_updated_at_timestamp,
+            enable_soft_delete=table.enable_soft_delete,
+        )
+    return scripts
+
+
+def generate_foreign_key_scripts(
+    application_content: ApplicationContent,
+) -> dict[str, str]:
+    """Returns the script adding the foreign key constraints of each table of the application that has any, keyed by table name. They are added once every table exists."""
+    schema_name = get_schema_name(application_content.name)
+    scripts: dict[str, str] = {}
+    for table in application_content.tables:
+        foreign_key_script = generate_foreign_key_script(
+            schema_name=schema_name,
+            table_name=table.name,
+            columns=table.columns,
+        )
+        if foreign_key_script:
+            scripts[table.name] = foreign_key_script
+    return scripts
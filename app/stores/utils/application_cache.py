@@ -0,0 +1,44 @@
+import os
+import time
+from typing import Optional
+
+from app.models.application.base import ApplicationContent
+
+# Parsed application contents are reused for this long before they are fetched from the internal database again
+APPLICATION_CACHE_TTL_SECONDS = int(
+    os.environ.get("APPLICATION_CACHE_TTL_SECONDS", "300")
+)
+
+
+class ApplicationContentCache:
+    """Keeps the parsed content of applications by name, so that requests do not fetch and validate the tables of the application every time. The cache is local to the process, and the cached contents are shared by the requests so they must not be mutated."""
+
+    def __init__(self, ttl_seconds: int = APPLICATION_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        # Name -> (expiry, content)
+        self._contents: dict[str, tuple[float, ApplicationContent]] = {}
+
+    def get(self, name: str) -> Optional[ApplicationContent]:
+        cached = self._contents.get(name)
+        if cached is None:
+            return None
+        if cached[0] < time.monotonic():
+            del self._contents[name]
+            return None
+        return cached[1]
+
+    def put(self, application_content: ApplicationContent) -> None:
+        self._contents[application_content.name] = (
+            time.monotonic() + self.ttl_seconds,
+            application_content,
+        )
+
+    def invalidate(self, name: Optional[str]) -> None:
+        """Evicts the application, or every application if the name is None."""
+        if name is None:
+            self._contents.clear()
+        else:
+            self._contents.pop(name, None)
+
+
+application_content_cache = ApplicationContentCache()
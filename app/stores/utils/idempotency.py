@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.connectors.orm import Orm
+from app.exceptions.exception import IdempotencyKeyReusedError
+
+log = logging.getLogger(__name__)
+
+# memory keeps the responses in each worker, postgres shares them across workers through the idempotency table of the internal database
+IDEMPOTENCY_BACKEND = os.environ.get("IDEMPOTENCY_BACKEND", "memory")
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# With the postgres backend, a key claimed by a request that has not completed within this long (e.g. its worker died) can be claimed again
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "300"))
+# With the postgres backend, how often a retry checks whether the request holding its key has completed
+IDEMPOTENCY_POLL_SECONDS = float(os.environ.get("IDEMPOTENCY_POLL_SECONDS", "0.2"))
+
+
+class IdempotencyStore:
+    """Keeps the first successful response of each idempotency key so that retries of the same request replay it instead of executing it again.
+
+    Responses are kept for IDEMPOTENCY_TTL_SECONDS. With the memory backend, the store is local to the worker, so a retry that reaches another worker executes again, and only the IDEMPOTENCY_MAX_ENTRIES most recently used keys are kept. With the postgres backend, the first request inserts its key in the idempotency table and the others wait for its response, whichever worker they reach.
+    """
+
+    def __init__(
+        self,
+        backend: str = IDEMPOTENCY_BACKEND,
+        ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+        max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+        lock_seconds: float = IDEMPOTENCY_LOCK_SECONDS,
+        poll_seconds: float = IDEMPOTENCY_POLL_SECONDS,
+    ):
+        if backend not in ("memory", "postgres"):
+            raise ValueError(f"Unsupported idempotency backend: {backend}")
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock_seconds = lock_seconds
+        self.poll_seconds = poll_seconds
+        self._orm: Optional[Orm] = None
+        # Scoped key -> (expiry, request fingerprint, status code, body)
+        self._responses: OrderedDict[str, tuple[float, str, int, bytes]] = OrderedDict()
+        # Scoped key -> (request fingerprint, future resolved when the request completes)
+        self._in_flight: dict[str, tuple[str, asyncio.Future]] = {}
+
+    async def run(
+        self,
+        scope: str,
+        key: Optional[str],
+        request: BaseModel,
+        execute: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """Executes the request, or replays the stored response of a previous request with the same key. A request with the same key as a request that is still executing waits for its response."""
+        if key is None:
+            return await execute()
+
+        scoped_key: str = f"{scope}:{key}"
+        fingerprint: str = hashlib.sha256(
+            request.model_dump_json().encode()
+        ).hexdigest()
+        if self.backend == "postgres":
+            return await self._run_shared(
+                scoped_key=scoped_key,
+                key=key,
+                fingerprint=fingerprint,
+                execute=execute,
+            )
+
+        while True:
+            stored: Optional[tuple[float, str, int, bytes]] = self._get(scoped_key)
+            if stored:
+                _, stored_fingerprint, status_code, body = stored
+                _check_fingerprint(
+                    key=key, expected=stored_fingerprint, actual=fingerprint
+                )
+                return _replay(status_code=status_code, body=body)
+
+            if scoped_key not in self._in_flight:
+                break
+            in_flight_fingerprint, future = self._in_flight[scoped_key]
+            _check_fingerprint(
+                key=key, expected=in_flight_fingerprint, actual=fingerprint
+            )
+            # If the request fails, nothing is stored and the next attempt executes it again
+            await asyncio.shield(future)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._in_flight[scoped_key] = (fingerprint, future)
+        try:
+            response: Response = await execute()
+            if 200 <= response.status_code < 300:
+                self._put(
+                    scoped_key=scoped_key,
+                    value=(
+                        time.monotonic() + self.ttl_seconds,
+                        fingerprint,
+                        response.status_code,
+                        response.body,
+                    ),
+                )
+            return response
+        finally:
+            del self._in_flight[scoped_key]
+            future.set_result(None)
+
+    async def _run_shared(
+        self,
+        scoped_key: str,
+        key: str,
+        fingerprint: str,
+        execute: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        if self._orm is None:
+            self._orm = Orm(is_user_facing=False)
+        while True:
+            try:
+                is_claimed, stored = await self._orm.claim_idempotency_key(
+                    key=scoped_key,
+                    fingerprint=fingerprint,
+                    lock_seconds=self.lock_seconds,
+                )
+            except Exception as e:
+                # An unavailable idempotency table must not take the whole API down with it
+                log.error(f"Error claiming Idempotency-Key {key}: {e}")
+                return await execute()
+            if is_claimed:
+                break
+            if stored is None:
+                # Released by a request that failed in the meantime
+                continue
+            stored_fingerprint, status_code, body = stored
+            _check_fingerprint(key=key, expected=stored_fingerprint, actual=fingerprint)
+            if status_code is not None:
+                return _replay(status_code=status_code, body=body)
+            await asyncio.sleep(self.poll_seconds)
+
+        try:
+            response: Response = await execute()
+        except BaseException:
+            await self._release(scoped_key=scoped_key, fingerprint=fingerprint)
+            raise
+        if not 200 <= response.status_code < 300:
+            await self._release(scoped_key=scoped_key, fingerprint=fingerprint)
+            return response
+        try:
+            await self._orm.complete_idempotency_key(
+                key=scoped_key,
+                fingerprint=fingerprint,
+                status_code=response.status_code,
+                body=response.body,
+                ttl_seconds=float(self.ttl_seconds),
+            )
+        except Exception as e:
+            log.error(f"Error storing the response of Idempotency-Key {key}: {e}")
+        return response
+
+    async def _release(self, scoped_key: str, fingerprint: str) -> None:
+        try:
+            await self._orm.release_idempotency_key(
+                key=scoped_key, fingerprint=fingerprint
+            )
+        except Exception as e:
+            # The key can be claimed again once its lock expires
+            log.error(f"Error releasing Idempotency-Key {scoped_key}: {e}")
+
+    def _get(self, scoped_key: str) -> Optional[tuple[float, str, int, bytes]]:
+        stored = self._responses.get(scoped_key)
+        if stored is None:
+            return None
+        if stored[0] < time.monotonic():
+            del self._responses[scoped_key]
+            return None
+        self._responses.move_to_end(scoped_key)
+        return stored
+
+    def _put(self, scoped_key: str, value: tuple[float, str, int, bytes]) -> None:
+        self._responses[scoped_key] = value
+        self._responses.move_to_end(scoped_key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+
+def _replay(status_code: int, body: bytes) -> Response:
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def _check_fingerprint(key: str, expected: str, actual: str) -> None:
+    if expected != actual:
+        raise IdempotencyKeyReusedError(
+            f"Idempotency-Key {key} has already been used for a different request"
+        )
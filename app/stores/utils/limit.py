@@ -0,0 +1,26 @@
+import json
+import os
+from typing import Any
+
+MAX_RESPONSE_ROWS = int(os.environ.get("MAX_RESPONSE_ROWS", "5000"))
+MAX_RESPONSE_BYTES = int(os.environ.get("MAX_RESPONSE_BYTES", "5000000"))
+
+
+def cap_rows(
+    rows: list[dict[str, Any]], max_rows: int = MAX_RESPONSE_ROWS
+) -> tuple[list[dict[str, Any]], bool]:
+    """Returns the longest prefix of the client facing rows that fits within max_rows and MAX_RESPONSE_BYTES, and whether any row was left out."""
+    size: int = 0
+    for index, row in enumerate(rows):
+        if index >= max_rows:
+            return rows[:index], True
+        size += len(json.dumps(row, default=str))
+        if size > MAX_RESPONSE_BYTES:
+            return rows[:index], True
+    return rows, False
+
+
+def exceeds_response_limits(rows: list[dict[str, Any]]) -> bool:
+    """Whether the client facing rows are too large to be returned (or kept in the reverse stack) in full."""
+    _, is_truncated = cap_rows(rows=rows)
+    return is_truncated
@@ -0,0 +1,92 @@
+import atexit
+import logging
+import os
+import queue
+import reprlib
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# Payloads (rows, requests, responses) are cut to this many characters in the logs
+LOG_MAX_PAYLOAD_CHARS = int(os.environ.get("LOG_MAX_PAYLOAD_CHARS", "2000"))
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """Sends the records of every logger through a queue to a background thread that writes them, so that log I/O never blocks the event loop. Calling it again has no effect."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # The listener thread is a daemon, so the records still queued at exit would be lost
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Writes the records left in the queue and stops the background thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+
+class _PayloadRepr(reprlib.Repr):
+    """reprlib only looks at the first few items of each container, so the cost of the repr does not grow with the size of the payload."""
+
+    def __init__(self):
+        super().__init__()
+        self.maxlevel = 4
+        self.maxlist = 20
+        self.maxtuple = 20
+        self.maxdict = 30
+        self.maxset = 20
+        self.maxstring = 200
+        self.maxother = 200
+
+    def repr1(self, x: Any, level: int) -> str:
+        if isinstance(x, BaseModel):
+            if level <= 0:
+                return f"{type(x).__name__}(...)"
+            return f"{type(x).__name__}({self.repr_dict(x.__dict__, level)})"
+        return super().repr1(x, level)
+
+
+_payload_repr = _PayloadRepr()
+
+
+class _Truncated:
+    def __init__(self, value: Any, max_chars: int):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text: str = _payload_repr.repr(self.value)
+        if len(text) > self.max_chars:
+            return f"{text[: self.max_chars]}...[truncated {len(text) - self.max_chars} chars]"
+        return text
+
+
+def truncate(value: Any, max_chars: int = LOG_MAX_PAYLOAD_CHARS) -> _Truncated:
+    """Wraps a payload to be passed as an argument of a log call. It is only formatted if the record is emitted, and then cut to max_chars with a marker of how much was left out.
+
+    Example:
+        log.debug("Rows: %s", truncate(rows))
+    """
+    return _Truncated(value=value, max_chars=max_chars)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Optional
+
+from app.stores.utils.metrics import LOOP_LAG_SECONDS, LOOP_STALLS
+
+log = logging.getLogger(__name__)
+
+LOOP_MONITOR_ENABLED = os.environ.get("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+# How often the event loop is checked. The lag is how late the check runs.
+LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get("LOOP_LAG_INTERVAL_SECONDS", "0.1"))
+# The stack of whatever blocks the loop for longer than this is logged
+LOOP_STALL_SECONDS = float(os.environ.get("LOOP_STALL_SECONDS", "0.25"))
+
+
+class LoopMonitor:
+    """Measures how late the event loop runs a callback scheduled at a fixed interval, which is how long every other coroutine waited for a blocking call to return.
+
+    A watchdog thread checks that the loop keeps running the callback. Once the loop has not run it for stall_seconds, the watchdog logs the stack of the loop thread, which is the code still blocking it, and then the duration of the stall once the loop runs again.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = LOOP_LAG_INTERVAL_SECONDS,
+        stall_seconds: float = LOOP_STALL_SECONDS,
+    ):
+        self.interval_seconds = interval_seconds
+        self.stall_seconds = stall_seconds
+        self._last_beat_at: float = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts monitoring the running event loop."""
+        if self._task is not None:
+            return
+        self._last_beat_at = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(
+            target=self._watch, args=(threading.get_ident(),), daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.to_thread(self._thread.join)
+        self._task = None
+        self._thread = None
+
+    async def _beat(self) -> None:
+        while True:
+            scheduled_at: float = time.monotonic()
+            await asyncio.sleep(self.interval_seconds)
+            now: float = time.monotonic()
+            self._last_beat_at = now
+            LOOP_LAG_SECONDS.observe(
+                max(0.0, now - scheduled_at - self.interval_seconds)
+            )
+
+    def _watch(self, loop_thread_id: int) -> None:
+        # The last beat before the stall being reported, so that each stall is reported once
+        stalled_beat_at: Optional[float] = None
+        while not self._stopped.wait(self.stall_seconds / 2):
+            last_beat_at: float = self._last_beat_at
+            if stalled_beat_at is not None and last_beat_at != stalled_beat_at:
+                log.warning(
+                    f"Event loop was blocked for {last_beat_at - stalled_beat_at - self.interval_seconds:.3f}s"
+                )
+                stalled_beat_at = None
+            lag_seconds: float = time.monotonic() - last_beat_at - self.interval_seconds
+            if stalled_beat_at is None and lag_seconds >= self.stall_seconds:
+                stalled_beat_at = last_beat_at
+                LOOP_STALLS.inc()
+                frame: Optional[FrameType] = sys._current_frames().get(loop_thread_id)
+                stack: str = "".join(traceback.format_stack(frame)) if frame else ""
+                log.warning(
+                    f"Event loop blocked for {lag_seconds:.3f}s so far by:\n{stack}"
+                )
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,276 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# Seconds, from a fast query to a slow LLM call
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+# Seconds, from the usual scheduling jitter to a stalled event loop
+LAG_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+)
+# Seconds, from a fresh connection to one kept open for a day
+AGE_BUCKETS: tuple[float, ...] = (1, 10, 60, 300, 900, 1800, 3600, 14400, 86400)
+COUNT_BUCKETS: tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100)
+BYTE_BUCKETS: tuple[float, ...] = (
+    256,
+    1024,
+    4096,
+    16384,
+    65536,
+    262144,
+    1048576,
+    4194304,
+)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key: tuple[str, ...] = tuple(str(labels[name]) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines: list[str] = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} counter",
+        ]
+        for key, value in self._values.items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, key)} {format_value(value)}"
+            )
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Labels -> (count per bucket with a last bucket for +Inf, sum). The counts are only made cumulative when rendered.
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key: tuple[str, ...] = tuple(str(labels[name]) for name in self.labelnames)
+        observed = self._values.get(key)
+        if observed is None:
+            observed = ([0] * (len(self.buckets) + 1), [0.0])
+            self._values[key] = observed
+        observed[0][bisect_left(self.buckets, value)] += 1
+        observed[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observes the seconds spent in the block, even if it raises."""
+        started_at: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def render(self) -> list[str]:
+        lines: list[str] = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key, (counts, total) in self._values.items():
+            cumulative: int = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels: str = _format_labels(
+                    (*self.labelnames, "le"), (*key, format_value(bound))
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collects the metrics of the process and renders them in the Prometheus text format. Nothing is computed until the metrics are scraped."""
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        # Called on each scrape for values that are read from elsewhere, each returning complete lines of the text format
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def counter(
+        self, name: str, help: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        counter = Counter(name=name, help=help, labelnames=labelnames)
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(
+            name=name, help=help, labelnames=labelnames, buckets=buckets
+        )
+        self._metrics.append(histogram)
+        return histogram
+
+    def register_collector(self, collector: Callable[[], list[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def format_sample(name: str, labels: dict[str, str], value: float) -> str:
+    """Returns a line of the text format for a value read by a collector, with its labels escaped."""
+    label_values: tuple[str, ...] = tuple(str(label) for label in labels.values())
+    return f"{name}{_format_labels(tuple(labels), label_values)} {format_value(value)}"
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not labelnames:
+        return ""
+    pairs: str = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    "whale_request_seconds",
+    "Latency of the HTTP requests by route and status code",
+    ("method", "route", "status"),
+)
+RESPONSE_BYTES = registry.histogram(
+    "whale_response_bytes",
+    "Size of the HTTP response bodies by route",
+    ("method", "route"),
+    buckets=BYTE_BUCKETS,
+)
+STAGE_SECONDS = registry.histogram(
+    "whale_stage_seconds",
+    "Latency of each stage of handling a message",
+    ("stage",),
+)
+OPERATION_SECONDS = registry.histogram(
+    "whale_operation_seconds",
+    "Latency of the database work of each operation of an inference response by HTTP method",
+    ("http_method",),
+)
+INFERENCE_SECONDS = registry.histogram(
+    "whale_inference_seconds",
+    "Latency of the calls to the ML endpoint",
+    ("endpoint",),
+)
+INFERENCE_REQUESTS = registry.counter(
+    "whale_inference_requests_total",
+    "Calls to the ML endpoint by outcome",
+    ("endpoint", "outcome"),
+)
+ROWS = registry.counter(
+    "whale_rows_total",
+    "Rows read from and written to the tables of each application",
+    ("application", "direction"),
+)
+STATEMENT_SECONDS = registry.histogram(
+    "whale_statement_seconds",
+    "Latency of the SQL statements by the code path that executed them",
+    ("caller",),
+)
+REQUEST_STATEMENTS = registry.histogram(
+    "whale_request_statements",
+    "SQL statements executed per HTTP request by route",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "whale_request_db_seconds",
+    "Seconds spent executing SQL statements per HTTP request by route",
+    ("route",),
+)
+LOOP_LAG_SECONDS = registry.histogram(
+    "whale_event_loop_lag_seconds",
+    "How late the event loop ran a callback scheduled at a fixed interval",
+    buckets=LAG_BUCKETS,
+)
+LOOP_STALLS = registry.counter(
+    "whale_event_loop_stalls_total",
+    "Times the event loop was blocked for longer than the stall threshold",
+)
+POOL_CHECKOUT_SECONDS = registry.histogram(
+    "whale_pool_checkout_seconds",
+    "Seconds waited to check a connection out of the pool by database",
+    ("database",),
+)
+POOL_CHECKOUT_TIMEOUTS = registry.counter(
+    "whale_pool_checkout_timeouts_total",
+    "Checkouts that timed out waiting for a connection by database",
+    ("database",),
+)
+POOL_CONNECTION_AGE_SECONDS = registry.histogram(
+    "whale_pool_connection_age_seconds",
+    "Age of the connections when checked out of the pool by database",
+    ("database",),
+    buckets=AGE_BUCKETS,
+)
+READS = registry.counter(
+    "whale_database_reads_total",
+    "Read sessions by database and whether they went to a replica or the primary",
+    ("database", "target"),
+)
@@ -0,0 +1,47 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import zlib
+
+from pydantic import ValidationError
+
+from app.models.message.rows import PageToken
+
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", "500"))
+# Page tokens are signed so that clients cannot forge the application, table or filter of a page. Unset, every process signs with its own random secret, so a token is only accepted by the worker that issued it (python -m app.server shares one across its workers).
+PAGE_TOKEN_SECRET: bytes = (
+    os.environ.get("PAGE_TOKEN_SECRET") or secrets.token_urlsafe(32)
+).encode()
+
+
+_SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+def encode_page_token(page_token: PageToken) -> str:
+    """Serialises and signs the page token into an opaque, URL safe string."""
+    payload: bytes = zlib.compress(
+        json.dumps(
+            page_token.model_dump(exclude_none=True), separators=(",", ":")
+        ).encode()
+    )
+    return base64.urlsafe_b64encode(_sign(payload) + payload).decode()
+
+
+def decode_page_token(value: str) -> PageToken:
+    """Parses a string produced by encode_page_token. Raises ValueError if the token is malformed or was not signed by the server."""
+    try:
+        token: bytes = base64.urlsafe_b64decode(value.encode())
+        signature, payload = token[:_SIGNATURE_SIZE], token[_SIGNATURE_SIZE:]
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("Invalid page token")
+        return PageToken.model_validate(json.loads(zlib.decompress(payload)))
+    except (binascii.Error, zlib.error, json.JSONDecodeError, ValidationError) as e:
+        raise ValueError("Invalid page token") from e
+
+
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(PAGE_TOKEN_SECRET, payload, hashlib.sha256).digest()
@@ -0,0 +1,74 @@
+from typing import Any, Optional
+
+from app.models.inference.use import HttpMethod, HttpMethodResponse
+
+
+def plan_operations(
+    http_method_responses: list[HttpMethodResponse],
+) -> list[list[HttpMethodResponse]]:
+    """Groups adjacent operations that can be executed as a single statement, keeping the order of the operations.
+
+    Adjacent POSTs into the same table are inserted together. Adjacent PUTs that each update a single row of the same table by id, with the same columns, are updated together as long as no row is updated twice.
+    """
+    plan: list[list[HttpMethodResponse]] = []
+    for http_method_response in http_method_responses:
+        if plan and _can_merge(
+            group=plan[-1], http_method_response=http_method_response
+        ):
+            plan[-1].append(http_method_response)
+        else:
+            plan.append([http_method_response])
+    return plan
+
+
+def get_row_id(http_method_response: HttpMethodResponse) -> Optional[Any]:
+    """Returns the id of the row targeted by the operation if it filters on a single id and nothing else."""
+    if not http_method_response.filter_conditions:
+        return None
+    conditions: list[dict[str, Any]] = http_method_response.filter_conditions.get(
+        "conditions", []
+    )
+    if len(conditions) != 1:
+        return None
+    condition: dict[str, Any] = conditions[0]
+    if (
+        condition.get("column") != "id"
+        or condition.get("operator") != "="
+        or condition.get("value") is None
+    ):
+        return None
+    return condition["value"]
+
+
+def _can_merge(
+    group: list[HttpMethodResponse], http_method_response: HttpMethodResponse
+) -> bool:
+    first: HttpMethodResponse = group[0]
+    if (
+        first.http_method != http_method_response.http_method
+        or first.application.name != http_method_response.application.name
+        or first.table_name != http_method_response.table_name
+    ):
+        return False
+
+    match http_method_response.http_method:
+        case HttpMethod.POST:
+            # Upserts are executed on their own
+            return (
+                first.on_conflict is None and http_method_response.on_conflict is None
+            )
+        case HttpMethod.PUT:
+            row_id: Optional[Any] = get_row_id(http_method_response)
+            if row_id is None or not http_method_response.updated_data:
+                return False
+            for grouped_response in group:
+                if (
+                    get_row_id(grouped_response) in (None, row_id)
+                    or not grouped_response.updated_data
+                    or grouped_response.updated_data.keys()
+                    != http_method_response.updated_data.keys()
+                ):
+                    return False
+            return True
+        case _:
+            return False
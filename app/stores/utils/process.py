@@ -1,9 +1,12 @@
-from typing import Any
 import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable
 
 from dateutil import parser
 
 from app.models.application.base import DataType, Table
+from app.stores.utils.metrics import STAGE_SECONDS
 
 
 def process_client_facing_rows(
@@ -12,18 +15,35 @@ def process_client_facing_rows(
     date_column_names_to_process: list[str],
     uuid_column_names_to_process: list[str],
 ) -> list[dict[str, Any]]:
-    for name in datetime_column_names_to_process + date_column_names_to_process:
-        for row in db_rows:
-            if value := row.get(name):
-                if not value:
-                    continue
-                row[name] = value.isoformat()
-    for name in uuid_column_names_to_process:
+    with STAGE_SECONDS.time(stage="row_conversion"):
+        for name in datetime_column_names_to_process + date_column_names_to_process:
+            for row in db_rows:
+                if value := row.get(name):
+                    if not value:
+                        continue
+                    row[name] = value.isoformat()
+        for name in uuid_column_names_to_process:
+            for row in db_rows:
+                if value := row.get(name):
+                    if not value:
+                        continue
+                    row[name] = str(value)
+    return db_rows
+
+
+def process_client_facing_aggregate_rows(
+    db_rows: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Aggregates are not tied to a column type (e.g. SUM of an integer column is a Decimal, MIN of a datetime column is a datetime), so every value is converted based on its own type."""
+    with STAGE_SECONDS.time(stage="row_conversion"):
         for row in db_rows:
-            if value := row.get(name):
-                if not value:
-                    continue
-                row[name] = str(value)
+            for key, value in row.items():
+                if isinstance(value, Decimal):
+                    row[key] = float(value)
+                elif isinstance(value, (datetime, date)):
+                    row[key] = value.isoformat()
+                elif isinstance(value, uuid.UUID):
+                    row[key] = str(value)
     return db_rows
 
 
@@ -36,11 +56,11 @@ def process_client_facing_update_dict(
     for name in datetime_column_names_to_process + date_column_names_to_process:
         if name in db_dict and db_dict[name]:
             db_dict[name] = db_dict[name].isoformat()
-            
+
     for name in uuid_column_names_to_process:
         if name in db_dict and db_dict[name]:
             db_dict[name] = str(db_dict[name])
-            
+
     return db_dict
 
 
@@ -86,7 +106,7 @@ def identify_columns_to_process(table: Table):
     datetime_column_names_to_process: list[str] = []
     date_column_names_to_process: list[str] = []
     uuid_column_names_to_process: list[str] = []
-    
+
     for column in table.columns:
         if column.data_type == DataType.DATETIME:
             datetime_column_names_to_process.append(column.name)
@@ -94,12 +114,18 @@ def identify_columns_to_process(table: Table):
             date_column_names_to_process.append(column.name)
         if column.data_type == DataType.UUID:
             uuid_column_names_to_process.append(column.name)
-            
+
     if table.primary_key == DataType.UUID:
         uuid_column_names_to_process.append("id")
 
     datetime_column_names_to_process.extend(["created_at", "updated_at"])
-    return datetime_column_names_to_process, date_column_names_to_process, uuid_column_names_to_process
+    if table.enable_soft_delete:
+        datetime_column_names_to_process.append("deleted_at")
+    return (
+        datetime_column_names_to_process,
+        date_column_names_to_process,
+        uuid_column_names_to_process,
+    )
 
 
 def process_values_of_row(
@@ -120,7 +146,7 @@ def process_values_of_row(
             if not row.get(column_name):
                 continue
             row[column_name] = parser.parse(row[column_name]).date()
-            
+
         for column_name in uuid_column_names_to_process:
             if not row.get(column_name):
                 continue
@@ -155,11 +181,15 @@ def process_datetime_or_date_values_of_filter_dict(
                 if not condition["value"]:
                     continue
                 if condition["column"] in datetime_column_names_to_process:
-                    condition["value"] = parser.parse(condition["value"])
+                    condition["value"] = _convert_value(
+                        condition["value"], parser.parse
+                    )
                 if condition["column"] in date_column_names_to_process:
-                    condition["value"] = parser.parse(condition["value"]).date()
+                    condition["value"] = _convert_value(
+                        condition["value"], lambda value: parser.parse(value).date()
+                    )
                 if condition["column"] in uuid_column_names_to_process:
-                    condition["value"] = uuid.UUID(condition["value"])
+                    condition["value"] = _convert_value(condition["value"], uuid.UUID)
 
         return conditions
 
@@ -170,6 +200,13 @@ def process_datetime_or_date_values_of_filter_dict(
     return dict_to_process
 
 
+def _convert_value(value: Any, converter: Callable[[Any], Any]) -> Any:
+    """Converts the value of a condition, or each of its values for IN conditions."""
+    if isinstance(value, (list, tuple)):
+        return [converter(item) for item in value]
+    return converter(value)
+
+
 def process_datetime_or_date_values_of_update_dict(
     dict_to_process: dict[str, Any],
     datetime_column_names_to_process: list[str],
@@ -0,0 +1,151 @@
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Any, Optional
+
+# Requests with an X-Profile header equal to the token are profiled, and the profiles are served to requests with an X-Admin-Token header equal to it. Both are disabled if it is not set.
+PROFILER_ADMIN_TOKEN = os.environ.get("PROFILER_ADMIN_TOKEN")
+PROFILER_INTERVAL_SECONDS = float(os.environ.get("PROFILER_INTERVAL_SECONDS", "0.005"))
+PROFILER_DIRECTORY = os.environ.get("PROFILER_DIRECTORY", "/tmp/whale-profiles")
+# Only the most recent profiles are kept on disk
+PROFILER_MAX_PROFILES = int(os.environ.get("PROFILER_MAX_PROFILES", "100"))
+
+_APP_ROOT: str = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+_PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class StackSampler:
+    """Samples the stack of a thread at a fixed interval from a background thread, keeping only the samples taken while the code under the marker frame was running.
+
+    A request runs on the event loop thread interleaved with every other request, so the marker (the frame of the middleware that started profiling the request) tells its samples apart from the others. Time spent awaiting I/O is not sampled, since the request is not on the stack then. The sampling thread needs the GIL to take a sample, so CPU-bound code is sampled about every sys.getswitchinterval() at most and requests shorter than that may come out empty.
+    """
+
+    def __init__(
+        self,
+        marker: FrameType,
+        thread_id: int,
+        interval_seconds: float = PROFILER_INTERVAL_SECONDS,
+    ):
+        self.marker = marker
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling without waiting for the sampling thread, which join waits for."""
+        self._stopped.set()
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            stack: list[str] = []
+            while frame is not None and frame is not self.marker:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if frame is self.marker:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+class ProfileStore:
+    """Keeps profiles in collapsed stack format (one "root;...;leaf count" line per stack) in a directory, deleting the oldest beyond max_profiles."""
+
+    def __init__(
+        self,
+        directory: str = PROFILER_DIRECTORY,
+        max_profiles: int = PROFILER_MAX_PROFILES,
+    ):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, profile_id: str, stacks: Counter[tuple[str, ...]]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile_id), "w") as file:
+            for stack, count in stacks.items():
+                file.write(f"{';'.join(stack)} {count}\n")
+
+        paths: list[str] = sorted(
+            (
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".collapsed")
+            ),
+            key=os.path.getmtime,
+        )
+        for path in paths[: max(0, len(paths) - self.max_profiles)]:
+            os.remove(path)
+
+    def load_collapsed(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id)) as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def load_speedscope(
+        self, profile_id: str, interval_seconds: float = PROFILER_INTERVAL_SECONDS
+    ) -> Optional[dict[str, Any]]:
+        """Returns the profile in the speedscope file format, with each stack weighted by the time it was sampled for."""
+        collapsed: Optional[str] = self.load_collapsed(profile_id)
+        if collapsed is None:
+            return None
+
+        frame_indexes: dict[str, int] = {}
+        samples: list[list[int]] = []
+        weights: list[float] = []
+        for line in collapsed.splitlines():
+            stack, count = line.rsplit(" ", 1)
+            samples.append(
+                [
+                    frame_indexes.setdefault(name, len(frame_indexes))
+                    for name in stack.split(";")
+                    if name
+                ]
+            )
+            weights.append(int(count) * interval_seconds)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": name} for name in frame_indexes]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": profile_id,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+            "name": profile_id,
+            "exporter": "whale-backend",
+        }
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.collapsed")
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    filename: str = code.co_filename
+    if filename.startswith(_APP_ROOT):
+        filename = os.path.relpath(filename, _APP_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    # Semicolons separate the frames of a collapsed stack
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+profile_store = ProfileStore()
@@ -0,0 +1,61 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.connectors.orm import Orm
+
+log = logging.getLogger(__name__)
+
+# memory keeps the buckets in each worker, postgres shares them across workers through the rate_limit table of the internal database
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get("RATE_LIMIT_MAX_BUCKETS", "100000"))
+
+
+class TokenBucketStore:
+    """Token buckets keyed by client, refilled continuously at refill_per_second up to capacity."""
+
+    def __init__(
+        self,
+        backend: str = RATE_LIMIT_BACKEND,
+        max_buckets: int = RATE_LIMIT_MAX_BUCKETS,
+    ):
+        if backend not in ("memory", "postgres"):
+            raise ValueError(f"Unsupported rate limit backend: {backend}")
+        self.backend = backend
+        self.max_buckets = max_buckets
+        # Key -> (tokens, time of the last refill). Only the most recently used buckets are kept, and a bucket that is dropped starts again full.
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._orm: Optional[Orm] = None
+
+    async def take(
+        self, key: str, capacity: float, refill_per_second: float
+    ) -> Optional[float]:
+        """Takes a token from the bucket of the key. Returns None if a token was available, or else the number of seconds until one is."""
+        if self.backend == "postgres":
+            try:
+                if self._orm is None:
+                    self._orm = Orm(is_user_facing=False)
+                if await self._orm.take_token(
+                    key=key, capacity=capacity, refill_per_second=refill_per_second
+                ):
+                    return None
+                return 1 / refill_per_second
+            except Exception as e:
+                # An unavailable rate limit table must not take the whole API down with it
+                log.error(f"Error taking rate limit token for {key}: {e}")
+                return None
+
+        now: float = time.monotonic()
+        tokens, refilled_at = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - refilled_at) * refill_per_second)
+        retry_after: Optional[float] = None
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return retry_after
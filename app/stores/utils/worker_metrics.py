@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from app.stores.utils.metrics import Registry, format_value, registry
+
+log = logging.getLogger(__name__)
+
+# Set by the launcher when it runs several workers, so that each worker shares its metrics with the others through the directory. Unset, only the metrics of the worker that is scraped are served.
+METRICS_DIRECTORY = os.environ.get("METRICS_DIRECTORY") or None
+# The metrics of the other workers are at most this old when scraped
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", "5"))
+
+
+class WorkerMetrics:
+    """Serves the metrics of every worker process from whichever worker is scraped.
+
+    Each worker writes its rendered metrics to a file of the directory every flush_seconds. A scrape renders the metrics of the scraped worker and sums them with those read from the files of the other workers that are still alive, sample by sample, so counters and histograms count the requests of every worker and the gauges (connections, waiting sessions) add up to the total of the server. The files of dead workers are deleted, so the counters of a worker that was restarted drop out, which Prometheus handles as a counter reset.
+    """
+
+    def __init__(
+        self,
+        registry: Registry,
+        directory: Optional[str] = METRICS_DIRECTORY,
+        flush_seconds: float = METRICS_FLUSH_SECONDS,
+    ):
+        self.registry = registry
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{os.getpid()}.prom")
+
+    def start(self) -> None:
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self._remove)
+
+    async def render(self) -> str:
+        text: str = self.registry.render()
+        if self.directory is None:
+            return text
+        # The registry is only read on the event loop, and the files of the other workers off it
+        return await asyncio.to_thread(
+            lambda: merge_expositions([text, *self._read_other_workers()])
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._write, self.registry.render())
+            except Exception as e:
+                log.error(f"Error writing the metrics of the worker: {e}")
+            await asyncio.sleep(self.flush_seconds)
+
+    def _write(self, text: str) -> None:
+        # Written aside and renamed, so that a scrape never reads a partial file
+        temporary_path: str = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(text)
+        os.replace(temporary_path, self.path)
+
+    def _read_other_workers(self) -> list[str]:
+        texts: list[str] = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".prom"):
+                continue
+            pid: int = int(name.removesuffix(".prom"))
+            if pid == os.getpid():
+                continue
+            path: str = os.path.join(self.directory, name)
+            try:
+                if not _is_alive(pid):
+                    os.remove(path)
+                    continue
+                with open(path) as file:
+                    texts.append(file.read())
+            except FileNotFoundError:
+                # The worker exited (or another scrape removed its file) in the meantime
+                continue
+        return texts
+
+    def _remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def merge_expositions(texts: list[str]) -> str:
+    """Merges metrics in the Prometheus text format by summing the values of the same series, keeping the samples of each metric together after its HELP and TYPE lines."""
+    # Metric name -> (HELP and TYPE lines, series -> summed value)
+    families: dict[str, tuple[list[str], dict[str, float]]] = {}
+    for text in texts:
+        family: Optional[tuple[list[str], dict[str, float]]] = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("#"):
+                # "# HELP <name> ..." or "# TYPE <name> ..."
+                name: str = line.split(" ", 3)[2]
+                family = families.setdefault(name, ([], {}))
+                if line not in family[0]:
+                    family[0].append(line)
+                continue
+            series, value = line.rsplit(" ", 1)
+            if family is None:
+                family = families.setdefault(series, ([], {}))
+            family[1][series] = family[1].get(series, 0) + float(value)
+
+    lines: list[str] = []
+    for headers, samples in families.values():
+        lines.extend(headers)
+        lines.extend(
+            f"{series} {format_value(value)}" for series, value in samples.items()
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+worker_metrics = WorkerMetrics(registry=registry)